@@ -9,20 +9,29 @@ import logging
 import sys
 import os
 import json
+import hashlib
 import shutil
 import tempfile
+import zipfile
 import re
 import io
+import math
 import statistics
+import time
+import multiprocessing
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from typing import Dict, List, Tuple, Optional, Any, Callable
 from docxtpl import DocxTemplate
 from docx import Document
 from docx.shared import Inches
 from docx.enum.table import WD_TABLE_ALIGNMENT
+from lxml import etree
 from app_paths import load_app_paths
+from lanis_client_manager import LanisClientManager
 
 APP_PATHS = load_app_paths()
 DEFAULT_SCHOOL_YEAR = "2024/2025"
@@ -523,6 +532,8 @@ class KopfnotenImporter:
 
             CREATE INDEX IF NOT EXISTS idx_schueler_klasse ON schueler(klasse);
             CREATE INDEX IF NOT EXISTS idx_noten_schueler ON noten(schueler_id);
+            CREATE INDEX IF NOT EXISTS idx_noten_schueler_periode ON noten(schueler_id, schuljahr, halbjahr);
+            CREATE INDEX IF NOT EXISTS idx_noten_periode_lehrer ON noten(schuljahr, halbjahr, lehrer_kuerzel);
             """
         )
         conn.commit()
@@ -563,6 +574,138 @@ class KopfnotenImporter:
         except Exception as e:
             logging.error(f"Migration error (special note columns): {e}")
 
+        # Migration: Export-Status (inkrementeller Word-Export)
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS export_status (
+                    klasse TEXT NOT NULL,
+                    schuljahr TEXT NOT NULL,
+                    halbjahr INTEGER NOT NULL,
+                    template_pfad TEXT NOT NULL,
+                    template_version TEXT,
+                    daten_hash TEXT,
+                    output_file TEXT,
+                    exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    daten_version TEXT,
+                    PRIMARY KEY (klasse, schuljahr, halbjahr, template_pfad)
+                );
+                """
+            )
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Migration error (export_status): {e}")
+
+        # Migration: Datenstand je Periode (für den Analyse-Cache). Jede Notenänderung erhöht
+        # die Version ihrer Periode; Änderungen an Schülern oder Fächern (z. B. Umbenennungen)
+        # wirken auf alle Perioden ('*', 0).
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS daten_version (
+                    schuljahr TEXT NOT NULL,
+                    halbjahr INTEGER NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (schuljahr, halbjahr)
+                );
+
+                CREATE TRIGGER IF NOT EXISTS trg_noten_version_insert
+                AFTER INSERT ON noten
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES (NEW.schuljahr, NEW.halbjahr, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_noten_version_update
+                AFTER UPDATE OF schueler_id, fach_id, note_av, note_sv, note_av_special, note_sv_special,
+                                ist_wahlpflicht_belegung, lehrer_kuerzel, schuljahr, halbjahr ON noten
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES (NEW.schuljahr, NEW.halbjahr, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES (OLD.schuljahr, OLD.halbjahr, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_noten_version_delete
+                AFTER DELETE ON noten
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES (OLD.schuljahr, OLD.halbjahr, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_schueler_version_insert
+                AFTER INSERT ON schueler
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_schueler_version_update
+                AFTER UPDATE ON schueler
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_schueler_version_delete
+                AFTER DELETE ON schueler
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_faecher_version_insert
+                AFTER INSERT ON faecher
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_faecher_version_update
+                AFTER UPDATE ON faecher
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_faecher_version_delete
+                AFTER DELETE ON faecher
+                BEGIN
+                    INSERT INTO daten_version (schuljahr, halbjahr, version) VALUES ('*', 0, 1)
+                    ON CONFLICT(schuljahr, halbjahr) DO UPDATE SET version = version + 1;
+                END;
+                """
+            )
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Migration error (daten_version): {e}")
+
+        # Migration: vorberechnete Kennzahlen je Periode (Schule, Klassen, Jahrgänge, Fächer)
+        # für Vergleiche und Verlauf; gültig solange daten_version unverändert ist.
+        try:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS period_stats (
+                    schuljahr TEXT NOT NULL,
+                    halbjahr INTEGER NOT NULL,
+                    ebene TEXT NOT NULL,
+                    schluessel TEXT NOT NULL,
+                    anzahl INTEGER NOT NULL DEFAULT 0,
+                    av_avg REAL,
+                    sv_avg REAL,
+                    gesamt_avg REAL,
+                    completion_pct REAL,
+                    stddev REAL,
+                    daten_version INTEGER NOT NULL DEFAULT 0,
+                    schueler_version INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (schuljahr, halbjahr, ebene, schluessel)
+                );
+                """
+            )
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Migration error (period_stats): {e}")
+
         # Migration: Geschichte/Gesellschaftskunde -> Gesellschaftslehre
         conn.execute(
             "UPDATE faecher SET fach_lang = 'Gesellschaftslehre' WHERE fach_lang IN ('Geschichte', 'Gesellschaftskunde')"
@@ -1139,19 +1282,234 @@ class KopfnotenImporter:
             self.logger.error(f"Fehler bei der Datenbank-Bereinigung: {e}")
             self.conn.rollback() # Rollback safe
 
+class ExportBundleWriter:
+    """
+    Schreibt alle Dokumente eines Export-Laufs direkt in ein ZIP-Archiv.
+
+    Das Archiv entsteht lokal im Temp-Verzeichnis und wird erst in finalize() mit einem
+    Kopiervorgang plus atomarem Umbenennen ins (ggf. Netzwerk-)Ausgabeverzeichnis gelegt.
+    Zusätzlich enthält es ein manifest.json mit Klassen, Schülerzahlen und Fehlern.
+    """
+
+    def __init__(self, output_dir: Path, name: str):
+        self.output_dir = Path(output_dir)
+        self.name = name
+        fd, tmp_name = tempfile.mkstemp(prefix="kopfnoten_bundle_", suffix=".zip")
+        os.close(fd)
+        self.local_path = Path(tmp_name)
+        self.zip = zipfile.ZipFile(self.local_path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.entries: List[str] = []
+
+    def add(self, arcname: str, data: bytes) -> str:
+        """Fügt ein Dokument hinzu; doppelte Namen bekommen einen Zähler"""
+        base, ext = os.path.splitext(arcname)
+        candidate, counter = arcname, 2
+        while candidate in self.entries:
+            candidate = f"{base}_{counter}{ext}"
+            counter += 1
+        self.zip.writestr(candidate, data)
+        self.entries.append(candidate)
+        return candidate
+
+    def finalize(self, manifest: Dict[str, Any]) -> Path:
+        """Schreibt das Manifest, schließt das Archiv und verschiebt es ins Ausgabeverzeichnis"""
+        manifest = dict(manifest, dateien=list(self.entries))
+        self.zip.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2, default=str))
+        self.zip.close()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        target = self.output_dir / self.name
+        partial = self.output_dir / f".{self.name}.part"
+        try:
+            shutil.copyfile(self.local_path, partial)
+            os.replace(partial, target)
+        finally:
+            if partial.exists():
+                partial.unlink()
+            self.local_path.unlink()
+        return target
+
+    def abort(self) -> None:
+        """Verwirft das lokale Archiv"""
+        try:
+            self.zip.close()
+        except Exception:
+            pass
+        if self.local_path.exists():
+            self.local_path.unlink()
+
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _w(tag: str) -> str:
+    """Qualifizierter WordprocessingML-Name für lxml (z. B. "tbl" -> "{...}tbl")"""
+    return f"{{{_W_NS}}}{tag}"
+
+
+_WP_DOCPR = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}docPr"
+_MERGE_MARKER = b"<!--KOPFNOTEN_MERGE-->"
+
+
+def merge_docx_documents(parts: List[bytes], target: Any) -> None:
+    """
+    Hängt mehrere aus demselben Template gerenderte Dokumente zu einem zusammen.
+
+    Styles, Nummerierung und übrige Paketteile stammen aus dem ersten Dokument; von allen
+    Dokumenten wird nur der Body übernommen (je Dokument ein lxml-Parse) und direkt in den
+    ZIP-Eintrag word/document.xml gestreamt, getrennt durch Seitenumbrüche. target ist ein
+    Pfad oder ein beschreibbarer Stream.
+    """
+    if not parts:
+        raise ValueError("Keine Dokumente zum Zusammenführen")
+
+    rels_name = "word/_rels/document.xml.rels"
+    with zipfile.ZipFile(io.BytesIO(parts[0])) as base:
+        base_rels = base.read(rels_name) if rels_name in base.namelist() else b""
+        root = etree.fromstring(base.read("word/document.xml"))
+        body = root.find(_w("body"))
+        first_children = list(body)
+        sect_pr = first_children.pop() if first_children and first_children[-1].tag == _w("sectPr") else None
+        for child in list(body):
+            body.remove(child)
+        body.append(etree.Comment("KOPFNOTEN_MERGE"))
+        if sect_pr is not None:
+            body.append(sect_pr)
+        head, tail = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).split(
+            _MERGE_MARKER
+        )
+
+        page_break = etree.Element(_w("p"), nsmap={"w": _W_NS})
+        etree.SubElement(etree.SubElement(page_break, _w("r")), _w("br")).set(_w("type"), "page")
+        page_break = etree.tostring(page_break)
+
+        doc_pr_id = 0
+        with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as out:
+            for item in base.infolist():
+                if item.filename != "word/document.xml":
+                    out.writestr(item, base.read(item.filename))
+
+            with out.open("word/document.xml", "w") as stream:
+                stream.write(head)
+                for index, part in enumerate(parts):
+                    if index == 0:
+                        children = first_children
+                    else:
+                        with zipfile.ZipFile(io.BytesIO(part)) as doc:
+                            rels = doc.read(rels_name) if rels_name in doc.namelist() else b""
+                            if rels != base_rels:
+                                raise ValueError(
+                                    f"Dokument {index + 1} hat andere Beziehungen (Bilder/Kopfzeilen) als das erste"
+                                )
+                            children = list(etree.fromstring(doc.read("word/document.xml")).find(_w("body")))
+                        if children and children[-1].tag == _w("sectPr"):
+                            children.pop()
+                        stream.write(page_break)
+                    for child in children:
+                        # Zeichnungs-IDs müssen im Gesamtdokument eindeutig sein
+                        for doc_pr in child.iter(_WP_DOCPR):
+                            doc_pr_id += 1
+                            doc_pr.set("id", str(doc_pr_id))
+                        stream.write(etree.tostring(child))
+                stream.write(tail)
+
+
+def _export_klasse_worker(
+    db_path: str,
+    school_year: str,
+    term: int,
+    klasse: str,
+    output_dir: str,
+    template_path: str,
+    export_date: str,
+    table_engine: Optional[str] = None,
+    to_bytes: bool = False,
+) -> Dict[str, Any]:
+    """Worker-Prozess für den parallelen Export: eine Klasse mit eigener Read-only-Verbindung"""
+    with OptimizedKopfnotenExporter(
+        db_path, school_year=school_year, term=term, read_only=True, table_engine=table_engine
+    ) as exporter:
+        return exporter._export_klasse_horizontal_optimized(
+            klasse, Path(output_dir), Path(template_path), export_date, to_bytes=to_bytes
+        )
+
+
+def _render_schueler_batch_worker(
+    template_path: str, table_engine: str, jobs: List[Tuple[str, Dict[str, Any], str]], to_bytes: bool = False
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Worker-Prozess für den Einzelexport: rendert mehrere Schüler mit einem vorbereiteten Template"""
+    return [
+        (
+            key,
+            OptimizedKopfnotenExporter._render_einzeldokument(
+                template_path, table_engine, context, output_file, to_bytes
+            ),
+        )
+        for key, context, output_file in jobs
+    ]
+
+
 class OptimizedKopfnotenExporter:
     """Optimierter Exporter für horizontale 3-Zeilen-Tabellen mit korrekter erster Spalte"""
-    def __init__(self, db_path: str, school_year: str = DEFAULT_SCHOOL_YEAR, term: int = DEFAULT_TERM):
+    # Obergrenze für Worker-Prozesse beim parallelen Klassen-Export
+    MAX_EXPORT_WORKERS = 8
+    # Vorbereitete Templates (Pfad, mtime, Größe, Engine) -> (docx-Bytes, Platzhalter gefunden)
+    TEMPLATE_CACHE_SIZE = 8
+    _template_cache: "OrderedDict[Tuple[str, int, int, str], Tuple[bytes, bool]]" = OrderedDict()
+    _template_cache_lock = threading.Lock()
+
+    # Tabellen-Engine am DYNAMIC_TABLE_PLACEHOLDER:
+    #   "ooxml": w:tbl wird direkt per lxml aus den Notenzeilen erzeugt (Standard)
+    # Der frühere Jinja-Block mit create_table(...) rendert mit docxtpl nicht (keine
+    # do-Erweiterung, kein create_table im Kontext) und wird daher nicht mehr angeboten.
+    TABLE_ENGINES = ("ooxml",)
+    DEFAULT_TABLE_ENGINE = "ooxml"
+    DYNAMIC_TABLE_PLACEHOLDER = "{{! ! ! DYNAMIC_TABLE_PLACEHOLDER ! ! !}}"
+
+    # Einzelexport: Schüler je Worker-Auftrag (Fortschritt/Abbruch greifen zwischen den Aufträgen)
+    BULK_CHUNK_SIZE = 10
+    # Klassendokumente zusammenführen: None (einzeln), je Jahrgang oder ganze Schule
+    MERGE_MODES = (None, "jahrgang", "schule")
+
+    # (fach_lang, fach_kurz, fach_typ, WP-Belegung, WP-Gruppe) -> Fach-Flags (siehe _get_fach_meta)
+    _fach_meta_cache: Dict[Tuple, Tuple[str, bool, bool, Optional[str]]] = {}
+
+    def __init__(
+        self,
+        db_path: str,
+        school_year: str = DEFAULT_SCHOOL_YEAR,
+        term: int = DEFAULT_TERM,
+        read_only: bool = False,
+        table_engine: Optional[str] = None,
+    ):
         self.db_path = Path(db_path)
         self.conn = None
         self.logger = logging.getLogger("exporter")
         self.school_year = school_year
         self.term = int(term)
+        self.read_only = read_only
+        self.table_engine = table_engine or self.DEFAULT_TABLE_ENGINE
+        # Aktives ZIP-Paket während eines Export-Laufs (siehe ExportBundleWriter)
+        self._bundle: Optional[ExportBundleWriter] = None
+        # Gerenderte Klassendokumente für das Zusammenführen (siehe merge_docx_documents)
+        self._merge_parts: Optional[Dict[str, bytes]] = None
+        # Datenstand (daten_version) zu Beginn des Export-Laufs, wird im Export-Status vermerkt
+        self._daten_version: Optional[str] = None
+        # Fächer-Signatur -> Spaltenlayout (siehe _get_subject_layout)
+        self._layout_cache: Dict[Tuple, Tuple[Tuple[int, str, bool], ...]] = {}
+        if self.table_engine not in self.TABLE_ENGINES:
+            raise ValueError(
+                f"Unbekannte Tabellen-Engine: {self.table_engine} "
+                f"(unterstützt: {', '.join(self.TABLE_ENGINES)})"
+            )
         if not self.db_path.exists():
             raise FileNotFoundError(f"Datenbank nicht gefunden: {self.db_path}")
 
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path)
+        if self.read_only:
+            self.conn = sqlite3.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(self.db_path)
         self.conn.row_factory = sqlite3.Row
         return self
 
@@ -1238,144 +1596,147 @@ class OptimizedKopfnotenExporter:
         return int(match.group(1)) if match else None
 
     def _format_faecher_logic(self, rows, jahrgang: Optional[int]) -> Tuple[List[str], List[str], List[str]]:
-        """Zentrale Logik für Fächer-Filterung, Formatierung und Sortierung"""
-        regular_subjects = []
-        wp_subjects = []
-        
-        # Triaden-Status
-        triad_grades = {} # name -> {av, sv}
-        wpu_graded_list = [] # Liste der benoteten WPU-Fächer
-        
-        processed_rows = []
+        """
+        Zentrale Logik für Fächer-Filterung, Formatierung und Sortierung.
+
+        Die Spaltenanordnung (Triaden, WPU-Limit, Sortierung, Suffixe) hängt nur von
+        Fächern, Belegungen und davon ab, ob eine Note vorliegt – nicht von den Notenwerten.
+        Sie wird daher über eine Signatur gecacht (_get_subject_layout); Schüler mit gleicher
+        Belegung (Religion/Ethik-Wahl, WPU-Wahl) teilen sich ein Layout, pro Schüler werden
+        nur noch die Noten eingesetzt.
+        """
+        signature_rows = []
+        noten = []
         for row in rows:
-            row_dict = dict(row)
-            original_fach_lang = row_dict["fach_lang"]
-            fach_kurz = row_dict.get("fach_kurz")
-            fach_typ = row_dict.get("fach_typ")
-            
-            # Canonical name lookup
-            fach_lang = FAECHER_MAPPING.get(original_fach_lang, original_fach_lang)
-            
-            is_wp = bool(row_dict.get("ist_wahlpflicht_belegung", 0))
-            wp_gruppe = row_dict.get("wahlpflicht_gruppe")
-            
-            av_val = row_dict["note_av"]
-            sv_val = row_dict["note_sv"]
-            av_special = row_dict.get("note_av_special")
-            sv_special = row_dict.get("note_sv_special")
+            av_val = row["note_av"]
+            sv_val = row["note_sv"]
+            av_special = row["note_av_special"]
+            sv_special = row["note_sv_special"]
             av_note = av_special if av_special is not None else (str(av_val) if av_val is not None else "-")
             sv_note = sv_special if sv_special is not None else (str(sv_val) if sv_val is not None else "-")
+            has_grade = av_val is not None or sv_val is not None or av_special is not None or sv_special is not None
+            signature_rows.append(self._get_fach_meta(row) + (has_grade,))
+            noten.append((av_note, sv_note))
+
+        layout = self._get_subject_layout(tuple(signature_rows), jahrgang)
+
+        faecher_spalten = []
+        av_noten = []
+        sv_noten = []
+        for index, display, blocked in layout:
+            faecher_spalten.append(display)
+            av_noten.append("/" if blocked else noten[index][0])
+            sv_noten.append("/" if blocked else noten[index][1])
+        return faecher_spalten, av_noten, sv_noten
+
+    @classmethod
+    def _get_fach_meta(cls, row) -> Tuple[str, bool, bool, Optional[str]]:
+        """Kanonischer Fachname und Fach-Flags einer Notenzeile: (fach_lang, is_wpu, is_rel_triad, wp_gruppe)"""
+        key = (
+            row["fach_lang"],
+            row["fach_kurz"],
+            row["fach_typ"],
+            bool(row["ist_wahlpflicht_belegung"]),
+            row["wahlpflicht_gruppe"],
+        )
+        meta = cls._fach_meta_cache.get(key)
+        if meta is None:
+            original_fach_lang, fach_kurz, fach_typ, is_wp, wp_gruppe = key
+
+            # Canonical name lookup
+            fach_lang = FAECHER_MAPPING.get(original_fach_lang, original_fach_lang)
 
             is_rel_triad = (fach_kurz == "Ethik") or (fach_kurz == "Religion" and fach_typ in ["evangelisch", "katholisch"])
-            
+
             config_status = SUBJECT_STATUS_CONFIG.get(fach_lang, "")
             is_wpu_config = "WPU" in config_status
             is_wpu = is_wp or any(p in (wp_gruppe or "") for p in ["WPU", "WP"]) or is_wpu_config
 
-            if is_rel_triad and (av_val is not None or sv_val is not None or av_special is not None or sv_special is not None):
-                triad_grades[fach_lang] = {"av": av_note, "sv": sv_note}
-            if is_wpu and (av_val is not None or sv_val is not None or av_special is not None or sv_special is not None):
-                if fach_lang not in wpu_graded_list:
-                    wpu_graded_list.append(fach_lang)
+            meta = (fach_lang, is_wpu, is_rel_triad, wp_gruppe)
+            cls._fach_meta_cache[key] = meta
+        return meta
 
-            processed_rows.append({
-                "fach_lang": fach_lang,
-                "fach_kurz": fach_kurz,
-                "fach_typ": fach_typ,
-                "is_wp": is_wp,
-                "is_wpu": is_wpu,
-                "is_rel_triad": is_rel_triad,
-                "av_note": av_note,
-                "sv_note": sv_note,
-                "wp_gruppe": wp_gruppe
-            })
+    def _get_subject_layout(self, signature_rows: Tuple, jahrgang: Optional[int]) -> Tuple[Tuple[int, str, bool], ...]:
+        """
+        Liefert das (gecachte) Spaltenlayout: (Zeilenindex, Anzeigename, durch Triade gesperrt).
+
+        signature_rows: je Notenzeile (fach_lang, is_wpu, is_rel_triad, wp_gruppe, has_grade)
+        """
+        signature = (jahrgang, signature_rows)
+        layout = self._layout_cache.get(signature)
+        if layout is None:
+            layout = self._build_subject_layout(signature_rows, jahrgang)
+            self._layout_cache[signature] = layout
+        return layout
+
+    @staticmethod
+    def _build_subject_layout(entries, jahrgang: Optional[int]) -> Tuple[Tuple[int, str, bool], ...]:
+        """Berechnet Triaden, WPU-Limit, Suffixe und Sortierung für eine Fächer-Signatur"""
+        regular_subjects = []
+        wp_subjects = []
+
+        # Triaden-Status: benotete Religion/Ethik-Fächer
+        triad_grades = set()
+        wpu_graded_list = [] # Liste der benoteten WPU-Fächer
+        for fach_lang, is_wpu, is_rel_triad, _, has_grade in entries:
+            if is_rel_triad and has_grade:
+                triad_grades.add(fach_lang)
+            if is_wpu and has_grade and fach_lang not in wpu_graded_list:
+                wpu_graded_list.append(fach_lang)
 
-        # Triaden-Sicherstellung
-        triad_names = ["Ethik", "Religion (ev)", "Religion (kath)"]
-        
         # WPU Limit ermitteln
         wpu_limit = 2 if jahrgang and jahrgang >= 9 else 1
-        
-        # Determine allowed WPUs (Top N graded ones)
-        # Sort key could be added here if needed, currently implicit by encounter order or alphabetic?
-        # Better sort alphabetically to be deterministic
+
+        # Determine allowed WPUs (Top N graded ones), alphabetisch für deterministische Auswahl
         wpu_graded_list.sort()
         allowed_wpus = wpu_graded_list[:wpu_limit]
-        
-        final_rows = []
-        for p_row in processed_rows:
-            keep_row = True
-            
-            if p_row["is_rel_triad"]:
-                # Logic logic for Triad (stays same: "/" if other has grade)
-                has_any_triad_grade = bool(triad_grades)
-                if has_any_triad_grade and p_row["fach_lang"] not in triad_grades:
-                     p_row["av_note"] = "/"
-                     p_row["sv_note"] = "/"
-            
-            elif p_row["is_wpu"]:
+
+        for index, (fach_lang, is_wpu, is_rel_triad, wp_gruppe, has_grade) in enumerate(entries):
+            blocked = False
+            if is_rel_triad:
+                # Triade: "/" wenn ein anderes Fach der Triade benotet ist
+                if triad_grades and fach_lang not in triad_grades:
+                    blocked = True
+            elif is_wpu:
                 # WPU-Ausschluss basierend auf Limit:
                 # Wir behalten NUR die Fächer, die in `allowed_wpus` sind.
-                # Alles andere (z.B. Ungradierte WPU Platzhalter oder überschüssige) FLIEGT RAUS. (nicht nur "/")
-                # Außer wir haben GAR KEINE Noten (wpu_graded_list ist leer).
-                
+                # Ohne WPU-Noten fliegen ungradierte Platzhalter raus.
                 if allowed_wpus:
-                    if p_row["fach_lang"] not in allowed_wpus:
-                        keep_row = False
-                else:
-                    # Wenn keine WPU Noten da sind -> Ungradierte placeholders rausnehmen
-                    if p_row["av_note"] == "-" and p_row["sv_note"] == "-":
-                        keep_row = False
+                    if fach_lang not in allowed_wpus:
+                        continue
+                elif not has_grade:
+                    continue
 
-            if keep_row:
-                final_rows.append(p_row)
-        
-        # Output Lists preparation
-        # Wir müssen die final_rows nun in regular_subjects und wp_subjects aufteilen für den Docx Export
-        
-        for p_row in final_rows:
-            fach_lang = p_row["fach_lang"]
-            av_note = p_row["av_note"]
-            sv_note = p_row["sv_note"]
-            
-            # Skip if filtered (should be handled by final_rows, but check for safety)
-            
-            if p_row["is_wpu"]:
+            if is_wpu:
                 # WPU-Logik nach Jahrgang
                 if jahrgang in [5, 6]:
-                     regular_subjects.append({"display": fach_lang, "av": av_note, "sv": sv_note})
+                    regular_subjects.append({"index": index, "display": fach_lang, "blocked": blocked})
                 elif jahrgang in [7, 8]:
                     wp_subjects.append({
+                        "index": index,
                         "display": f"{fach_lang} (WPU1)", # Exportiert mit Suffix (WPU1)
-                        "av": av_note,
-                        "sv": sv_note,
+                        "blocked": blocked,
                         "sort_key": (1, fach_lang)
                     })
                 elif jahrgang in [9, 10]:
-                    # determine group
-                    best_group = "WPU2" if (p_row["wp_gruppe"] and "2" in str(p_row["wp_gruppe"])) else "WPU1"
-                    # IF we have 2, logic ensures they are both allowed.
-                    # We need to ensure we don't map both to WPU1 if they are distinct.
-                    # The `allowed_wpus` list maintains order.
-                    # Simple heuristic: first in list is WPU1, second is WPU2.
-                    
+                    # Gruppe: erstes benotetes WPU-Fach ist WPU1, zweites WPU2
+                    best_group = "WPU2" if (wp_gruppe and "2" in str(wp_gruppe)) else "WPU1"
                     try:
                         idx = wpu_graded_list.index(fach_lang)
                         best_group = "WPU1" if idx == 0 else "WPU2"
                     except ValueError:
                         pass # keep default
-                        
+
                     wp_subjects.append({
+                        "index": index,
                         "display": f"{fach_lang} ({best_group})", # Suffix (WPU1) oder (WPU2)
-                        "av": av_note,
-                        "sv": sv_note,
-                        "group": best_group, 
+                        "blocked": blocked,
                         "sort_key": (1 if best_group == "WPU1" else 2, fach_lang)
                     })
                 else:
-                    regular_subjects.append({"display": fach_lang, "av": av_note, "sv": sv_note})
+                    regular_subjects.append({"index": index, "display": fach_lang, "blocked": blocked})
             else:
-                regular_subjects.append({"display": fach_lang, "av": av_note, "sv": sv_note})
+                regular_subjects.append({"index": index, "display": fach_lang, "blocked": blocked})
 
         # Sortierung
         priority = {
@@ -1395,127 +1756,181 @@ class OptimizedKopfnotenExporter:
         regular_subjects.sort(key=regular_sort_key)
         wp_subjects.sort(key=lambda x: x.get("sort_key", (10, x["display"])))
 
-        all_entries = regular_subjects + wp_subjects
-        
-        return (
-            [e["display"] for e in all_entries],
-            [e["av"] for e in all_entries],
-            [e["sv"] for e in all_entries]
-        )
+        return tuple((e["index"], e["display"], e["blocked"]) for e in regular_subjects + wp_subjects)
 
 
-    def _process_template_with_context(self, template_path: Path, context: Dict[str, Any], output_file: Path) -> None:
+    def _process_template_with_context(
+        self,
+        template_path: Path,
+        context: Dict[str, Any],
+        output_file: Path,
+        zeiten: Optional[Dict[str, float]] = None,
+    ) -> None:
         """Process a template with dynamic table creation for each student
-        
+
         Args:
             template_path: Path to the template file
             context: Context data for template rendering
             output_file: Path where to save the output file
+            zeiten: optional dict that receives the "render" and "save" durations
         """
-        original_cwd = os.getcwd()
-        temp_dir = None
-        
         try:
-            # Create temporary directory
-            temp_dir = Path(tempfile.mkdtemp())
-            self.logger.info(f"Created temp directory: {temp_dir}")
-            
-            # Copy template to temp directory
-            temp_template = temp_dir / template_path.name
-            shutil.copy2(template_path, temp_template)
-            self.logger.info(f"Template copied to temp directory, size: {temp_template.stat().st_size} bytes")
-            
-            # Change to temp directory
-            os.chdir(temp_dir)
-            self.logger.info(f"Changed working directory to: {temp_dir}")
-            
-            # Modify the template to include dynamic table creation code and get buffer
-            # Decoupled approach: python-docx modifies -> buffer -> docxtpl reads buffer
-            template_buffer = self._prepare_dynamic_template(temp_template)
-            
-            # Generate template filename with timestamp to avoid conflicts
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            temp_docxtpl = f"temp_template_{timestamp}.docx"
-            
-            # Initialize DocxTemplate with the buffer
-            template = DocxTemplate(template_buffer)
-            self.logger.info(f"DocxTemplate initialized with memory buffer")
-            
-            # Render template with context
-            template.render(context)
-            
-            # Change back to original directory before saving
-            os.chdir(original_cwd)
-            self.logger.info(f"Changed back to original directory (cleanup): {original_cwd}")
-            
-            # Save output
-            template.save(str(output_file))
+            self.render_document(template_path, context, output_file, self.table_engine, zeiten)
             self.logger.info(f"Output saved to: {output_file}")
-            
         except Exception as e:
             self.logger.error(f"Error processing template: {e}")
             raise
-            
-        finally:
-            # Clean up
-            try:
-                if original_cwd:
-                    os.chdir(original_cwd)
-                if temp_dir and temp_dir.exists():
-                    shutil.rmtree(temp_dir)
-                self.logger.info("Temporäre Dateien bereinigt")
-            except Exception as cleanup_error:
-                self.logger.warning(f"Warning during cleanup: {cleanup_error}")
-                
-    def _prepare_dynamic_template(self, template_path: Path) -> io.BytesIO:
+
+    @classmethod
+    def render_document(
+        cls,
+        template_path: Path,
+        context: Dict[str, Any],
+        output_file,
+        table_engine: str = DEFAULT_TABLE_ENGINE,
+        zeiten: Optional[Dict[str, float]] = None,
+    ) -> None:
+        """Rendert ein Dokument aus dem (gecachten) vorbereiteten Template; ohne DB-Zugriff.
+
+        output_file ist ein Pfad oder ein beschreibbarer Stream (z. B. BytesIO für ZIP-Pakete).
+        In zeiten landen (falls übergeben) die Dauer von "render" und "save" in Sekunden.
+        """
+        started = time.perf_counter()
+        # Vorbereitetes Template aus dem Cache klonen (kein Temp-Ordner, kein os.chdir)
+        prepared, has_placeholder = cls._get_prepared_template(template_path, table_engine)
+        if has_placeholder and table_engine == "ooxml":
+            for schueler in context.get("schueler_liste") or []:
+                schueler["tabelle_ooxml"] = cls._render_grade_table_xml(schueler)
+        template = DocxTemplate(io.BytesIO(prepared))
+        template.render(context)
+        rendered = time.perf_counter()
+        template.save(output_file if hasattr(output_file, "write") else str(output_file))
+        if zeiten is not None:
+            zeiten["render"] = rendered - started
+            zeiten["save"] = time.perf_counter() - rendered
+
+    @classmethod
+    def _get_prepared_template(cls, template_path: Path, engine: str = DEFAULT_TABLE_ENGINE) -> Tuple[bytes, bool]:
+        """
+        Liefert das vorbereitete Template (Platzhalter durch die Tabellen-Engine ersetzt) als
+        Bytes sowie ob der Platzhalter gefunden wurde.
+
+        Gecacht pro Pfad, Änderungszeit, Größe und Engine; ein geändertes Template wird beim
+        nächsten Export automatisch neu vorbereitet. Jeder Render-Vorgang arbeitet auf einer
+        eigenen Kopie.
+        """
+        template_path = Path(template_path).resolve()
+        stat = template_path.stat()
+        key = (str(template_path), stat.st_mtime_ns, stat.st_size, engine)
+        with cls._template_cache_lock:
+            cached = cls._template_cache.get(key)
+            if cached is not None:
+                cls._template_cache.move_to_end(key)
+                return cached
+
+        buffer, has_placeholder = cls._prepare_dynamic_template(template_path, engine)
+        prepared = (buffer.getvalue(), has_placeholder)
+
+        with cls._template_cache_lock:
+            # Ältere Stände desselben Templates verwerfen
+            for old_key in [k for k in cls._template_cache if k[0] == key[0] and k[3] == engine]:
+                del cls._template_cache[old_key]
+            cls._template_cache[key] = prepared
+            while len(cls._template_cache) > cls.TEMPLATE_CACHE_SIZE:
+                cls._template_cache.popitem(last=False)
+        return prepared
+
+    @staticmethod
+    def _render_grade_table_xml(schueler: Dict[str, Any]) -> str:
+        """
+        Erzeugt die horizontale Notentabelle eines Schülers direkt als w:tbl (OOXML).
+
+        Stil "Table Grid", feste Spaltenbreiten (1 Zoll Beschriftung, 7 Zoll verteilt
+        auf die Fächer), erste Spalte fett. Ohne Fächer wird ein leerer Absatz geliefert.
+        """
+        faecher_count = schueler.get("faecher_anzahl") or 0
+        if faecher_count <= 0:
+            return f'<w:p xmlns:w="{_W_NS}"/>'
+
+        label_width = 1440  # 1 Zoll in Twips
+        data_width = int(7 * 1440 / faecher_count)
+        widths = [label_width] + [data_width] * faecher_count
+        rows = [
+            ["Fach"] + [str(v) for v in schueler["faecher_spalten"][:faecher_count]],
+            ["AV"] + [str(v) for v in schueler["av_noten"][:faecher_count]],
+            ["SV"] + [str(v) for v in schueler["sv_noten"][:faecher_count]],
+        ]
+
+        tbl = etree.Element(_w("tbl"), nsmap={"w": _W_NS})
+        tbl_pr = etree.SubElement(tbl, _w("tblPr"))
+        etree.SubElement(tbl_pr, _w("tblStyle"), {_w("val"): "TableGrid"})
+        etree.SubElement(tbl_pr, _w("tblW"), {_w("w"): "0", _w("type"): "auto"})
+        # Rahmen wie "Table Grid", falls das Template den Stil nicht mitbringt
+        borders = etree.SubElement(tbl_pr, _w("tblBorders"))
+        for side in ("top", "left", "bottom", "right", "insideH", "insideV"):
+            etree.SubElement(
+                borders, _w(side), {_w("val"): "single", _w("sz"): "4", _w("space"): "0", _w("color"): "auto"}
+            )
+        etree.SubElement(tbl_pr, _w("tblLayout"), {_w("type"): "fixed"})
+        etree.SubElement(
+            tbl_pr,
+            _w("tblLook"),
+            {_w("val"): "04A0", _w("firstRow"): "1", _w("lastRow"): "0", _w("firstColumn"): "1",
+             _w("lastColumn"): "0", _w("noHBand"): "0", _w("noVBand"): "1"},
+        )
+        grid = etree.SubElement(tbl, _w("tblGrid"))
+        for width in widths:
+            etree.SubElement(grid, _w("gridCol"), {_w("w"): str(width)})
+
+        for values in rows:
+            tr = etree.SubElement(tbl, _w("tr"))
+            for col, (value, width) in enumerate(zip(values, widths)):
+                tc = etree.SubElement(tr, _w("tc"))
+                tc_pr = etree.SubElement(tc, _w("tcPr"))
+                etree.SubElement(tc_pr, _w("tcW"), {_w("w"): str(width), _w("type"): "dxa"})
+                r = etree.SubElement(etree.SubElement(tc, _w("p")), _w("r"))
+                if col == 0:
+                    etree.SubElement(etree.SubElement(r, _w("rPr")), _w("b"))
+                t = etree.SubElement(r, _w("t"))
+                t.text = value
+                if value != value.strip():
+                    t.set("{http://www.w3.org/XML/1998/namespace}space", "preserve")
+
+        return etree.tostring(tbl, encoding="unicode")
+
+    @classmethod
+    def _prepare_dynamic_template(
+        cls, template_path: Path, engine: str = DEFAULT_TABLE_ENGINE
+    ) -> Tuple[io.BytesIO, bool]:
         """Modifies the template file to include dynamic code and returns a BytesIO buffer
         
         Args:
             template_path: Path to the template file
+            engine: "ooxml" (fertige w:tbl je Schüler über {{p schueler.tabelle_ooxml }})
             
         Returns:
-            io.BytesIO: Buffer containing the modified docx file
+            Tuple[io.BytesIO, bool]: Buffer containing the modified docx file and whether
+            the placeholder was found
         """
+        if engine not in cls.TABLE_ENGINES:
+            raise ValueError(
+                f"Unbekannte Tabellen-Engine: {engine} (unterstützt: {', '.join(cls.TABLE_ENGINES)})"
+            )
         try:
             from docx import Document
-            from docx.shared import Inches
             import io
             
             # Read the template as a docx file using python-docx
             doc = Document(template_path)
             
             # Find paragraphs containing the placeholder
-            placeholder_text = "{{! ! ! DYNAMIC_TABLE_PLACEHOLDER ! ! !}}"
+            placeholder_text = cls.DYNAMIC_TABLE_PLACEHOLDER
+            has_placeholder = False
             for p in doc.paragraphs:
                 if placeholder_text in p.text:
-                    # Replace the placeholder with Jinja2 code for dynamic table creation
-                    p.text = ""
-                    run = p.add_run("""
-{%- set faecher_count = schueler.faecher_anzahl -%}
-{%- if faecher_count > 0 -%}
-    {# Create a new table with exact column count #}
-    {%- set new_table = create_table(rows=3, cols=faecher_count+1) -%}
-    {%- do new_table.style = 'Table Grid' -%}
-    {%- do new_table.autofit = False -%}
-    
-    {# Set column headers in first column #}
-    {%- do new_table.cell(0, 0).paragraphs[0].add_run('Fach').bold = True -%}
-    {%- do new_table.cell(1, 0).paragraphs[0].add_run('AV').bold = True -%}
-    {%- do new_table.cell(2, 0).paragraphs[0].add_run('SV').bold = True -%}
-    
-    {# Calculate column widths: fixed total width (8 inches) #}
-    {%- do new_table.column(0).width = Inches(1) -%}
-    {%- set data_col_width = Inches(7) / faecher_count -%}
-    
-    {# Create data columns and fill with content #}
-    {%- for i in range(faecher_count) -%}
-        {%- do new_table.column(i+1).width = data_col_width -%}
-        {%- do new_table.cell(0, i+1).paragraphs[0].add_run(schueler.faecher_spalten[i]) -%}
-        {%- do new_table.cell(1, i+1).paragraphs[0].add_run(schueler.av_noten[i]) -%}
-        {%- do new_table.cell(2, i+1).paragraphs[0].add_run(schueler.sv_noten[i]) -%}
-    {%- endfor -%}
-{%- endif -%}
-""")
+                    # Absatz wird beim Rendern komplett durch die Tabelle ersetzt
+                    p.text = "{{p schueler.tabelle_ooxml }}"
+                    has_placeholder = True
                     break
             
             # Save the modified template to a BytesIO buffer
@@ -1523,17 +1938,56 @@ class OptimizedKopfnotenExporter:
             doc.save(buffer)
             buffer.seek(0)
             
-            self.logger.info(f"Template modified in-memory and saved to buffer")
-            return buffer
+            logging.getLogger("exporter").info(f"Template modified in-memory and saved to buffer")
+            return buffer, has_placeholder
             
         except Exception as e:
-            self.logger.error(f"Error preparing dynamic template: {e}")
+            logging.getLogger("exporter").error(f"Error preparing dynamic template: {e}")
             raise
 
     def export_horizontal_tables(
-        self, output_dir: Path, template_path: Path, klassen_liste: List[str], schueler_id: Optional[int] = None, export_date: Optional[str] = None
+        self,
+        output_dir: Path,
+        template_path: Path,
+        klassen_liste: List[str],
+        schueler_id: Optional[int] = None,
+        export_date: Optional[str] = None,
+        parallel: bool = False,
+        max_workers: Optional[int] = None,
+        on_class_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        only_changed: bool = False,
+        bundle: bool = False,
+        merge: Optional[str] = None,
+        on_event: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
     ) -> Dict[str, Any]:
-        """Exportiert horizontale 3-Zeilen-Tabellen für ausgewählte Klassen oder einen einzelnen Schüler"""
+        """
+        Exportiert horizontale 3-Zeilen-Tabellen für ausgewählte Klassen oder einen einzelnen Schüler.
+
+        Mit parallel=True werden die Klassen in Worker-Prozessen gerendert (je Prozess eine
+        eigene Read-only-Verbindung). on_class_done(klasse, ergebnis) wird nach jeder fertigen
+        Klasse aufgerufen – bei parallelem Export in Fertigstellungsreihenfolge.
+
+        Mit only_changed=True werden Klassen übersprungen, deren Noten, Schüler und Template
+        sich seit dem letzten Export (gleiches Template, gleiche Periode, Datei noch vorhanden)
+        nicht geändert haben; sie stehen in summary["uebersprungen"].
+
+        Mit bundle=True landen alle Klassendokumente samt manifest.json in einem ZIP-Paket
+        (summary["bundle_file"]) statt als Einzeldateien im Ausgabeverzeichnis; only_changed
+        wird dabei ignoriert, da ein Paket immer vollständig sein soll.
+
+        Mit merge="jahrgang" bzw. merge="schule" werden die Klassendokumente (weiterhin
+        parallel gerendert) zu einem Dokument je Jahrgang bzw. für die ganze Schule
+        zusammengeführt (summary["zusammengefuehrt"]); auch hier gilt only_changed nicht.
+
+        on_event(ereignis, klasse, daten) meldet je Klasse "gestartet", "gerendert",
+        "gespeichert" bzw. "fehlgeschlagen"; daten["zeiten"] enthält die Phasen query, layout,
+        render und save (Summen in summary["zeiten"]). Ist cancel_event gesetzt, wird nach der
+        aktuellen Klasse abgebrochen (summary["abgebrochen"]); bereits fertige Klassen bleiben
+        erhalten, ZIP-Paket und Sammeldokumente werden mit ihnen abgeschlossen.
+        """
+        if merge not in self.MERGE_MODES:
+            raise ValueError(f"Unbekannter Zusammenführungs-Modus: {merge}")
         output_dir = Path(output_dir)
         template_path = Path(template_path).resolve()
         if not template_path.exists():
@@ -1554,6 +2008,9 @@ class OptimizedKopfnotenExporter:
             "schueler_details": {},
             "start_time": datetime.now(),
             "export_mode": "horizontal_optimized",
+            "uebersprungen": {},
+            "abgebrochen": False,
+            "zeiten": {"query": 0.0, "layout": 0.0, "render": 0.0, "save": 0.0},
         }
 
         try:
@@ -1582,44 +2039,516 @@ class OptimizedKopfnotenExporter:
                     summary["gesamt_fehler"] += 1
             # Sonst exportiere alle ausgewählten Klassen
             else:
-                for klasse in klassen_liste:
+                if bundle:
+                    self._bundle = ExportBundleWriter(
+                        output_dir, f"Kopfnoten_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+                    )
+                if merge:
+                    self._merge_parts = {}
+                remaining = list(klassen_liste)
+                klassen_daten: Dict[str, List[Dict[str, Any]]] = {}
+                phasen: Dict[str, Dict[str, float]] = {}
+                # Vor dem Laden der Daten lesen: spätere Änderungen gelten als neuer Stand
+                self._daten_version = self._current_daten_version()
+                if only_changed and not bundle and not merge and remaining:
+                    remaining, summary["uebersprungen"], klassen_daten = self._filter_changed_klassen(
+                        remaining, output_dir, template_path, zeiten=phasen
+                    )
+                    if summary["uebersprungen"]:
+                        self.logger.info(f"Unveränderte Klassen übersprungen: {', '.join(summary['uebersprungen'])}")
+                if parallel and len(remaining) > 1:
+                    remaining = self._export_klassen_parallel(
+                        remaining,
+                        output_dir,
+                        template_path,
+                        export_date,
+                        summary,
+                        max_workers,
+                        on_class_done,
+                        on_event,
+                        cancel_event,
+                    )
+                # Eine Abfrage für alle verbleibenden Klassen statt 1+N je Klasse; erst nach dem
+                # parallelen Export (die Worker laden selbst), beim Vergleich geladene Daten bleiben
+                fehlend = [klasse for klasse in remaining if klasse not in klassen_daten]
+                if fehlend and not self._export_cancelled(cancel_event, summary):
+                    klassen_daten.update(self._get_klassen_horizontal(fehlend, zeiten=phasen))
+                for klasse in remaining:
+                    if self._export_cancelled(cancel_event, summary):
+                        break
                     self.logger.info(f"Exportiere Klasse horizontal: {klasse}")
+                    self._emit_export_event(on_event, "gestartet", klasse, {})
                     klassen_result = self._export_klasse_horizontal_optimized(
-                        klasse, output_dir, template_path, export_date
+                        klasse,
+                        output_dir,
+                        template_path,
+                        export_date,
+                        klassen_daten.get(klasse, []),
+                        to_bytes=self._collects_bytes(),
+                        zeiten=phasen.get(klasse),
                     )
-                    summary["klassen_details"][klasse] = klassen_result
-                    if klassen_result["datei_erstellt"]:
-                        summary["gesamt_dateien"] += 1
-                    else:
-                        summary["gesamt_fehler"] += 1
+                    self._record_klassen_result(
+                        summary, klasse, klassen_result, on_class_done, template_path, on_event
+                    )
+                if summary["abgebrochen"]:
+                    self.logger.info(
+                        f"Export abgebrochen nach {len(summary['klassen_details'])}/{len(klassen_liste)} Klassen"
+                    )
+
+                if self._merge_parts is not None:
+                    self._write_merged_documents(summary, merge, klassen_liste, output_dir)
+                if self._bundle is not None:
+                    summary["bundle_file"] = str(
+                        self._bundle.finalize(self._build_bundle_manifest(summary, template_path, export_date))
+                    )
+                    self.logger.info(f"ZIP-Paket erstellt: {summary['bundle_file']}")
         except Exception as e:
             self.logger.error(f"Fehler beim Export: {e}")
             summary["gesamt_fehler"] += 1
+        finally:
+            self._merge_parts = None
+            self._daten_version = None
+            if self._bundle is not None:
+                self._bundle.abort()
+                self._bundle = None
 
         summary["end_time"] = datetime.now()
         summary["duration"] = summary["end_time"] - summary["start_time"]
         return summary
 
+    @staticmethod
+    def _export_cancelled(cancel_event: Optional[threading.Event], summary: Dict[str, Any]) -> bool:
+        """Prüft den Abbruch-Token und vermerkt einen Abbruch in der Zusammenfassung"""
+        if cancel_event is not None and cancel_event.is_set():
+            summary["abgebrochen"] = True
+            return True
+        return False
+
+    def _emit_export_event(
+        self,
+        on_event: Optional[Callable[[str, str, Dict[str, Any]], None]],
+        ereignis: str,
+        klasse: str,
+        daten: Dict[str, Any],
+    ) -> None:
+        """Reicht ein Fortschrittsereignis weiter; Fehler im Empfänger brechen den Export nicht ab"""
+        if not on_event:
+            return
+        try:
+            on_event(ereignis, klasse, daten)
+        except Exception as e:
+            self.logger.warning(f"Fortschrittsereignis {ereignis} für {klasse} fehlgeschlagen: {e}")
+
+    def _collects_bytes(self) -> bool:
+        """True, wenn Klassendokumente im Speicher gesammelt statt als Datei gespeichert werden"""
+        return self._bundle is not None or self._merge_parts is not None
+
+    def _write_merged_documents(
+        self, summary: Dict[str, Any], merge: str, klassen_liste: List[str], output_dir: Path
+    ) -> None:
+        """Führt die gesammelten Klassendokumente je Jahrgang bzw. Schule zusammen"""
+        gruppen: Dict[str, List[str]] = {}
+        for klasse in klassen_liste:
+            if klasse not in self._merge_parts:
+                continue
+            if merge == "jahrgang":
+                jahrgang = self._extract_jahrgang(klasse)
+                label = f"Jahrgang_{jahrgang:02d}" if jahrgang is not None else "Jahrgang_unbekannt"
+            else:
+                label = "Schule"
+            gruppen.setdefault(label, []).append(klasse)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary["zusammengefuehrt"] = {}
+        summary["gesamt_dateien"] = 0
+        for label, klassen in gruppen.items():
+            name = f"Kopfnoten_{label}_{timestamp}.docx"
+            try:
+                if self._bundle is not None:
+                    buffer = io.BytesIO()
+                    merge_docx_documents([self._merge_parts[k] for k in klassen], buffer)
+                    name = self._bundle.add(name, buffer.getvalue())
+                    output_file = name
+                else:
+                    target = output_dir / name
+                    partial = output_dir / f".{name}.part"
+                    try:
+                        merge_docx_documents([self._merge_parts[k] for k in klassen], partial)
+                        os.replace(partial, target)
+                    finally:
+                        if partial.exists():
+                            partial.unlink()
+                    output_file = str(target)
+            except Exception as e:
+                fehler = f"Zusammenführen {label} fehlgeschlagen: {e}"
+                self.logger.error(fehler)
+                summary["gesamt_fehler"] += 1
+                for klasse in klassen:
+                    summary["klassen_details"][klasse].update(datei_erstellt=False, output_file=None, fehler=fehler)
+                continue
+            summary["gesamt_dateien"] += 1
+            summary["zusammengefuehrt"][label] = {"datei": output_file, "klassen": klassen}
+            for klasse in klassen:
+                summary["klassen_details"][klasse]["output_file"] = output_file
+            self.logger.info(f"{label}: {len(klassen)} Klassen zusammengeführt -> {output_file}")
+
+    @staticmethod
+    def _compute_klassen_hash(schueler_liste: List[Dict[str, Any]]) -> str:
+        """Datenstand einer Klasse: Hash über die Render-Eingabe (Schüler, Fächer, Noten)"""
+        payload = [
+            {k: v for k, v in schueler.items() if k != "tabelle_ooxml"}
+            for schueler in schueler_liste
+        ]
+        return hashlib.sha1(
+            json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def _template_version(self, template_path: Path) -> str:
+        """Template-Stand für den Export-Status: Änderungszeit, Größe und Tabellen-Engine"""
+        stat = Path(template_path).stat()
+        return f"{stat.st_mtime_ns}-{stat.st_size}-{self.table_engine}"
+
+    def _current_daten_version(self) -> Optional[str]:
+        """Datenstand der Periode aus daten_version ("Periode.Schüler"); None ohne Versionstabelle"""
+        try:
+            versions = dict(
+                ((sy, int(t)), v)
+                for sy, t, v in self.conn.execute(
+                    """
+                    SELECT schuljahr, halbjahr, version FROM daten_version
+                    WHERE (schuljahr = ? AND halbjahr = ?) OR (schuljahr = '*' AND halbjahr = 0)
+                    """,
+                    (self.school_year, self.term),
+                )
+            )
+        except sqlite3.Error:
+            return None
+        return f"{versions.get((self.school_year, self.term), 0)}.{versions.get(('*', 0), 0)}"
+
+    def _load_export_status(self, template_path: Path) -> Dict[str, sqlite3.Row]:
+        """Letzter Export je Klasse für dieses Template und die aktive Periode"""
+        try:
+            cursor = self.conn.execute(
+                """
+                SELECT klasse, template_version, daten_hash, output_file, exported_at, daten_version
+                FROM export_status
+                WHERE schuljahr = ? AND halbjahr = ? AND template_pfad = ?
+                """,
+                (self.school_year, self.term, str(Path(template_path).resolve())),
+            )
+            return {row["klasse"]: row for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            self.logger.warning(f"Export-Status konnte nicht gelesen werden: {e}")
+            return {}
+
+    def _save_export_status(self, klasse: str, template_path: Path, klassen_result: Dict[str, Any]) -> None:
+        """Merkt sich den gerenderten Datenstand einer Klasse (nur bei schreibbarer Verbindung)"""
+        if self.read_only or not klassen_result.get("daten_hash"):
+            return
+        try:
+            self.conn.execute(
+                """
+                INSERT OR REPLACE INTO export_status
+                    (klasse, schuljahr, halbjahr, template_pfad, template_version, daten_hash, output_file,
+                     exported_at, daten_version)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    klasse,
+                    self.school_year,
+                    self.term,
+                    str(Path(template_path).resolve()),
+                    self._template_version(template_path),
+                    klassen_result["daten_hash"],
+                    klassen_result["output_file"],
+                    datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    self._daten_version,
+                ),
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Export-Status für {klasse} konnte nicht gespeichert werden: {e}")
+
+    def _filter_changed_klassen(
+        self,
+        klassen_liste: List[str],
+        output_dir: Path,
+        template_path: Path,
+        zeiten: Optional[Dict[str, Dict[str, float]]] = None,
+    ) -> Tuple[List[str], Dict[str, str], Dict[str, List[Dict[str, Any]]]]:
+        """
+        Teilt Klassen in geänderte (zu exportieren) und unveränderte (Klasse -> letzter Export);
+        dazu die für den Vergleich bereits geladenen Klassendaten.
+
+        Vorprüfung ohne Datenabfrage: Ist seit dem letzten Export weder die daten_version der
+        Periode (Noten, Schüler und Fächer) noch das Template geändert, gilt die Klasse als
+        unverändert. Nur die übrigen
+        Klassen werden geladen und über den Hash der Render-Eingabe verglichen (z. B. nach
+        Änderungen in anderen Klassen derselben Periode).
+        """
+        status = self._load_export_status(template_path)
+        template_version = self._template_version(template_path)
+        output_dir = Path(output_dir).resolve()
+
+        def last_export_usable(last) -> bool:
+            return (
+                last is not None
+                and last["template_version"] == template_version
+                and bool(last["output_file"])
+                and Path(last["output_file"]).parent == output_dir
+                and Path(last["output_file"]).exists()
+            )
+
+        skipped = {}
+        to_hash = []
+        klassen_daten: Dict[str, List[Dict[str, Any]]] = {}
+        for klasse in klassen_liste:
+            last = status.get(klasse)
+            if not last_export_usable(last):
+                continue
+            if self._daten_version is not None and last["daten_version"] == self._daten_version:
+                skipped[klasse] = last["exported_at"]
+            else:
+                to_hash.append(klasse)
+
+        if to_hash:
+            klassen_daten = self._get_klassen_horizontal(to_hash, zeiten=zeiten)
+            for klasse in to_hash:
+                schueler_liste = klassen_daten.get(klasse, [])
+                if schueler_liste and status[klasse]["daten_hash"] == self._compute_klassen_hash(schueler_liste):
+                    skipped[klasse] = status[klasse]["exported_at"]
+                    # Neuen Datenstand vermerken, damit die nächste Vorprüfung greift
+                    self._refresh_export_status_version(klasse, template_path)
+
+        changed = [klasse for klasse in klassen_liste if klasse not in skipped]
+        return changed, skipped, klassen_daten
+
+    def _refresh_export_status_version(self, klasse: str, template_path: Path) -> None:
+        """Setzt daten_version eines unveränderten Exports auf den aktuellen Datenstand"""
+        if self.read_only or self._daten_version is None:
+            return
+        try:
+            self.conn.execute(
+                """
+                UPDATE export_status SET daten_version = ?
+                WHERE klasse = ? AND schuljahr = ? AND halbjahr = ? AND template_pfad = ?
+                """,
+                (self._daten_version, klasse, self.school_year, self.term, str(Path(template_path).resolve())),
+            )
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Export-Status für {klasse} konnte nicht aktualisiert werden: {e}")
+
+    def _build_bundle_manifest(self, summary: Dict[str, Any], template_path: Path, export_date: str) -> Dict[str, Any]:
+        """Manifest für ZIP-Pakete: Klassen mit Schülerzahl, Datei und Fehler"""
+        klassen = {}
+        for klasse, details in summary.get("klassen_details", {}).items():
+            klassen[klasse] = {
+                "schueler": details.get("schueler_count", 0),
+                "datei": details.get("output_file") if details.get("datei_erstellt") else None,
+                "fehler": details.get("fehler"),
+            }
+        for key, details in summary.get("schueler_details", {}).items():
+            klasse = str(key).split("/", 1)[0]
+            entry = klassen.setdefault(klasse, {"schueler": 0, "dateien": [], "fehler": []})
+            entry["schueler"] += 1
+            if details.get("datei_erstellt"):
+                entry["dateien"].append(details.get("output_file"))
+            elif details.get("fehler"):
+                entry["fehler"].append(details["fehler"])
+        return {
+            "erstellt": datetime.now().isoformat(timespec="seconds"),
+            "export_mode": summary.get("export_mode"),
+            "schuljahr": self.school_year,
+            "halbjahr": self.term,
+            "template": Path(template_path).name,
+            "export_datum": export_date,
+            "gesamt_dateien": summary.get("gesamt_dateien", 0),
+            "gesamt_fehler": summary.get("gesamt_fehler", 0),
+            "abgebrochen": summary.get("abgebrochen", False),
+            "uebersprungen": summary.get("uebersprungen", {}),
+            "klassen": klassen,
+        }
+
+    def _record_klassen_result(
+        self,
+        summary: Dict[str, Any],
+        klasse: str,
+        klassen_result: Dict[str, Any],
+        on_class_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        template_path: Optional[Path] = None,
+        on_event: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+    ) -> None:
+        """Übernimmt das Ergebnis einer Klasse in die Zusammenfassung und meldet es weiter"""
+        zeiten = klassen_result.setdefault("zeiten", {})
+        for phase, dauer in zeiten.items():
+            summary["zeiten"][phase] = summary["zeiten"].get(phase, 0.0) + dauer
+        docx_bytes = klassen_result.pop("docx_bytes", None)
+        if docx_bytes is not None and self._merge_parts is not None:
+            self._merge_parts[klasse] = docx_bytes
+            klassen_result["output_file"] = None
+        elif docx_bytes is not None and self._bundle is not None:
+            klassen_result["output_file"] = self._bundle.add(Path(klassen_result["output_file"]).name, docx_bytes)
+        summary["klassen_details"][klasse] = klassen_result
+        if klassen_result["datei_erstellt"]:
+            summary["gesamt_dateien"] += 1
+            # Export-Status nur für Einzeldateien (Pakete/Sammeldokumente sind Momentaufnahmen)
+            if template_path is not None and not self._collects_bytes():
+                self._save_export_status(klasse, template_path, klassen_result)
+            self._emit_export_event(
+                on_event,
+                "gerendert",
+                klasse,
+                {"zeiten": {k: v for k, v in zeiten.items() if k != "save"}},
+            )
+            self._emit_export_event(
+                on_event,
+                "gespeichert",
+                klasse,
+                {
+                    "output_file": klassen_result["output_file"],
+                    "schueler_count": klassen_result["schueler_count"],
+                    "zeiten": dict(zeiten),
+                },
+            )
+        else:
+            summary["gesamt_fehler"] += 1
+            self._emit_export_event(
+                on_event, "fehlgeschlagen", klasse, {"fehler": klassen_result.get("fehler"), "zeiten": dict(zeiten)}
+            )
+        if on_class_done:
+            try:
+                on_class_done(klasse, klassen_result)
+            except Exception as e:
+                self.logger.warning(f"Fortschrittsmeldung für {klasse} fehlgeschlagen: {e}")
+
+    def _export_klassen_parallel(
+        self,
+        klassen_liste: List[str],
+        output_dir: Path,
+        template_path: Path,
+        export_date: str,
+        summary: Dict[str, Any],
+        max_workers: Optional[int] = None,
+        on_class_done: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        on_event: Optional[Callable[[str, str, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> List[str]:
+        """
+        Rendert Klassen in Worker-Prozessen und übernimmt die Ergebnisse, sobald sie fertig sind.
+
+        Gibt die Klassen zurück, die nicht parallel exportiert werden konnten (z. B. weil der
+        Prozess-Pool nicht startet oder der Export abgebrochen wurde); diese exportiert der
+        Aufrufer sequenziell bzw. verwirft sie nach einem Abbruch. "gestartet" wird hier beim
+        Übergeben an den Pool gemeldet, die Phasenzeiten stammen aus den Worker-Prozessen.
+        """
+        if not max_workers:
+            max_workers = max(1, min(len(klassen_liste), (os.cpu_count() or 2) - 1, self.MAX_EXPORT_WORKERS))
+        if max_workers < 2:
+            # Ein einzelner Worker wäre nur Overhead
+            self.logger.info("Paralleler Export übersprungen: nur ein Prozessorkern verfügbar")
+            return list(klassen_liste)
+        self.logger.info(f"Paralleler Export: {len(klassen_liste)} Klassen mit {max_workers} Prozessen")
+        summary["export_mode"] = "horizontal_parallel"
+
+        pending = set(klassen_liste)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                # Nur so viele Klassen einreichen wie Prozesse laufen: "gestartet" stimmt dann
+                # und ein Abbruch greift nach den gerade laufenden Klassen
+                queue_klassen = iter(klassen_liste)
+                futures: Dict[Any, str] = {}
+
+                def submit_next() -> None:
+                    klasse = next(queue_klassen, None)
+                    if klasse is None:
+                        return
+                    futures[
+                        pool.submit(
+                            _export_klasse_worker,
+                            str(self.db_path),
+                            self.school_year,
+                            self.term,
+                            klasse,
+                            str(output_dir),
+                            str(template_path),
+                            export_date,
+                            self.table_engine,
+                            self._collects_bytes(),
+                        )
+                    ] = klasse
+                    self._emit_export_event(on_event, "gestartet", klasse, {})
+
+                for _ in range(max_workers):
+                    submit_next()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        klasse = futures.pop(future)
+                        try:
+                            klassen_result = future.result()
+                        except Exception as e:
+                            error_msg = f"Export error {klasse}: {str(e)}"
+                            self.logger.error(error_msg)
+                            klassen_result = {
+                                "datei_erstellt": False,
+                                "output_file": None,
+                                "schueler_count": 0,
+                                "faecher_count": 0,
+                                "fehler": error_msg,
+                            }
+                        pending.discard(klasse)
+                        self._record_klassen_result(
+                            summary, klasse, klassen_result, on_class_done, template_path, on_event
+                        )
+                        # Nach einem Abbruch laufen nur noch die bereits gestarteten Klassen zu Ende
+                        if not self._export_cancelled(cancel_event, summary):
+                            submit_next()
+        except (OSError, NotImplementedError) as e:
+            # Kein Prozess-Pool verfügbar (z. B. eingeschränkte Umgebung) -> sequenziell weiter
+            self.logger.warning(f"Paralleler Export nicht möglich, exportiere sequenziell: {e}")
+
+        return [klasse for klasse in klassen_liste if klasse in pending]
+
     def _export_klasse_horizontal_optimized(
-        self, klasse: str, output_dir: Path, template_path: Path, export_date: str
+        self,
+        klasse: str,
+        output_dir: Path,
+        template_path: Path,
+        export_date: str,
+        schueler_liste: Optional[List[Dict[str, Any]]] = None,
+        to_bytes: bool = False,
+        zeiten: Optional[Dict[str, float]] = None,
     ) -> Dict[str, Any]:
-        """Exportiert eine Klasse als horizontale Tabelle (optimiert)"""
+        """
+        Exportiert eine Klasse als horizontale Tabelle (optimiert); schueler_liste ggf. vorab geladen.
+
+        Mit to_bytes wird nicht geschrieben: das Dokument steht als "docx_bytes" im Ergebnis
+        und output_file ist nur der Dateiname (für ZIP-Pakete). result["zeiten"] enthält die
+        Phasen query, layout (aus zeiten, falls vorab geladen), render und save in Sekunden.
+        """
         result = {
             "datei_erstellt": False,
             "output_file": None,
             "schueler_count": 0,
             "faecher_count": 0,
             "fehler": None,
+            "daten_hash": None,
+            "zeiten": dict(zeiten or {}),
         }
 
         try:
             # Get class data
-            schueler_liste = self._get_schueler_horizontal_optimized(klasse)
+            if schueler_liste is None:
+                geladen: Dict[str, Dict[str, float]] = {}
+                schueler_liste = self._get_klassen_horizontal([klasse], zeiten=geladen).get(klasse, [])
+                result["zeiten"].update(geladen.get(klasse, {}))
             if not schueler_liste:
                 raise ValueError(f"Keine Schüler in Klasse {klasse} gefunden")
 
             # Calculate maximum subjects
             max_faecher = max(s["faecher_anzahl"] for s in schueler_liste)
+            daten_hash = self._compute_klassen_hash(schueler_liste)
 
             # Create context
             context = {
@@ -1635,7 +2564,13 @@ class OptimizedKopfnotenExporter:
             output_file = output_dir.resolve() / f"Kopfnoten_{klasse}_horizontal_{timestamp}.docx"
 
             # Process template
-            self._process_template_with_context(template_path, context, output_file)
+            if to_bytes:
+                buffer = io.BytesIO()
+                self._process_template_with_context(template_path, context, buffer, result["zeiten"])
+                result["docx_bytes"] = buffer.getvalue()
+                output_file = Path(f"Kopfnoten_{klasse}_horizontal.docx")
+            else:
+                self._process_template_with_context(template_path, context, output_file, result["zeiten"])
 
             # Update result
             result.update({
@@ -1643,6 +2578,7 @@ class OptimizedKopfnotenExporter:
                 "output_file": str(output_file),
                 "schueler_count": len(schueler_liste),
                 "faecher_count": max_faecher,
+                "daten_hash": daten_hash,
             })
             self.logger.info(f"Erfolgreich exportiert: {output_file.name}")
         except Exception as e:
@@ -1652,6 +2588,216 @@ class OptimizedKopfnotenExporter:
 
         return result
 
+    @staticmethod
+    def _safe_filename(name: str) -> str:
+        """Dateiname aus einem Schülernamen (ohne unter Windows unzulässige Zeichen)"""
+        return re.sub(r'[\\/:*?"<>|]+', "_", str(name)).replace(" ", "_").strip("._") or "Schueler"
+
+    @classmethod
+    def _render_einzeldokument(
+        cls, template_path: str, table_engine: str, context: Dict[str, Any], output_file: str, to_bytes: bool = False
+    ) -> Dict[str, Any]:
+        """Rendert ein Einzeldokument und liefert das Ergebnis statt eine Exception zu werfen.
+
+        Mit to_bytes landet das Dokument als "docx_bytes" im Ergebnis (output_file ist dann
+        der Name im ZIP-Paket).
+        """
+        result = {"datei_erstellt": False, "output_file": None, "fehler": None}
+        try:
+            if to_bytes:
+                buffer = io.BytesIO()
+                cls.render_document(Path(template_path), context, buffer, table_engine)
+                result["docx_bytes"] = buffer.getvalue()
+            else:
+                Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+                cls.render_document(Path(template_path), context, Path(output_file), table_engine)
+            result.update({"datei_erstellt": True, "output_file": str(output_file)})
+        except Exception as e:
+            result["fehler"] = f"Export error {context.get('klasse')}/{context['schueler']['name']}: {e}"
+            logging.getLogger("exporter").error(result["fehler"])
+        return result
+
+    def export_einzelschueler_bulk(
+        self,
+        output_dir: Path,
+        template_path: Path,
+        klassen_liste: List[str],
+        schueler_ids: Optional[List[int]] = None,
+        export_date: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        on_progress: Optional[Callable[[int, int, str, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        bundle: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Exportiert je Schüler ein eigenes Dokument (Beiblätter) für Klassen oder eine Auswahl.
+
+        Alle Daten kommen aus einer Abfrage, das Template wird einmal vorbereitet und in
+        Worker-Prozessen (bzw. sequenziell bei einem Kern) wiederverwendet. Ausgabe:
+        output_dir/Einzelexport_<Zeitstempel>/<Klasse>/Kopfnoten_<Name>.docx.
+        on_progress(fertig, gesamt, "Klasse/Name", ergebnis) meldet jeden Schüler; ist
+        cancel_event gesetzt, werden keine weiteren Aufträge mehr gestartet. Mit bundle=True
+        entsteht statt des Ordners ein ZIP-Paket Einzelexport_<Zeitstempel>.zip mit Manifest.
+        """
+        template_path = Path(template_path).resolve()
+        if not template_path.exists():
+            raise FileNotFoundError(f"Template nicht gefunden: {template_path}")
+        if not export_date:
+            export_date = datetime.now().strftime("%d.%m.%Y")
+
+        run_name = f"Einzelexport_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        run_dir = Path(output_dir).resolve() / run_name
+        summary = {
+            "gesamt_dateien": 0,
+            "gesamt_fehler": 0,
+            "schueler_details": {},
+            "output_dir": str(run_dir),
+            "abgebrochen": False,
+            "start_time": datetime.now(),
+            "export_mode": "einzelschueler_bulk",
+        }
+
+        # Eine Abfrage für alle Klassen; Template einmal vorbereiten (Fehler früh melden)
+        klassen_daten = self._get_klassen_horizontal(
+            klassen_liste, set(schueler_ids) if schueler_ids is not None else None
+        )
+        self._get_prepared_template(template_path, self.table_engine)
+
+        jobs = []
+        for klasse, schueler_liste in klassen_daten.items():
+            for schueler in schueler_liste:
+                schueler = dict(schueler, ist_letzter=True)
+                context = {
+                    "klasse": klasse,
+                    "export_datum": export_date,
+                    "schueler_liste": [schueler],
+                    "max_faecher": schueler["faecher_anzahl"],
+                    "schueler": schueler,
+                }
+                relative = f"{self._safe_filename(klasse)}/Kopfnoten_{self._safe_filename(schueler['name'])}.docx"
+                output_file = relative if bundle else str(run_dir / relative)
+                jobs.append((f"{klasse}/{schueler['name']}", context, output_file))
+
+        total = len(jobs)
+        self.logger.info(f"Einzelexport: {total} Schüler nach {run_dir}{'.zip' if bundle else ''}")
+
+        def record(key: str, result: Dict[str, Any]):
+            docx_bytes = result.pop("docx_bytes", None)
+            if docx_bytes is not None and self._bundle is not None:
+                result["output_file"] = self._bundle.add(result["output_file"], docx_bytes)
+            summary["schueler_details"][key] = result
+            if result["datei_erstellt"]:
+                summary["gesamt_dateien"] += 1
+            else:
+                summary["gesamt_fehler"] += 1
+            if on_progress:
+                try:
+                    on_progress(len(summary["schueler_details"]), total, key, result)
+                except Exception as e:
+                    self.logger.warning(f"Fortschrittsmeldung für {key} fehlgeschlagen: {e}")
+
+        def cancelled() -> bool:
+            return cancel_event is not None and cancel_event.is_set()
+
+        if not max_workers:
+            max_workers = max(1, min((os.cpu_count() or 2) - 1, self.MAX_EXPORT_WORKERS))
+        chunks = [jobs[i:i + self.BULK_CHUNK_SIZE] for i in range(0, total, self.BULK_CHUNK_SIZE)]
+
+        if bundle:
+            self._bundle = ExportBundleWriter(output_dir, f"{run_name}.zip")
+            summary["output_dir"] = str(Path(output_dir).resolve())
+
+        try:
+            uebersprungen = self._run_bulk_jobs(jobs, chunks, template_path, max_workers, record, cancelled, bundle)
+            # Nur als abgebrochen melden, wenn tatsächlich Schüler nicht exportiert wurden
+            summary["abgebrochen"] = uebersprungen > 0
+            if self._bundle is not None:
+                summary["bundle_file"] = str(
+                    self._bundle.finalize(self._build_bundle_manifest(summary, template_path, export_date))
+                )
+        finally:
+            if self._bundle is not None:
+                self._bundle.abort()
+                self._bundle = None
+
+        if summary["abgebrochen"]:
+            self.logger.info(f"Einzelexport abgebrochen nach {len(summary['schueler_details'])}/{total} Schülern")
+        summary["end_time"] = datetime.now()
+        summary["duration"] = summary["end_time"] - summary["start_time"]
+        return summary
+
+    def _run_bulk_jobs(
+        self,
+        jobs: List[Tuple[str, Dict[str, Any], str]],
+        chunks: List[List[Tuple[str, Dict[str, Any], str]]],
+        template_path: Path,
+        max_workers: int,
+        record: Callable[[str, Dict[str, Any]], None],
+        cancelled: Callable[[], bool],
+        to_bytes: bool,
+    ) -> int:
+        """
+        Verteilt die Einzelexport-Aufträge auf Worker-Prozesse (oder rendert sequenziell).
+
+        Es laufen höchstens max_workers Pakete gleichzeitig; nach einem Abbruch werden nur die
+        bereits gestarteten Pakete fertig gerendert. Gibt die Zahl der übersprungenen Schüler zurück.
+        """
+        done = set()
+
+        def record_done(key: str, result: Dict[str, Any]):
+            done.add(key)
+            record(key, result)
+
+        remaining = jobs
+        if max_workers >= 2 and len(chunks) > 1:
+            try:
+                workers = min(max_workers, len(chunks))
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    # Wie beim parallelen Klassenexport nur so viele Pakete einreichen wie
+                    # Prozesse laufen, damit ein Abbruch nach den laufenden Paketen greift
+                    queue_chunks = iter(chunks)
+                    futures: Dict[Any, List[Tuple[str, Dict[str, Any], str]]] = {}
+
+                    def submit_next() -> None:
+                        chunk = next(queue_chunks, None)
+                        if chunk is None:
+                            return
+                        futures[
+                            pool.submit(
+                                _render_schueler_batch_worker, str(template_path), self.table_engine, chunk, to_bytes
+                            )
+                        ] = chunk
+
+                    for _ in range(workers):
+                        submit_next()
+                    while futures:
+                        finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            chunk = futures.pop(future)
+                            try:
+                                for key, result in future.result():
+                                    record_done(key, result)
+                            except Exception as e:
+                                for key, _, _ in chunk:
+                                    record_done(
+                                        key,
+                                        {"datei_erstellt": False, "output_file": None, "fehler": f"Export error {key}: {e}"},
+                                    )
+                            if not cancelled():
+                                submit_next()
+            except (OSError, NotImplementedError) as e:
+                self.logger.warning(f"Paralleler Einzelexport nicht möglich, exportiere sequenziell: {e}")
+            remaining = [job for job in jobs if job[0] not in done]
+
+        for key, context, output_file in remaining:
+            if cancelled():
+                break
+            record_done(
+                key,
+                self._render_einzeldokument(str(template_path), self.table_engine, context, output_file, to_bytes),
+            )
+        return len(jobs) - len(done)
+
     def _export_einzelschueler_horizontal(
         self, schueler_id: int, schueler_name: str, klasse: str, output_dir: Path, template_path: Path, export_date: str
     ) -> Dict[str, Any]:
@@ -1743,66 +2889,98 @@ class OptimizedKopfnotenExporter:
 
     def _get_schueler_horizontal_optimized(self, klasse: str) -> List[Dict[str, Any]]:
         """Sammelt Schülerdaten für optimierte horizontale Darstellung"""
-        jahrgang = self._extract_jahrgang(klasse)
+        return self._get_klassen_horizontal([klasse]).get(klasse, [])
+
+    def _get_klassen_horizontal(
+        self,
+        klassen_liste: List[str],
+        schueler_ids: Optional[set] = None,
+        zeiten: Optional[Dict[str, Dict[str, float]]] = None,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lädt Schüler und Fächer aller angegebenen Klassen mit einer einzigen Abfrage.
 
+        Die Zeilen kommen nach Klasse, Name und Schüler sortiert und werden im Speicher
+        je Schüler gruppiert, bevor _format_faecher_logic läuft. Mit schueler_ids werden
+        nur diese Schüler übernommen.
+
+        zeiten (optional) erhält je Klasse "query" (Anteil an der gemeinsamen Abfrage nach
+        Zeilenzahl) und "layout" (Fächerlogik) in Sekunden.
+        """
+        klassen_liste = list(dict.fromkeys(klassen_liste))
+        if not klassen_liste:
+            return {}
+        started = time.perf_counter()
+
+        placeholders = ",".join("?" for _ in klassen_liste)
         cursor = self.conn.execute(
-            """
-            SELECT DISTINCT s.schueler_id, s.name
+            f"""
+            SELECT
+                s.klasse,
+                s.schueler_id,
+                s.name,
+                f.fach_lang,
+                f.fach_kurz,
+                f.fach_typ,
+                n.note_av,
+                n.note_sv,
+                n.note_av_special,
+                n.note_sv_special,
+                n.ist_wahlpflicht_belegung,
+                f.wahlpflicht_gruppe
             FROM schueler s
             JOIN noten n ON s.schueler_id = n.schueler_id
-            WHERE s.klasse = ?
+            JOIN faecher f ON n.fach_id = f.fach_id
+            WHERE s.klasse IN ({placeholders})
               AND COALESCE(s.is_active, 1) = 1
               AND n.schuljahr = ?
               AND n.halbjahr = ?
-            ORDER BY name
+            ORDER BY s.klasse, s.name, s.schueler_id, n.noten_id
             """,
-            (klasse, self.school_year, self.term),
+            (*klassen_liste, self.school_year, self.term),
         )
 
-        schueler_liste = []
-        schueler_rows = cursor.fetchall()
-
-        for i, schueler in enumerate(schueler_rows):
-            schueler_id = schueler["schueler_id"]
-            schueler_name = schueler["name"]
-
-            # Fächer für diesen Schüler laden
-            cursor = self.conn.execute(
-                """
-                SELECT
-                    f.fach_lang,
-                    f.fach_kurz,
-                    f.fach_typ,
-                    n.note_av,
-                    n.note_sv,
-                    n.note_av_special,
-                    n.note_sv_special,
-                    n.ist_wahlpflicht_belegung,
-                    f.wahlpflicht_gruppe
-                FROM noten n
-                JOIN faecher f ON n.fach_id = f.fach_id
-                WHERE n.schueler_id = ?
-                  AND n.schuljahr = ?
-                  AND n.halbjahr = ?
-                """,
-                (schueler_id, self.school_year, self.term),
-            )
-
-            rows = cursor.fetchall()
-            faecher_spalten, av_noten, sv_noten = self._format_faecher_logic(rows, jahrgang)
-
-            schueler_data = {
-                "name": schueler_name,
-                "klasse": klasse,
-                "faecher_spalten": faecher_spalten,
-                "av_noten": av_noten,
-                "sv_noten": sv_noten,
-                "faecher_anzahl": len(faecher_spalten),
-                "ist_letzter": (i == len(schueler_rows) - 1),
-            }
-            schueler_liste.append(schueler_data)
-
-        return schueler_liste
+        # klasse -> [(schueler_id, name, [zeilen])] in Abfragereihenfolge
+        grouped: Dict[str, List[Tuple[int, str, List[sqlite3.Row]]]] = {}
+        current_id = None
+        current_rows: List[sqlite3.Row] = []
+        for row in cursor:
+            # Positionszugriff: klasse, schueler_id, name sind die ersten drei Spalten
+            if schueler_ids is not None and row[1] not in schueler_ids:
+                continue
+            if row[1] != current_id:
+                current_id = row[1]
+                current_rows = []
+                grouped.setdefault(row[0], []).append((current_id, row[2], current_rows))
+            current_rows.append(row)
+        query_time = time.perf_counter() - started
+        row_counts = {k: sum(len(rows) for _, _, rows in v) for k, v in grouped.items()}
+        total_rows = sum(row_counts.values()) or 1
+
+        result: Dict[str, List[Dict[str, Any]]] = {}
+        for klasse in klassen_liste:
+            layout_started = time.perf_counter()
+            jahrgang = self._extract_jahrgang(klasse)
+            schueler_rows = grouped.get(klasse, [])
+            schueler_liste = []
+            for i, (_, schueler_name, rows) in enumerate(schueler_rows):
+                faecher_spalten, av_noten, sv_noten = self._format_faecher_logic(rows, jahrgang)
+                schueler_liste.append({
+                    "name": schueler_name,
+                    "klasse": klasse,
+                    "faecher_spalten": faecher_spalten,
+                    "av_noten": av_noten,
+                    "sv_noten": sv_noten,
+                    "faecher_anzahl": len(faecher_spalten),
+                    "ist_letzter": (i == len(schueler_rows) - 1),
+                })
+            result[klasse] = schueler_liste
+            if zeiten is not None:
+                zeiten[klasse] = {
+                    "query": query_time * row_counts.get(klasse, 0) / total_rows,
+                    "layout": time.perf_counter() - layout_started,
+                }
+        return result
 
 class SimplifiedGradeEditor:
     """Vereinfachter Noten-Editor"""
@@ -2367,6 +3545,7 @@ class SimplifiedGradeEditor:
                     # Refresh parent window
                     if self.app and hasattr(self.app, "refresh_analysis_data"):
                         self.app.refresh_analysis_data()
+                        self.app.schedule_period_stats_update()
                         # Also refresh tree selection to keep context if possible?
                         # Re-selecting might be tricky if list rebuilt.
                         # Maybe we can just stay silent.
@@ -2401,28 +3580,304 @@ class StatusManager:
         self.progress_bar.pack(side=tk.RIGHT, padx=(5, 0))
         return status_frame
 
-    def set_status(self, message: str, progress: bool = False):
-        """Setzt Status"""
-        if self.status_label:
-            self.status_label.config(
-                text=f"{datetime.now().strftime('%H:%M:%S')} - {message}"
-            )
-        if progress and self.progress_bar:
-            self.progress_bar.start()
-        elif not progress and self.progress_bar:
-            self.progress_bar.stop()
+    def set_status(self, message: str, progress: bool = False):
+        """Setzt Status"""
+        if self.status_label:
+            self.status_label.config(
+                text=f"{datetime.now().strftime('%H:%M:%S')} - {message}"
+            )
+        if progress and self.progress_bar:
+            self.progress_bar.start()
+        elif not progress and self.progress_bar:
+            self.progress_bar.stop()
+
+    def clear_status(self):
+        """Setzt Status zurück"""
+        self.set_status("Bereit", False)
+
+class GradeRecord:
+    """Eine Notenzeile (noten + faecher) einer Periode; __slots__ statt Dict je Zeile"""
+
+    __slots__ = (
+        "fach_id", "fach_kurz", "fach_lang", "fach_typ",
+        "note_av", "note_sv", "av_special", "sv_special",
+        "ist_wahlpflicht", "wahlpflicht_belegung", "wahlpflicht_gruppe", "lehrer_kuerzel",
+    )
+
+    def __init__(self, fach_id, fach_kurz, fach_lang, fach_typ, note_av, note_sv, av_special, sv_special,
+                 ist_wahlpflicht, wahlpflicht_belegung, wahlpflicht_gruppe, lehrer_kuerzel):
+        self.fach_id = fach_id
+        self.fach_kurz = fach_kurz
+        self.fach_lang = fach_lang
+        self.fach_typ = fach_typ
+        self.note_av = note_av
+        self.note_sv = note_sv
+        self.av_special = av_special
+        self.sv_special = sv_special
+        self.ist_wahlpflicht = ist_wahlpflicht
+        self.wahlpflicht_belegung = wahlpflicht_belegung
+        self.wahlpflicht_gruppe = wahlpflicht_gruppe
+        self.lehrer_kuerzel = lehrer_kuerzel
+
+    @property
+    def has_av(self) -> bool:
+        return self.note_av is not None or self.av_special is not None
+
+    @property
+    def has_sv(self) -> bool:
+        return self.note_sv is not None or self.sv_special is not None
+
+
+class StudentRecord:
+    """Ein aktiver Lernender mit seinen Notenzeilen einer Periode"""
+
+    __slots__ = ("id", "name", "klasse", "target_subjects", "grades")
+
+    def __init__(self, student_id, name, klasse, target_subjects):
+        self.id = student_id
+        self.name = name
+        self.klasse = klasse
+        self.target_subjects = target_subjects
+        self.grades: List[GradeRecord] = []
+
+
+def iter_period_students(conn: sqlite3.Connection, school_year: str, term: int):
+    """
+    Liefert die aktiven Lernenden (sortiert nach Klasse, Name) mit ihren Notenzeilen der
+    Periode als StudentRecord, während der Cursor gelesen wird (kein fetchall). Lernende
+    ohne Noten haben eine leere grades-Liste. Wiederholte Texte (Klasse, Fach, Kürzel)
+    werden geteilt statt je Zeile neu gehalten. Gemeinsame Datenbasis für Datenbank-Liste
+    und Analyse.
+    """
+    cursor = conn.execute(
+        """
+        SELECT
+            s.schueler_id, s.name, s.klasse, s.target_subjects,
+            n.fach_id, f.fach_kurz, f.fach_lang, f.fach_typ,
+            n.note_av, n.note_sv, n.note_av_special, n.note_sv_special,
+            f.ist_wahlpflicht, n.ist_wahlpflicht_belegung, f.wahlpflicht_gruppe,
+            n.lehrer_kuerzel
+        FROM schueler s
+        LEFT JOIN noten n ON s.schueler_id = n.schueler_id
+            AND n.schuljahr = ?
+            AND n.halbjahr = ?
+        LEFT JOIN faecher f ON n.fach_id = f.fach_id
+        WHERE COALESCE(s.is_active, 1) = 1
+        ORDER BY s.klasse, s.name
+        """,
+        (school_year, term),
+    )
+    texts: Dict[str, str] = {}
+    # Fachstammdaten je fach_id nur einmal halten
+    faecher: Dict[int, Tuple[Any, ...]] = {}
+    current = None
+    for (s_id, name, klasse, target, fach_id, f_kurz, f_lang, f_typ,
+         av, sv, av_special, sv_special, f_wp, n_wp, wp_grp, lehrer) in cursor:
+        if current is None or current.id != s_id:
+            if current is not None:
+                yield current
+            current = StudentRecord(s_id, name, texts.setdefault(klasse, klasse), target)
+        if fach_id is None:
+            continue
+        fach = faecher.get(fach_id)
+        if fach is None:
+            fach = faecher[fach_id] = (f_kurz, f_lang, f_typ, f_wp, wp_grp)
+        if lehrer is not None:
+            lehrer = texts.setdefault(lehrer, lehrer)
+        current.grades.append(
+            GradeRecord(
+                fach_id, fach[0], fach[1], fach[2], av, sv, av_special, sv_special,
+                fach[3], n_wp, fach[4], lehrer,
+            )
+        )
+    if current is not None:
+        yield current
+
+
+class AnalysisDatasetCache:
+    """
+    LRU-Cache für Analyse-Datensätze je (Datenbank, Periode, Engine).
+
+    Jeder Eintrag merkt sich den Datenstand (Tabelle daten_version, per Trigger gepflegt),
+    mit dem er berechnet wurde; ändert sich die Version der Periode oder der Schülerdaten,
+    wird neu gerechnet. Abgeschlossene Perioden werden so nur einmal je Sitzung berechnet.
+    Begrenzt durch Anzahl und geschätzten Speicherbedarf; die Datensätze sind nur zum
+    Lesen gedacht.
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str, int, str], Tuple[Tuple[int, int], int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def data_version(db_path: Path, school_year: str, term: int) -> Optional[Tuple[int, int]]:
+        """(Version der Periode, Version der Schülerdaten); None ohne daten_version-Tabelle"""
+        try:
+            with sqlite3.connect(db_path) as conn:
+                rows = dict(
+                    ((sy, int(t)), v)
+                    for sy, t, v in conn.execute(
+                        """
+                        SELECT schuljahr, halbjahr, version FROM daten_version
+                        WHERE (schuljahr = ? AND halbjahr = ?) OR (schuljahr = '*' AND halbjahr = 0)
+                        """,
+                        (school_year, term),
+                    )
+                )
+        except sqlite3.Error:
+            return None
+        return (rows.get((school_year, int(term)), 0), rows.get(("*", 0), 0))
+
+    @staticmethod
+    def estimate_size(obj: Any) -> int:
+        """Grobe Speicherschätzung (rekursiv über Dicts, Listen und Tupel)"""
+        seen = set()
+        stack = [obj]
+        total = 0
+        while stack:
+            item = stack.pop()
+            if id(item) in seen:
+                continue
+            seen.add(id(item))
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                stack.extend(item.keys())
+                stack.extend(item.values())
+            elif isinstance(item, (list, tuple, set)):
+                stack.extend(item)
+        return total
+
+    def get_or_compute(
+        self, db_path: Path, school_year: str, term: int, engine: str, compute: Callable[[], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Liefert den gecachten Datensatz oder berechnet ihn (ohne Versionstabelle: immer neu)"""
+        version = self.data_version(db_path, school_year, term)
+        if version is None:
+            return compute()
+        key = (str(Path(db_path).resolve()), str(school_year), int(term), engine)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        dataset = compute()
+        size = self.estimate_size(dataset)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if size <= self.max_bytes:
+                self._entries[key] = (version, size, dataset)
+                self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+        return dataset
+
+    def clear(self) -> None:
+        """Verwirft alle Einträge (z. B. nach dem Austausch der Datenbankdatei)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+class RefreshWorker:
+    """
+    Berechnet Ansichts-Aktualisierungen in einem Hintergrund-Thread.
+
+    Je Art ("analyse", "schuelerliste", ...) zählt nur die neueste Anfrage: Eine noch
+    wartende Anfrage wird ersetzt, das Ergebnis einer bereits laufenden verworfen.
+    Ergebnisse werden über deliver (z. B. ui_queue.put) an den UI-Thread gegeben,
+    der dort nur noch apply(ergebnis) ausführt. Wirft compute(), erhält stattdessen
+    on_error(art, fehler) die Ausnahme, ebenfalls im UI-Thread.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[Callable[[], None]], None],
+        on_error: Optional[Callable[[str, Exception], None]] = None,
+    ):
+        self._deliver = deliver
+        self._on_error = on_error
+        self._pending: "OrderedDict[str, Tuple[int, Callable[[], Any], Callable[[Any], None]]]" = OrderedDict()
+        self._generation: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, kind: str, compute: Callable[[], Any], apply: Callable[[Any], None]) -> int:
+        """Plant compute() im Hintergrund ein; apply(ergebnis) läuft nur, wenn keine neuere Anfrage kam"""
+        with self._lock:
+            generation = self._generation.get(kind, 0) + 1
+            self._generation[kind] = generation
+            # Ans Ende stellen: Anfragen werden in Eingangsreihenfolge abgearbeitet
+            self._pending.pop(kind, None)
+            self._pending[kind] = (generation, compute, apply)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="refresh-worker", daemon=True)
+                self._thread.start()
+        return generation
+
+    def cancel(self, kind: str) -> None:
+        """Verwirft wartende und laufende Anfragen dieser Art"""
+        with self._lock:
+            self._generation[kind] = self._generation.get(kind, 0) + 1
+            self._pending.pop(kind, None)
+
+    def _is_current(self, kind: str, generation: int) -> bool:
+        with self._lock:
+            return self._generation.get(kind) == generation
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                kind, (generation, compute, apply) = self._pending.popitem(last=False)
+            try:
+                result = compute()
+            except Exception as e:
+                logging.error(f"Fehler bei Hintergrund-Aktualisierung ({kind}): {e}")
+                if self._on_error is None:
+                    continue
+
+                def deliver(kind=kind, generation=generation, error=e):
+                    if self._is_current(kind, generation):
+                        self._on_error(kind, error)
+            else:
+                def deliver(kind=kind, generation=generation, apply=apply, result=result):
+                    if self._is_current(kind, generation):
+                        apply(result)
+
+            if self._is_current(kind, generation):
+                self._deliver(deliver)
 
-    def clear_status(self):
-        """Setzt Status zurück"""
-        self.set_status("Bereit", False)
 
 class KopfnotenGUI:
     """Hauptklasse der optimierten GUI-Anwendung"""
+
+    # Berechnung der Analyse-Kennzahlen (siehe _collect_analysis_dataset)
+    ANALYSIS_ENGINES = ("pandas", "sql", "python")
+    DEFAULT_ANALYSIS_ENGINE = "sql"
+
+    # Anzeige im Export-Tab -> merge-Modus von export_horizontal_tables
+    EXPORT_MERGE_OPTIONS = {"Keine": None, "Je Jahrgang": "jahrgang", "Ganze Schule": "schule"}
+
     def __init__(self):
         self.root = tk.Tk()
         self.paths = APP_PATHS
         # Pfade (Muss vor setup_application initialisiert sein!)
         self.db_path = self.paths.database_path
+        # Analyse-Datensätze je Periode (siehe AnalysisDatasetCache)
+        self.analysis_cache = AnalysisDatasetCache()
         
         self.setup_application()
         # Manager
@@ -2433,7 +3888,12 @@ class KopfnotenGUI:
         self.template_var = tk.StringVar()
         self.output_var = tk.StringVar(value=str(self.paths.output_word_dir))
         self.export_running = False
+        self.export_cancel_event = threading.Event()
         self.ui_queue = queue.Queue()
+        # Analyse- und Listenaktualisierungen laufen im Hintergrund (siehe RefreshWorker)
+        self.refresh_worker = RefreshWorker(self.ui_queue.put, on_error=self._on_refresh_error)
+        # Fehlgeschlagene Aktualisierungen seit dem letzten refresh_all_data
+        self._refresh_errors: List[str] = []
 
         # --- LOGIN CHECK ---
         from credentials import CredentialManager
@@ -2887,23 +4347,30 @@ class KopfnotenGUI:
     def _sph_worker(self, school, user, pw, tasks):
         """Hintergrund-Worker für SPH Download"""
         try:
-            from sph_downloader import SPHDownloader
-            downloader = SPHDownloader(logger=logging.getLogger("sph"))
-            
-            # Login
-            self.queue_ui(self.log_to_import, "SPH: Login läuft...")
+            # Login (bestehende Session wird wiederverwendet, falls noch gültig)
+            self.queue_ui(self.log_to_import, "SPH: Session wird geprüft...")
             self.queue_ui(self.status_manager.set_status, "SPH: Login...")
-            downloader.login(school, user, pw)
+            sph_session = self.credentials_manager.sph_session
+            downloader = sph_session.get_downloader(school, user, pw)
             
             # Download Loop
             output_dir = self.paths.temp_dir
             output_dir.mkdir(parents=True, exist_ok=True)
 
+            from sph_scheduler import DownloadScheduler
+            scheduler = DownloadScheduler(
+                downloader,
+                output_dir,
+                reauthenticate=lambda: sph_session.reauthenticate(school, user, pw),
+                log=lambda msg: self.queue_ui(self.log_to_import, msg),
+                status=lambda msg: self.queue_ui(self.status_manager.set_status, msg),
+                max_classes_per_year=MAX_CLASSES_PER_JAHRGANG,
+                suffix_letters=CLASS_SUFFIX_LETTERS,
+            )
+
             # 1) Primär: Autoerkennung (ohne manuelle Vorgabe)
             self.queue_ui(self.status_manager.set_status, "Autoerkenne Klassen aus SPH...")
-            downloaded_files, auto_tasks = self._auto_detect_and_download_classes(
-                downloader, output_dir
-            )
+            downloaded_files, auto_tasks = self._auto_detect_and_download_classes(scheduler)
             manual_fallback_used = False
 
             # 2) Backup-Fallback: manuelle Angaben nutzen, falls Autoerkennung nichts gefunden hat
@@ -2914,10 +4381,9 @@ class KopfnotenGUI:
                         self.status_manager.set_status,
                         "Autoerkennung ohne Treffer – nutze manuelle Klassenangaben (Backup)...",
                     )
-                    downloaded_files = self._download_manual_tasks(
-                        downloader, output_dir, tasks
-                    )
+                    downloaded_files = self._download_manual_tasks(scheduler, tasks)
                 else:
+                    scheduler.finish_run(self._get_sph_download_metrics_path())
                     self.queue_ui(
                         messagebox.showwarning,
                         "SPH Import",
@@ -2926,6 +4392,8 @@ class KopfnotenGUI:
                     self.queue_ui(self.status_manager.set_status, "SPH Import ohne Ergebnis")
                     return
 
+            scheduler.finish_run(self._get_sph_download_metrics_path())
+
             auto_summary = ", ".join([f"J{int(jg)}={cnt}" for jg, cnt in auto_tasks]) if auto_tasks else "keine Treffer"
             backup_summary = ", ".join([f"J{int(jg)}={cnt}" for jg, cnt in tasks]) if tasks else "nicht konfiguriert"
             self.queue_ui(self.log_to_import, f"Autoerkennung: {auto_summary}")
@@ -3042,69 +4510,25 @@ class KopfnotenGUI:
         except Exception as e:
             self.queue_ui(messagebox.showerror, "Import Fehler", f"{e}")
 
-    def _download_manual_tasks(self, downloader, output_dir: Path, tasks: List[Tuple[str, int]]) -> List[Path]:
+    def _get_sph_download_metrics_path(self) -> Path:
+        return self.paths.logs_dir / "sph_download_metrics.json"
+
+    def _download_manual_tasks(self, scheduler, tasks: List[Tuple[str, int]]) -> List[Path]:
         """Lädt Klassen anhand manueller Konfiguration (Backup-Pfad)."""
-        downloaded_files: List[Path] = []
-        letters = CLASS_SUFFIX_LETTERS
-        for jg, count in tasks:
-            for i in range(min(count, MAX_CLASSES_PER_JAHRGANG)):
-                suffix = letters[i]
-                class_name = f"{jg}{suffix}"
-                self.queue_ui(self.status_manager.set_status, f"Lade Klasse {class_name} (manuell)...")
-                self.queue_ui(self.log_to_import, f"Lade Klasse {class_name} (manuell)...")
-                file_path = downloader.download_class_list(class_name, jg, output_dir)
-                if file_path:
-                    downloaded_files.append(file_path)
-                    self.queue_ui(self.log_to_import, f"✅ Download ok: {class_name}")
-                else:
-                    self.queue_ui(self.log_to_import, f"⚠️ Kein Download: {class_name}")
-        return downloaded_files
+        return scheduler.download_manual(tasks)
 
-    def _auto_detect_and_download_classes(self, downloader, output_dir: Path) -> Tuple[List[Path], List[Tuple[str, int]]]:
+    def _auto_detect_and_download_classes(self, scheduler) -> Tuple[List[Path], List[Tuple[str, int]]]:
         """
         Erkennt Klassen pro Jahrgang automatisch durch sequenzielles Testen (05a … 05i).
         Stoppt je Jahrgang nach 2 Fehlversuchen in Folge nach erstem Treffer.
         """
-        downloaded_files: List[Path] = []
-        detected_tasks: List[Tuple[str, int]] = []
-        letters = CLASS_SUFFIX_LETTERS
         years = sorted(self.spinboxes.keys()) if hasattr(self, "spinboxes") else [5, 6, 7, 8, 9, 10]
-
-        for year in years:
-            jg = f"{int(year):02d}"
-            success_count = 0
-            fail_streak = 0
-
-            for i in range(MAX_CLASSES_PER_JAHRGANG):
-                class_name = f"{jg}{letters[i]}"
-                self.queue_ui(self.status_manager.set_status, f"Autocheck Klasse {class_name}...")
-                self.queue_ui(self.log_to_import, f"Autocheck Klasse {class_name}...")
-                file_path = downloader.download_class_list(class_name, jg, output_dir)
-
-                if file_path:
-                    downloaded_files.append(file_path)
-                    success_count += 1
-                    fail_streak = 0
-                    self.queue_ui(self.log_to_import, f"✅ Download ok: {class_name}")
-                else:
-                    fail_streak += 1
-                    self.queue_ui(self.log_to_import, f"— Nicht gefunden: {class_name}")
-                    if success_count == 0 and fail_streak >= 1:
-                        break
-                    if success_count > 0 and fail_streak >= 2:
-                        break
-
-            if success_count > 0:
-                detected_tasks.append((jg, success_count))
-
-        return downloaded_files, detected_tasks
+        return scheduler.auto_detect(years)
 
     def _sph_post_import_sync_worker(self, school, user, pw):
         """Lädt SPH-Abgleich im Anschluss an einen erfolgreichen Import."""
         try:
-            from sph_downloader import SPHDownloader
-            downloader = SPHDownloader(logger=logging.getLogger("sph"))
-            downloader.login(school, user, pw)
+            downloader = self.credentials_manager.sph_session.get_downloader(school, user, pw)
             overview = downloader.fetch_missing_submissions_overview()
             self.sph_missing_overview = overview
             self.save_sph_missing_overview()
@@ -3407,6 +4831,9 @@ class KopfnotenGUI:
         ttk.Button(
             edit_frame, text="Noten bearbeiten", command=self.edit_selected_grade
         ).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(
+            edit_frame, text="Verlauf", command=self.show_student_trajectory
+        ).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(
             edit_frame, text="Lernende deaktivieren", command=self.deactivate_selected_student
         ).pack(side=tk.LEFT, padx=(0, 5))
@@ -3421,6 +4848,10 @@ class KopfnotenGUI:
             edit_frame, text="Schüler exportieren", command=self.export_selected_student
         ).pack(side=tk.RIGHT, padx=5)
 
+        ttk.Button(
+            edit_frame, text="Einzelexport (Auswahl)", command=self.export_students_bulk
+        ).pack(side=tk.RIGHT, padx=5)
+
         # Neue Schaltfläche für Fehllisten-Export
         ttk.Button(
             edit_frame, text="Fehlliste exportieren", command=self.export_missing_list
@@ -3484,6 +4915,7 @@ class KopfnotenGUI:
             ("years", "Jahrgänge", "table"),
             ("subjects", "Fächer & Ranking", "table"),
             ("top", "Top Lernende", "custom_top"),
+            ("teachers", "Lehrkräfte", "table"),
             ("trends", "Entwicklung", "text"),
         ]
         for key, label, section_type in section_defs:
@@ -3521,6 +4953,15 @@ class KopfnotenGUI:
                     widths=[70, 220, 90, 90, 90, 100, 80],
                     numeric_columns={"Rang", "AV", "SV", "Gesamt", "Streuung", "Noten"},
                 )
+            elif key == "teachers":
+                self.insights_tables[key] = self._create_insights_table(
+                    frame,
+                    columns=["Lehrkraft", "Klassen", "Fächer", "Einträge", "Vollst. %", "Fehlend",
+                             "AV", "SV", "Gesamt", "Streuung"],
+                    widths=[90, 200, 240, 70, 80, 70, 60, 60, 70, 80],
+                    numeric_columns={"Einträge", "Vollst. %", "Fehlend", "AV", "SV", "Gesamt", "Streuung"},
+                    stretch_columns={"Klassen", "Fächer"},
+                )
             elif key == "top":
                 self.insights_top_tables = self._create_top_section_widgets(frame)
 
@@ -3696,11 +5137,15 @@ class KopfnotenGUI:
         self.insights_compare_listbox.delete(0, tk.END)
         self._insights_compare_period_map = []
 
+        averages = {entry["period"]: entry["gesamt_avg"] for entry in self._get_period_history()}
         for sy, term in available:
             if sy == current_school_year and int(term) == int(current_term):
                 continue
             self._insights_compare_period_map.append((sy, term))
-            self.insights_compare_listbox.insert(tk.END, self._period_label(sy, term))
+            label = self._period_label(sy, term)
+            if averages.get((sy, term)) is not None:
+                label = f"{label}  (Ø {self._fmt_avg(averages[(sy, term)])})"
+            self.insights_compare_listbox.insert(tk.END, label)
 
         if not self._insights_compare_period_map:
             return
@@ -3742,8 +5187,270 @@ class KopfnotenGUI:
             return (school_year, alt_term)
         return None
 
-    def _collect_analysis_dataset(self, school_year: str, term: int) -> Dict[str, Any]:
-        dataset = {
+    def _get_analysis_dataset(self, school_year: str, term: int) -> Dict[str, Any]:
+        """Analyse-Datensatz einer Periode über den versionierten Cache (nur lesend verwenden)"""
+        engine = getattr(self, "analysis_engine", self.DEFAULT_ANALYSIS_ENGINE)
+        cache = getattr(self, "analysis_cache", None)
+        if cache is None:
+            return self._collect_analysis_dataset(school_year, term, engine)
+        return cache.get_or_compute(
+            self.db_path, school_year, term, engine,
+            lambda: self._collect_analysis_dataset(school_year, term, engine),
+        )
+
+    @staticmethod
+    def _write_period_stats(
+        conn: sqlite3.Connection, dataset: Dict[str, Any], version: Tuple[int, int]
+    ) -> None:
+        """Ersetzt die Kennzahlen einer Periode in period_stats durch die des Datensatzes"""
+        school_year, term = dataset["period"]
+        school = dataset.get("school") or {}
+        rows = [("schule", "", school.get("count", 0), school.get("av_avg"), school.get("sv_avg"),
+                 school.get("gesamt_avg"), school.get("completion_pct"), None)]
+        for ebene, stats_map in (("klasse", dataset["class_stats"]), ("jahrgang", dataset["year_stats"])):
+            for key, stats in stats_map.items():
+                rows.append((ebene, str(key), stats["count"], stats["av_avg"], stats["sv_avg"],
+                             stats["gesamt_avg"], stats["completion_pct"], None))
+        for row in dataset["subject_stats"]:
+            rows.append(("fach", row["subject"], row["count"], row["av_avg"], row["sv_avg"],
+                         row["gesamt_avg"], None, row["stddev"]))
+
+        conn.execute("DELETE FROM period_stats WHERE schuljahr = ? AND halbjahr = ?", (school_year, term))
+        conn.executemany(
+            """
+            INSERT INTO period_stats (schuljahr, halbjahr, ebene, schluessel, anzahl, av_avg, sv_avg,
+                                      gesamt_avg, completion_pct, stddev, daten_version, schueler_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(school_year, term, *row, version[0], version[1]) for row in rows],
+        )
+
+    def _load_period_summary(
+        self, conn: sqlite3.Connection, school_year: str, term: int, version: Tuple[int, int]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Kennzahlen einer Periode aus period_stats im Format von _collect_analysis_dataset
+        (ohne Lernenden-Listen und Rankings); None, wenn nicht vorhanden oder veraltet.
+        """
+        rows = conn.execute(
+            """
+            SELECT ebene, schluessel, anzahl, av_avg, sv_avg, gesamt_avg, completion_pct, stddev,
+                   daten_version, schueler_version
+            FROM period_stats
+            WHERE schuljahr = ? AND halbjahr = ?
+            """,
+            (school_year, term),
+        ).fetchall()
+        if not any(r[0] == "schule" and (r[8], r[9]) == tuple(version) for r in rows):
+            return None
+
+        summary = self._empty_analysis_dataset(school_year, term)
+        class_stats, year_stats = {}, {}
+        for ebene, key, anzahl, av, sv, gesamt, completion, stddev, _, _ in rows:
+            stats = {"count": anzahl, "av_avg": av, "sv_avg": sv, "gesamt_avg": gesamt, "completion_pct": completion}
+            if ebene == "schule":
+                summary["school"] = stats
+            elif ebene == "klasse":
+                class_stats[key] = stats
+            elif ebene == "jahrgang":
+                year_stats[int(key)] = stats
+            elif ebene == "fach":
+                summary["subject_stats"].append(
+                    {"subject": key, "av_avg": av, "sv_avg": sv, "gesamt_avg": gesamt, "count": anzahl, "stddev": stddev}
+                )
+        summary["class_stats"] = {
+            k: class_stats[k] for k in sorted(class_stats, key=self._class_sort_key)
+        }
+        summary["year_stats"] = {k: year_stats[k] for k in sorted(year_stats)}
+        summary["subject_stats"].sort(
+            key=lambda x: (float("inf") if x["gesamt_avg"] is None else x["gesamt_avg"], x["subject"].lower())
+        )
+        return summary
+
+    def _get_period_summary(self, school_year: str, term: int) -> Dict[str, Any]:
+        """
+        Kennzahlen einer Vergleichsperiode: aus period_stats, falls aktuell, sonst einmal
+        berechnen und speichern. Ohne Versionstabellen der volle Analyse-Datensatz.
+        """
+        version = AnalysisDatasetCache.data_version(self.db_path, school_year, term)
+        if version is None:
+            return self._get_analysis_dataset(school_year, term)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                summary = self._load_period_summary(conn, school_year, term, version)
+            if summary is not None:
+                return summary
+        except sqlite3.Error as e:
+            logging.warning(f"period_stats nicht lesbar ({school_year} HJ {term}): {e}")
+            return self._get_analysis_dataset(school_year, term)
+
+        dataset = self._get_analysis_dataset(school_year, term)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                self._write_period_stats(conn, dataset, version)
+        except sqlite3.Error as e:
+            logging.warning(f"period_stats nicht geschrieben ({school_year} HJ {term}): {e}")
+        return dataset
+
+    def update_period_stats(self) -> int:
+        """
+        Schreibt period_stats für alle Perioden neu, deren Daten sich seit der letzten
+        Berechnung geändert haben (Import, Bearbeitung, Deaktivierung). Gibt die Anzahl
+        aktualisierter Perioden zurück.
+        """
+        updated = 0
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                stored = {
+                    (sy, int(term)): (dv, sv)
+                    for sy, term, dv, sv in conn.execute(
+                        "SELECT schuljahr, halbjahr, daten_version, schueler_version FROM period_stats WHERE ebene = 'schule'"
+                    )
+                }
+            for school_year, term in self._get_available_periods():
+                version = AnalysisDatasetCache.data_version(self.db_path, school_year, term)
+                if version is None or stored.get((school_year, term)) == version:
+                    continue
+                dataset = self._get_analysis_dataset(school_year, term)
+                with sqlite3.connect(self.db_path) as conn:
+                    self._write_period_stats(conn, dataset, version)
+                updated += 1
+        except sqlite3.Error as e:
+            logging.warning(f"period_stats konnten nicht aktualisiert werden: {e}")
+        if updated:
+            logging.info(f"period_stats für {updated} Periode(n) aktualisiert")
+        return updated
+
+    def schedule_period_stats_update(self):
+        """Aktualisiert period_stats im Hintergrund (nach Import oder Bearbeitung)"""
+        if self.db_path.exists():
+            self.refresh_worker.submit("periodenstatistik", self.update_period_stats, lambda _: None)
+
+    def _get_period_history(self) -> List[Dict[str, Any]]:
+        """Schulweite Kennzahlen aller Perioden aus period_stats, chronologisch"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                rows = conn.execute(
+                    """
+                    SELECT schuljahr, halbjahr, anzahl, gesamt_avg, completion_pct
+                    FROM period_stats WHERE ebene = 'schule'
+                    """
+                ).fetchall()
+        except sqlite3.Error:
+            return []
+        history = [
+            {"period": (sy, int(term)), "count": anzahl, "gesamt_avg": gesamt, "completion_pct": completion}
+            for sy, term, anzahl, gesamt, completion in rows
+        ]
+        history.sort(key=lambda h: self._period_sort_key(*h["period"]))
+        return history
+
+    def _collect_teacher_stats(self, school_year: str, term: int) -> List[Dict[str, Any]]:
+        """
+        Kennzahlen je Lehrkraft (noten.lehrer_kuerzel) für eine Periode in einer Abfrage über
+        idx_noten_periode_lehrer: Klassen, Fächer, Vollständigkeit (gefüllte AV/SV-Einträge,
+        Sondernoten zählen) sowie AV-/SV-/Gesamtschnitt und Streuung. Nur aktive Lernende;
+        Einträge ohne Kürzel erscheinen als „(ohne Kürzel)“. Sortiert nach Vollständigkeit.
+        """
+        if not self.db_path.exists():
+            return []
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(
+                """
+                SELECT
+                    n.lehrer_kuerzel,
+                    GROUP_CONCAT(DISTINCT s.klasse),
+                    GROUP_CONCAT(DISTINCT COALESCE(NULLIF(TRIM(f.fach_lang), ''), f.fach_kurz)),
+                    COUNT(*),
+                    SUM((n.note_av IS NOT NULL OR n.note_av_special IS NOT NULL)
+                      + (n.note_sv IS NOT NULL OR n.note_sv_special IS NOT NULL)),
+                    SUM(n.note_av), COUNT(n.note_av), SUM(n.note_av * n.note_av),
+                    SUM(n.note_sv), COUNT(n.note_sv), SUM(n.note_sv * n.note_sv)
+                FROM noten n
+                JOIN schueler s ON s.schueler_id = n.schueler_id
+                LEFT JOIN faecher f ON f.fach_id = n.fach_id
+                WHERE n.schuljahr = ? AND n.halbjahr = ?
+                  AND COALESCE(s.is_active, 1) = 1
+                GROUP BY n.lehrer_kuerzel
+                """,
+                (school_year, term),
+            ).fetchall()
+
+        # NULL, '' und Kürzel mit Leerzeichen zusammenführen
+        merged: Dict[str, Dict[str, Any]] = {}
+        for kuerzel, klassen, faecher, eintraege, gefuellt, av_sum, av_cnt, av_sq, sv_sum, sv_cnt, sv_sq in rows:
+            key = (kuerzel or "").strip() or "(ohne Kürzel)"
+            t = merged.setdefault(key, {
+                "lehrkraft": key, "klassen": set(), "faecher": set(), "eintraege": 0, "gefuellt": 0,
+                "av_sum": 0, "av_cnt": 0, "av_sq": 0, "sv_sum": 0, "sv_cnt": 0, "sv_sq": 0,
+            })
+            t["klassen"].update(k for k in (klassen or "").split(",") if k)
+            t["faecher"].update(f for f in (faecher or "").split(",") if f)
+            t["eintraege"] += eintraege
+            t["gefuellt"] += gefuellt or 0
+            for col, value in (("av_sum", av_sum), ("av_cnt", av_cnt), ("av_sq", av_sq),
+                               ("sv_sum", sv_sum), ("sv_cnt", sv_cnt), ("sv_sq", sv_sq)):
+                t[col] += value or 0
+
+        teachers = []
+        for t in merged.values():
+            count = t["av_cnt"] + t["sv_cnt"]
+            total = t["av_sum"] + t["sv_sum"]
+            gesamt_avg = total / count if count else None
+            stddev = None
+            if count >= 2:
+                stddev = math.sqrt(max(0.0, (t["av_sq"] + t["sv_sq"]) / count - gesamt_avg ** 2))
+            erwartet = t["eintraege"] * 2
+            teachers.append(
+                {
+                    "lehrkraft": t["lehrkraft"],
+                    "klassen": sorted(t["klassen"], key=self._class_sort_key),
+                    "faecher": sorted(t["faecher"], key=str.lower),
+                    "eintraege": t["eintraege"],
+                    "fehlend": erwartet - t["gefuellt"],
+                    "completion_pct": (t["gefuellt"] * 100.0 / erwartet) if erwartet else None,
+                    "av_avg": t["av_sum"] / t["av_cnt"] if t["av_cnt"] else None,
+                    "sv_avg": t["sv_sum"] / t["sv_cnt"] if t["sv_cnt"] else None,
+                    "gesamt_avg": gesamt_avg,
+                    "stddev": stddev,
+                }
+            )
+        teachers.sort(
+            key=lambda t: (
+                float("inf") if t["completion_pct"] is None else t["completion_pct"],
+                -t["fehlend"],
+                t["lehrkraft"].lower(),
+            )
+        )
+        return teachers
+
+    def _collect_analysis_dataset(self, school_year: str, term: int, engine: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Kennzahlen einer Periode für den Analyse-Tab.
+
+        engine wählt die Berechnung (Standard: self.analysis_engine): "pandas" rechnet
+        spaltenweise mit groupby, "sql" aggregiert und rangiert direkt in SQLite, "python"
+        ist die ursprüngliche zeilenweise Variante. Alle liefern dieselbe Struktur; schlägt
+        pandas oder sql fehl, wird zeilenweise gerechnet.
+        """
+        engine = engine or getattr(self, "analysis_engine", self.DEFAULT_ANALYSIS_ENGINE)
+        if engine not in self.ANALYSIS_ENGINES:
+            raise ValueError(f"Unbekannte Analyse-Engine: {engine}")
+        if engine == "pandas":
+            try:
+                return self._collect_analysis_dataset_vectorized(school_year, term)
+            except Exception as e:
+                logging.warning(f"Vektorisierte Analyse fehlgeschlagen, rechne zeilenweise: {e}")
+        elif engine == "sql":
+            try:
+                return self._collect_analysis_dataset_sql(school_year, term)
+            except sqlite3.Error as e:
+                logging.warning(f"SQL-Analyse fehlgeschlagen, rechne zeilenweise: {e}")
+        return self._collect_analysis_dataset_python(school_year, term)
+
+    @staticmethod
+    def _empty_analysis_dataset(school_year: str, term: int) -> Dict[str, Any]:
+        return {
             "students": [],
             "class_stats": {},
             "year_stats": {},
@@ -3754,98 +5461,469 @@ class KopfnotenGUI:
             "top_school": [],
             "period": (school_year, term),
         }
+
+    def _collect_analysis_dataset_vectorized(self, school_year: str, term: int) -> Dict[str, Any]:
+        """Wie _collect_analysis_dataset_python, aber mit einem DataFrame und groupby statt Zeilenschleifen"""
+        dataset = self._empty_analysis_dataset(school_year, term)
         if not self.db_path.exists():
             return dataset
 
+        # Spaltenweise laden: eine Zeile je Lernendem, Noten nur als Zahlen (keine Namen je Zeile)
         with sqlite3.connect(self.db_path) as conn:
-            rows = conn.execute(
+            students = pd.read_sql_query(
+                """
+                SELECT schueler_id AS id, name, klasse, target_subjects
+                FROM schueler
+                WHERE COALESCE(is_active, 1) = 1
+                ORDER BY klasse, name
+                """,
+                conn,
+            )
+            grades = pd.read_sql_query(
                 """
                 SELECT
-                    s.schueler_id,
-                    s.name,
-                    s.klasse,
-                    s.target_subjects,
+                    n.schueler_id,
                     n.fach_id,
-                    COALESCE(f.fach_lang, f.fach_kurz, '') AS fach_name,
                     n.note_av,
                     n.note_sv,
-                    n.note_av_special,
-                    n.note_sv_special
-                FROM schueler s
-                LEFT JOIN noten n ON s.schueler_id = n.schueler_id
-                    AND n.schuljahr = ?
-                    AND n.halbjahr = ?
-                LEFT JOIN faecher f ON n.fach_id = f.fach_id
-                WHERE COALESCE(s.is_active, 1) = 1
-                ORDER BY s.klasse, s.name
+                    n.note_av_special IS NOT NULL AS av_special,
+                    n.note_sv_special IS NOT NULL AS sv_special
+                FROM noten n
+                JOIN schueler s ON s.schueler_id = n.schueler_id
+                WHERE n.schuljahr = ?
+                  AND n.halbjahr = ?
+                  AND COALESCE(s.is_active, 1) = 1
+                """,
+                conn,
+                params=(school_year, term),
+            )
+            fach_names = dict(conn.execute("SELECT fach_id, COALESCE(fach_lang, fach_kurz, '') FROM faecher"))
+
+        def none_if_nan(value):
+            return None if value is None or pd.isna(value) else float(value)
+
+        def summarize(frame: pd.DataFrame, by: Optional[str]) -> pd.DataFrame:
+            columns = ["av_avg", "sv_avg", "gesamt_avg", "completion_pct"]
+            grouped = frame.groupby(by, sort=False) if by else frame.groupby(pd.Series(0, index=frame.index))
+            result = grouped[columns].mean()
+            result["count"] = grouped.size()
+            return result
+
+        def stats_dict(row) -> Dict[str, Any]:
+            return {
+                "count": int(row["count"]),
+                "av_avg": none_if_nan(row["av_avg"]),
+                "sv_avg": none_if_nan(row["sv_avg"]),
+                "gesamt_avg": none_if_nan(row["gesamt_avg"]),
+                "completion_pct": none_if_nan(row["completion_pct"]),
+            }
+
+        if students.empty:
+            dataset["school"] = {"count": 0, "av_avg": None, "sv_avg": None, "gesamt_avg": None, "completion_pct": None}
+            return dataset
+
+        av = pd.to_numeric(grades["note_av"], errors="coerce")
+        sv = pd.to_numeric(grades["note_sv"], errors="coerce")
+        av_filled = av.notna() | grades["av_special"].astype(bool)
+        sv_filled = sv.notna() | grades["sv_special"].astype(bool)
+        grades = grades.assign(
+            av=av,
+            sv=sv,
+            filled=av_filled.astype(int) + sv_filled.astype(int),
+            graded_fach=grades["fach_id"].where((grades["fach_id"] != 0) & (av_filled | sv_filled)),
+        )
+
+        # Schülerebene: Summen/Anzahlen statt Listen, Reihenfolge wie in der Schülerabfrage
+        per_student = grades.groupby("schueler_id").agg(
+            av_sum=("av", "sum"),
+            av_cnt=("av", "count"),
+            sv_sum=("sv", "sum"),
+            sv_cnt=("sv", "count"),
+            notes_total=("filled", "sum"),
+            subjects_graded=("graded_fach", "nunique"),
+        ).reindex(students["id"].values)
+        per_student = per_student.fillna({c: 0 for c in per_student.columns})
+        av_cnt = per_student["av_cnt"].values
+        sv_cnt = per_student["sv_cnt"].values
+        all_cnt = av_cnt + sv_cnt
+        students["jahrgang"] = students["klasse"].map(
+            {k: self._extract_jahrgang_from_klasse(k) for k in students["klasse"].unique()}
+        )
+        students["av_avg"] = per_student["av_sum"].values / pd.Series(av_cnt).where(av_cnt > 0).values
+        students["sv_avg"] = per_student["sv_sum"].values / pd.Series(sv_cnt).where(sv_cnt > 0).values
+        students["gesamt_avg"] = (
+            (per_student["av_sum"].values + per_student["sv_sum"].values) / pd.Series(all_cnt).where(all_cnt > 0).values
+        )
+        students["notes_total"] = per_student["notes_total"].values.astype(int)
+        students["subjects_graded"] = per_student["subjects_graded"].values.astype(int)
+
+        # Ziel-Fächerzahl: eigener Wert, sonst Standard des Jahrgangs (nur wo nötig nachschlagen)
+        own_target = pd.to_numeric(students["target_subjects"], errors="coerce").fillna(0)
+        missing_years = students.loc[own_target == 0, "jahrgang"].unique()
+        default_targets = {jg: self.get_default_target_for_grade(jg) for jg in missing_years}
+        targets = own_target.where(own_target != 0, students["jahrgang"].map(default_targets)).fillna(0)
+        completion = (students["notes_total"] / (targets * 2).clip(lower=1) * 100.0).clip(upper=100.0)
+        students["completion_pct"] = completion.where(targets != 0)
+
+        records = []
+        for rec in students.to_dict("records"):
+            records.append(
+                {
+                    "id": int(rec["id"]),
+                    "name": rec["name"],
+                    "klasse": rec["klasse"],
+                    "jahrgang": int(rec["jahrgang"]),
+                    "av_avg": none_if_nan(rec["av_avg"]),
+                    "sv_avg": none_if_nan(rec["sv_avg"]),
+                    "gesamt_avg": none_if_nan(rec["gesamt_avg"]),
+                    "notes_total": int(rec["notes_total"]),
+                    "subjects_graded": int(rec["subjects_graded"]),
+                    "completion_pct": none_if_nan(rec["completion_pct"]),
+                }
+            )
+        dataset["students"] = records
+
+        class_order = sorted(students["klasse"].unique(), key=self._class_sort_key)
+        year_order = sorted(students["jahrgang"].unique())
+        class_stats = summarize(students, "klasse")
+        year_stats = summarize(students, "jahrgang")
+        dataset["class_stats"] = {klasse: stats_dict(class_stats.loc[klasse]) for klasse in class_order}
+        dataset["year_stats"] = {int(jg): stats_dict(year_stats.loc[jg]) for jg in year_order}
+        dataset["school"] = stats_dict(summarize(students, None).iloc[0])
+
+        # Fächer: AV- und SV-Werte untereinander, dann ein groupby für Mittel, Anzahl, Streuung
+        subject = grades["fach_id"].map({k: str(v or "").strip() for k, v in fach_names.items()}).fillna("")
+        values = pd.concat(
+            [
+                pd.DataFrame({"subject": subject, "kind": "av", "value": grades["av"]}),
+                pd.DataFrame({"subject": subject, "kind": "sv", "value": grades["sv"]}),
+            ]
+        )
+        values = values[values["subject"] != ""]
+        subject_stats = []
+        if not values.empty:
+            combined = values.groupby("subject", sort=False)["value"].agg(["mean", "count", lambda x: x.std(ddof=0)])
+            combined.columns = ["mean", "count", "std"]
+            by_kind = values.groupby(["subject", "kind"], sort=False)["value"].mean()
+            for name, row in combined.iterrows():
+                count = int(row["count"])
+                subject_stats.append(
+                    {
+                        "subject": name,
+                        "av_avg": none_if_nan(by_kind.get((name, "av"))),
+                        "sv_avg": none_if_nan(by_kind.get((name, "sv"))),
+                        "gesamt_avg": none_if_nan(row["mean"]),
+                        "count": count,
+                        "stddev": float(row["std"]) if count >= 2 else 0.0,
+                    }
+                )
+        subject_stats.sort(
+            key=lambda x: (
+                float("inf") if x["gesamt_avg"] is None else x["gesamt_avg"],
+                x["subject"].lower(),
+            )
+        )
+        dataset["subject_stats"] = subject_stats
+
+        # Top-N: einmal sortieren, dann je Gruppe die ersten Plätze
+        ranked = students.assign(pos=range(len(students)), name_key=students["name"].str.lower())
+        ranked = ranked[ranked["gesamt_avg"].notna()].sort_values(
+            ["gesamt_avg", "notes_total", "name_key"], ascending=[True, False, True], kind="mergesort"
+        )
+        top3 = ranked[ranked["subjects_graded"] >= 3]
+        dataset["top_school"] = [records[i] for i in ranked[ranked["subjects_graded"] >= 4]["pos"].head(10)]
+        top_class = top3.groupby("klasse", sort=False)["pos"].apply(lambda x: list(x.head(1)))
+        top_year = top3.groupby("jahrgang", sort=False)["pos"].apply(lambda x: list(x.head(3)))
+        dataset["top_by_class"] = {
+            klasse: [records[i] for i in top_class.get(klasse, [])] for klasse in class_order
+        }
+        dataset["top_by_year"] = {
+            int(jg): [records[i] for i in top_year.get(jg, [])] for jg in year_order
+        }
+        return dataset
+
+    def _collect_analysis_dataset_sql(self, school_year: str, term: int) -> Dict[str, Any]:
+        """
+        Wie _collect_analysis_dataset_python, aber mit Aggregation in SQLite.
+
+        Schülerkennzahlen entstehen per GROUP BY in einer temporären Tabelle, Klassen-,
+        Jahrgangs-, Schul- und Fächerwerte per GROUP BY darüber, die Ranglisten per
+        ROW_NUMBER() OVER (PARTITION BY …). Jahrgang, Standard-Zielwert und Kleinschreibung
+        kommen als registrierte Python-Funktionen, damit sie exakt der GUI-Logik entsprechen.
+        """
+        dataset = self._empty_analysis_dataset(school_year, term)
+        if not self.db_path.exists():
+            return dataset
+
+        def default_target(jahrgang):
+            return self.get_default_target_for_grade(jahrgang)
+
+        def group_stats(row) -> Dict[str, Any]:
+            return {
+                "count": row[1],
+                "av_avg": row[2],
+                "sv_avg": row[3],
+                "gesamt_avg": row[4],
+                "completion_pct": row[5],
+            }
+
+        stats_columns = """
+            COUNT(*), AVG(av_avg), AVG(sv_avg), AVG(gesamt_avg), AVG(completion_pct)
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.create_function("kn_jahrgang", 1, self._extract_jahrgang_from_klasse, deterministic=True)
+            conn.create_function("kn_ziel", 1, default_target, deterministic=True)
+            conn.create_function("kn_lower", 1, lambda v: str(v or "").lower(), deterministic=True)
+            conn.execute("DROP TABLE IF EXISTS temp.analyse_schueler")
+            conn.execute(
+                """
+                CREATE TEMP TABLE analyse_schueler AS
+                WITH agg AS (
+                    SELECT
+                        s.schueler_id,
+                        s.name,
+                        s.klasse,
+                        kn_jahrgang(s.klasse) AS jahrgang,
+                        s.target_subjects,
+                        SUM(n.note_av) AS av_sum,
+                        COUNT(n.note_av) AS av_cnt,
+                        SUM(n.note_sv) AS sv_sum,
+                        COUNT(n.note_sv) AS sv_cnt,
+                        COALESCE(SUM((n.note_av IS NOT NULL OR n.note_av_special IS NOT NULL)
+                                   + (n.note_sv IS NOT NULL OR n.note_sv_special IS NOT NULL)), 0) AS notes_total,
+                        COUNT(DISTINCT CASE
+                            WHEN n.fach_id <> 0 AND (n.note_av IS NOT NULL OR n.note_sv IS NOT NULL
+                                 OR n.note_av_special IS NOT NULL OR n.note_sv_special IS NOT NULL)
+                            THEN n.fach_id END) AS subjects_graded
+                    FROM schueler s
+                    LEFT JOIN noten n ON s.schueler_id = n.schueler_id
+                        AND n.schuljahr = ?
+                        AND n.halbjahr = ?
+                    WHERE COALESCE(s.is_active, 1) = 1
+                    GROUP BY s.schueler_id
+                ),
+                ziel AS (
+                    SELECT *, CASE WHEN target_subjects THEN target_subjects ELSE kn_ziel(jahrgang) END AS ziel
+                    FROM agg
+                )
+                SELECT
+                    schueler_id,
+                    name,
+                    klasse,
+                    jahrgang,
+                    1.0 * av_sum / NULLIF(av_cnt, 0) AS av_avg,
+                    1.0 * sv_sum / NULLIF(sv_cnt, 0) AS sv_avg,
+                    1.0 * (COALESCE(av_sum, 0) + COALESCE(sv_sum, 0)) / NULLIF(av_cnt + sv_cnt, 0) AS gesamt_avg,
+                    notes_total,
+                    subjects_graded,
+                    CASE WHEN ziel THEN MIN(100.0, notes_total * 100.0 / MAX(1, ziel * 2)) END AS completion_pct
+                FROM ziel
+                """,
+                (school_year, term),
+            )
+
+            students = conn.execute(
+                """
+                SELECT schueler_id, name, klasse, jahrgang, av_avg, sv_avg, gesamt_avg,
+                       notes_total, subjects_graded, completion_pct
+                FROM analyse_schueler
+                ORDER BY klasse, name, schueler_id
+                """
+            ).fetchall()
+            class_rows = conn.execute(f"SELECT klasse, {stats_columns} FROM analyse_schueler GROUP BY klasse").fetchall()
+            year_rows = conn.execute(f"SELECT jahrgang, {stats_columns} FROM analyse_schueler GROUP BY jahrgang").fetchall()
+            school_row = conn.execute(f"SELECT NULL, {stats_columns} FROM analyse_schueler").fetchone()
+            # Fächer: Summen, Anzahlen und Quadratsummen je Fachname; Streuung daraus in Python
+            subject_rows = conn.execute(
+                """
+                WITH je_fach AS (
+                    SELECT
+                        n.fach_id,
+                        SUM(n.note_av) AS av_sum, COUNT(n.note_av) AS av_cnt, SUM(n.note_av * n.note_av) AS av_sq,
+                        SUM(n.note_sv) AS sv_sum, COUNT(n.note_sv) AS sv_cnt, SUM(n.note_sv * n.note_sv) AS sv_sq
+                    FROM analyse_schueler a
+                    JOIN noten n ON n.schueler_id = a.schueler_id AND n.schuljahr = ? AND n.halbjahr = ?
+                    GROUP BY n.fach_id
+                )
+                SELECT
+                    TRIM(COALESCE(f.fach_lang, f.fach_kurz, ''), char(32, 9, 10, 13)) AS fach,
+                    SUM(j.av_sum), SUM(j.av_cnt), SUM(j.av_sq),
+                    SUM(j.sv_sum), SUM(j.sv_cnt), SUM(j.sv_sq)
+                FROM je_fach j
+                LEFT JOIN faecher f ON j.fach_id = f.fach_id
+                GROUP BY fach
+                HAVING fach <> ''
                 """,
                 (school_year, term),
             ).fetchall()
+            ranking_rows = conn.execute(
+                """
+                WITH rang AS (
+                    SELECT
+                        schueler_id, klasse, jahrgang, subjects_graded,
+                        ROW_NUMBER() OVER (
+                            ORDER BY gesamt_avg, notes_total DESC, kn_lower(name), klasse, name, schueler_id
+                        ) AS pos
+                    FROM analyse_schueler
+                    WHERE gesamt_avg IS NOT NULL
+                )
+                SELECT 'schule', NULL, schueler_id, rn FROM (
+                    SELECT schueler_id, ROW_NUMBER() OVER (ORDER BY pos) AS rn
+                    FROM rang WHERE subjects_graded >= 4
+                ) WHERE rn <= 10
+                UNION ALL
+                SELECT 'klasse', klasse, schueler_id, rn FROM (
+                    SELECT klasse, schueler_id, ROW_NUMBER() OVER (PARTITION BY klasse ORDER BY pos) AS rn
+                    FROM rang WHERE subjects_graded >= 3
+                ) WHERE rn <= 1
+                UNION ALL
+                SELECT 'jahrgang', jahrgang, schueler_id, rn FROM (
+                    SELECT jahrgang, schueler_id, ROW_NUMBER() OVER (PARTITION BY jahrgang ORDER BY pos) AS rn
+                    FROM rang WHERE subjects_graded >= 3
+                ) WHERE rn <= 3
+                ORDER BY 1, 2, 4
+                """
+            ).fetchall()
+            conn.execute("DROP TABLE IF EXISTS temp.analyse_schueler")
 
-        student_map = {}
-        subject_map = {}
-        for s_id, name, klasse, target_subjects, fach_id, fach_name, av, sv, av_special, sv_special in rows:
-            if s_id not in student_map:
-                student_map[s_id] = {
-                    "id": s_id,
-                    "name": name,
-                    "klasse": klasse,
-                    "jahrgang": self._extract_jahrgang_from_klasse(klasse),
-                    "target_subjects": target_subjects,
-                    "av_notes": [],
-                    "sv_notes": [],
-                    "combined_notes": [],
-                    "graded_subjects": set(),
-                    "filled_entries": 0,
-                }
-            sm = student_map[s_id]
-            if av is not None:
-                sm["av_notes"].append(float(av))
-                sm["combined_notes"].append(float(av))
-            if av is not None or av_special is not None:
-                sm["filled_entries"] += 1
-            if sv is not None:
-                sm["sv_notes"].append(float(sv))
-                sm["combined_notes"].append(float(sv))
-            if sv is not None or sv_special is not None:
-                sm["filled_entries"] += 1
-            if fach_id and (av is not None or sv is not None or av_special is not None or sv_special is not None):
-                sm["graded_subjects"].add(int(fach_id))
-
-            subject_name = (fach_name or "").strip()
-            if subject_name:
-                if subject_name not in subject_map:
-                    subject_map[subject_name] = {"av_notes": [], "sv_notes": [], "combined_notes": []}
-                if av is not None:
-                    subject_map[subject_name]["av_notes"].append(float(av))
-                    subject_map[subject_name]["combined_notes"].append(float(av))
-                if sv is not None:
-                    subject_map[subject_name]["sv_notes"].append(float(sv))
-                    subject_map[subject_name]["combined_notes"].append(float(sv))
-
-        for sm in student_map.values():
-            av_avg = self._safe_avg(sm["av_notes"])
-            sv_avg = self._safe_avg(sm["sv_notes"])
-            ges_avg = self._safe_avg(sm["combined_notes"])
-            notes_total = sm["filled_entries"]
-            target = sm["target_subjects"] or self.get_default_target_for_grade(sm["jahrgang"])
-            completion_pct = None
-            if target:
-                completion_pct = min(100.0, (notes_total / max(1, target * 2)) * 100.0)
-            dataset["students"].append(
+        records = {}
+        for s_id, name, klasse, jahrgang, av_avg, sv_avg, ges_avg, notes_total, graded, completion in students:
+            records[s_id] = {
+                "id": s_id,
+                "name": name,
+                "klasse": klasse,
+                "jahrgang": jahrgang,
+                "av_avg": av_avg,
+                "sv_avg": sv_avg,
+                "gesamt_avg": ges_avg,
+                "notes_total": notes_total,
+                "subjects_graded": graded,
+                "completion_pct": completion,
+            }
+        dataset["students"] = list(records.values())
+        if not records:
+            dataset["school"] = group_stats((None, 0, None, None, None, None))
+            return dataset
+
+        dataset["class_stats"] = {
+            row[0]: group_stats(row) for row in sorted(class_rows, key=lambda r: self._class_sort_key(r[0]))
+        }
+        dataset["year_stats"] = {row[0]: group_stats(row) for row in sorted(year_rows, key=lambda r: r[0])}
+        dataset["school"] = group_stats(school_row)
+
+        subject_stats = []
+        for fach, av_sum, av_cnt, av_sq, sv_sum, sv_cnt, sv_sq in subject_rows:
+            anzahl = av_cnt + sv_cnt
+            summe = (av_sum or 0) + (sv_sum or 0)
+            quadrate = (av_sq or 0) + (sv_sq or 0)
+            stddev = 0.0
+            if anzahl >= 2:
+                # Bei ganzzahligen Noten exakt: (n·Σx² − (Σx)²) / n²
+                stddev = math.sqrt(max(0, anzahl * quadrate - summe * summe) / (anzahl * anzahl))
+            subject_stats.append(
                 {
-                    "id": sm["id"],
-                    "name": sm["name"],
-                    "klasse": sm["klasse"],
-                    "jahrgang": sm["jahrgang"],
-                    "av_avg": av_avg,
-                    "sv_avg": sv_avg,
-                    "gesamt_avg": ges_avg,
-                    "notes_total": notes_total,
-                    "subjects_graded": len(sm["graded_subjects"]),
-                    "completion_pct": completion_pct,
+                    "subject": fach,
+                    "av_avg": av_sum / av_cnt if av_cnt else None,
+                    "sv_avg": sv_sum / sv_cnt if sv_cnt else None,
+                    "gesamt_avg": summe / anzahl if anzahl else None,
+                    "count": anzahl,
+                    "stddev": stddev,
                 }
             )
+        subject_stats.sort(
+            key=lambda x: (
+                float("inf") if x["gesamt_avg"] is None else x["gesamt_avg"],
+                x["subject"].lower(),
+            )
+        )
+        dataset["subject_stats"] = subject_stats
+
+        dataset["top_by_class"] = {klasse: [] for klasse in dataset["class_stats"]}
+        dataset["top_by_year"] = {jahrgang: [] for jahrgang in dataset["year_stats"]}
+        for scope, key, s_id, _ in ranking_rows:
+            if scope == "schule":
+                dataset["top_school"].append(records[s_id])
+            elif scope == "klasse":
+                dataset["top_by_class"][key].append(records[s_id])
+            else:
+                dataset["top_by_year"][key].append(records[s_id])
+        return dataset
+
+    def _collect_analysis_dataset_python(self, school_year: str, term: int) -> Dict[str, Any]:
+        dataset = {
+            "students": [],
+            "class_stats": {},
+            "year_stats": {},
+            "subject_stats": [],
+            "school": {},
+            "top_by_class": {},
+            "top_by_year": {},
+            "top_school": [],
+            "period": (school_year, term),
+        }
+        if not self.db_path.exists():
+            return dataset
+
+        student_rows = []
+        subject_map = {}
+        subject_names = {}  # fach_id -> Anzeigename
+        with sqlite3.connect(self.db_path) as conn:
+            for record in iter_period_students(conn, school_year, term):
+                jahrgang = self._extract_jahrgang_from_klasse(record.klasse)
+                av_notes, sv_notes, combined_notes = [], [], []
+                graded_subjects = set()
+                filled_entries = 0
+                for g in record.grades:
+                    av, sv = g.note_av, g.note_sv
+                    has_av = av is not None or g.av_special is not None
+                    has_sv = sv is not None or g.sv_special is not None
+                    if av is not None:
+                        av_notes.append(float(av))
+                        combined_notes.append(float(av))
+                    if has_av:
+                        filled_entries += 1
+                    if sv is not None:
+                        sv_notes.append(float(sv))
+                        combined_notes.append(float(sv))
+                    if has_sv:
+                        filled_entries += 1
+                    if g.fach_id and (has_av or has_sv):
+                        graded_subjects.add(int(g.fach_id))
+
+                    subject_name = subject_names.get(g.fach_id)
+                    if subject_name is None:
+                        fach_name = g.fach_lang if g.fach_lang is not None else (g.fach_kurz or "")
+                        subject_name = subject_names[g.fach_id] = fach_name.strip()
+                    if subject_name:
+                        entry = subject_map.get(subject_name)
+                        if entry is None:
+                            entry = subject_map[subject_name] = {"av_notes": [], "sv_notes": [], "combined_notes": []}
+                        if av is not None:
+                            entry["av_notes"].append(float(av))
+                            entry["combined_notes"].append(float(av))
+                        if sv is not None:
+                            entry["sv_notes"].append(float(sv))
+                            entry["combined_notes"].append(float(sv))
+
+                target = record.target_subjects or self.get_default_target_for_grade(jahrgang)
+                completion_pct = None
+                if target:
+                    completion_pct = min(100.0, (filled_entries / max(1, target * 2)) * 100.0)
+                student_rows.append(
+                    {
+                        "id": record.id,
+                        "name": record.name,
+                        "klasse": record.klasse,
+                        "jahrgang": jahrgang,
+                        "av_avg": self._safe_avg(av_notes),
+                        "sv_avg": self._safe_avg(sv_notes),
+                        "gesamt_avg": self._safe_avg(combined_notes),
+                        "notes_total": filled_entries,
+                        "subjects_graded": len(graded_subjects),
+                        "completion_pct": completion_pct,
+                    }
+                )
+        dataset["students"] = student_rows
 
         def summarize_group(students: List[Dict[str, Any]]) -> Dict[str, Any]:
             av_values = [s["av_avg"] for s in students if s["av_avg"] is not None]
@@ -3952,13 +6030,14 @@ class KopfnotenGUI:
                 delta = None
                 if school.get("gesamt_avg") is not None and prev_school.get("gesamt_avg") is not None:
                     delta = school["gesamt_avg"] - prev_school["gesamt_avg"]
-                student_delta = len(students) - len(previous.get("students", []))
+                prev_count = prev_school.get("count", 0)
+                student_delta = len(students) - prev_count
                 lines.extend([
                     "",
                     f"→ {prev_year} (HJ {prev_term}):",
                     f"  Gesamtdurchschnitt: {self._fmt_avg(prev_school.get('gesamt_avg'))} "
                     f"(Delta {self._fmt_avg(delta)})",
-                    f"  Lernende aktiv: {len(previous.get('students', []))} (Delta {student_delta:+d})",
+                    f"  Lernende aktiv: {prev_count} (Delta {student_delta:+d})",
                     f"  Vollständigkeit: {self._fmt_avg(prev_school.get('completion_pct'))}%",
                 ])
         return "\n".join(lines)
@@ -4049,19 +6128,44 @@ class KopfnotenGUI:
                 lines.append(f"- {klasse}: keine ausreichenden Daten")
         return "\n".join(lines)
 
+    def _render_history_lines(self, history: List[Dict[str, Any]]) -> List[str]:
+        """Verlauf der schulweiten Kennzahlen über alle gespeicherten Halbjahre"""
+        if len(history) < 2:
+            return []
+        lines = ["=== Verlauf Schule (alle Halbjahre) ==="]
+        previous_avg = None
+        for entry in history:
+            sy, term = entry["period"]
+            avg = entry["gesamt_avg"]
+            delta = None if avg is None or previous_avg is None else avg - previous_avg
+            completion = self._fmt_avg(entry["completion_pct"])
+            lines.append(
+                f"  - {self._period_label(sy, term)}: Ø {self._fmt_avg(avg)}"
+                f"{'' if delta is None else f' ({delta:+.2f})'}, "
+                f"{entry['count']} Lernende, Vollständigkeit {completion}{'' if completion == '-' else '%'}"
+            )
+            if avg is not None:
+                previous_avg = avg
+        lines.append("")
+        return lines
+
     def _render_trends_section(
-        self, current: Dict[str, Any], compare_datasets: Optional[List[Dict[str, Any]]] = None
+        self,
+        current: Dict[str, Any],
+        compare_datasets: Optional[List[Dict[str, Any]]] = None,
+        history: Optional[List[Dict[str, Any]]] = None,
     ) -> str:
         compare_datasets = compare_datasets or []
+        history_lines = self._render_history_lines(history or [])
         if not compare_datasets:
-            return (
+            return "\n".join(history_lines + [
                 "Keine Vergleichsperioden ausgewählt.\n\n"
                 "Wählen Sie im Feld „Vergleichsperioden“ eine oder mehrere Perioden "
                 "(Strg+Klick für Mehrfachauswahl) und klicken Sie auf „Analyse aktualisieren“."
-            )
+            ])
 
         current_year, current_term = current["period"]
-        lines = [
+        lines = history_lines + [
             f"Entwicklung der Basisperiode {current_year} (HJ {current_term}) "
             f"gegen {len(compare_datasets)} ausgewählte Periode(n):",
             "Hinweis: Deaktivierte Lernende sind ausgeschlossen.",
@@ -4082,7 +6186,7 @@ class KopfnotenGUI:
                 f"{self._fmt_avg(current_school.get('gesamt_avg'))} (Delta {self._fmt_avg(school_delta)})"
             )
             lines.append(
-                f"- Lernende aktiv: {len(previous.get('students', []))} -> "
+                f"- Lernende aktiv: {prev_school.get('count', 0)} -> "
                 f"{len(current.get('students', []))}"
             )
 
@@ -4183,6 +6287,7 @@ class KopfnotenGUI:
         self._sync_insights_compare_periods(school_year, term)
 
         if not self.db_path.exists():
+            self.refresh_worker.cancel("analyse")
             if hasattr(self, "insights_kpi_vars"):
                 self.insights_kpi_vars["students"].set("0")
                 self.insights_kpi_vars["overall_avg"].set("-")
@@ -4198,22 +6303,38 @@ class KopfnotenGUI:
                 self._set_tree_rows(self.insights_top_tables.get("class"), [])
             return
 
+        compare_periods = self._get_selected_compare_periods()
+        self.refresh_worker.submit(
+            "analyse",
+            lambda: self._compute_insights_view(school_year, term, compare_periods),
+            self._apply_insights_view,
+        )
+
+    def _compute_insights_view(
+        self, school_year: str, term: int, compare_periods: List[Tuple[str, int]]
+    ) -> Dict[str, Any]:
+        """
+        Berechnet alle Inhalte des Analyse-Tabs (KPIs, Texte, Tabellenzeilen) ohne Tk-Zugriffe.
+        Bei Fehlern enthält das Ergebnis nur "fehler".
+        """
         try:
-            current = self._collect_analysis_dataset(school_year, term)
+            current = self._get_analysis_dataset(school_year, term)
             compare_datasets = []
-            for cmp_sy, cmp_term in self._get_selected_compare_periods():
-                compare_datasets.append(self._collect_analysis_dataset(cmp_sy, cmp_term))
-
-            if hasattr(self, "insights_kpi_vars"):
-                self.insights_kpi_vars["students"].set(str(len(current.get("students", []))))
-                self.insights_kpi_vars["overall_avg"].set(self._fmt_avg(current.get("school", {}).get("gesamt_avg")))
-                completion = current.get("school", {}).get("completion_pct")
-                completion_text = self._fmt_avg(completion)
-                self.insights_kpi_vars["completion"].set("-" if completion_text == "-" else f"{completion_text}%")
-                self.insights_kpi_vars["classes"].set(str(len(current.get("class_stats", {}))))
-
-            self._set_insights_text_section("overview", self._render_overview_section(current, compare_datasets))
-            self._set_insights_text_section("trends", self._render_trends_section(current, compare_datasets))
+            for cmp_sy, cmp_term in compare_periods:
+                compare_datasets.append(self._get_period_summary(cmp_sy, cmp_term))
+            history = self._get_period_history()
+
+            completion_text = self._fmt_avg(current.get("school", {}).get("completion_pct"))
+            kpis = {
+                "students": str(len(current.get("students", []))),
+                "overall_avg": self._fmt_avg(current.get("school", {}).get("gesamt_avg")),
+                "completion": "-" if completion_text == "-" else f"{completion_text}%",
+                "classes": str(len(current.get("class_stats", {}))),
+            }
+            sections = {
+                "overview": self._render_overview_section(current, compare_datasets),
+                "trends": self._render_trends_section(current, compare_datasets, history),
+            }
 
             class_rows = []
             for klasse, stats in sorted(current["class_stats"].items(), key=lambda item: self._class_sort_key(item[0])):
@@ -4227,7 +6348,6 @@ class KopfnotenGUI:
                         stats["count"],
                     )
                 )
-            self._set_insights_table_rows("classes", class_rows)
 
             year_rows = []
             for jahrgang, stats in sorted(current["year_stats"].items(), key=lambda item: item[0]):
@@ -4241,7 +6361,6 @@ class KopfnotenGUI:
                         stats["count"],
                     )
                 )
-            self._set_insights_table_rows("years", year_rows)
 
             subject_rows = []
             ranked_subjects = [s for s in current["subject_stats"] if s["gesamt_avg"] is not None]
@@ -4257,7 +6376,6 @@ class KopfnotenGUI:
                         row["count"],
                     )
                 )
-            self._set_insights_table_rows("subjects", subject_rows)
 
             school_rows = []
             for idx, s in enumerate(current["top_school"][:10], start=1):
@@ -4285,25 +6403,66 @@ class KopfnotenGUI:
                     class_rows_top.append(
                         (klasse, "— (keine ausreichenden Daten)", "-", "-", "-", "-", "-")
                     )
-            if hasattr(self, "insights_top_tables"):
-                self._set_tree_rows(self.insights_top_tables.get("school"), school_rows)
-                self._set_tree_rows(self.insights_top_tables.get("year"), year_rows_top)
-                self._set_tree_rows(self.insights_top_tables.get("class"), class_rows_top)
+            teacher_rows = []
+            for t in self._collect_teacher_stats(school_year, term):
+                teacher_rows.append(
+                    (
+                        t["lehrkraft"],
+                        ", ".join(t["klassen"]),
+                        ", ".join(t["faecher"]),
+                        t["eintraege"],
+                        self._fmt_avg(t["completion_pct"]),
+                        t["fehlend"],
+                        self._fmt_avg(t["av_avg"]),
+                        self._fmt_avg(t["sv_avg"]),
+                        self._fmt_avg(t["gesamt_avg"]),
+                        self._fmt_avg(t["stddev"]),
+                    )
+                )
+
+            return {
+                "kpis": kpis,
+                "sections": sections,
+                "tables": {
+                    "classes": class_rows,
+                    "years": year_rows,
+                    "subjects": subject_rows,
+                    "teachers": teacher_rows,
+                },
+                "top": {"school": school_rows, "year": year_rows_top, "class": class_rows_top},
+            }
         except Exception as e:
             logging.error(f"Fehler beim Aktualisieren der Analysekennzahlen: {e}")
+            return {"fehler": str(e)}
+
+    def _apply_insights_view(self, view: Dict[str, Any]):
+        """Überträgt ein berechnetes Analyse-Ergebnis in die Widgets (UI-Thread)"""
+        if "fehler" in view:
             if hasattr(self, "insights_kpi_vars"):
                 self.insights_kpi_vars["students"].set("-")
                 self.insights_kpi_vars["overall_avg"].set("-")
                 self.insights_kpi_vars["completion"].set("-")
                 self.insights_kpi_vars["classes"].set("-")
             for key in self.insights_text_sections:
-                self._set_insights_text_section(key, f"Analyse konnte nicht berechnet werden:\n{e}")
+                self._set_insights_text_section(key, f"Analyse konnte nicht berechnet werden:\n{view['fehler']}")
             for key in self.insights_tables:
                 self._set_insights_table_rows(key, [])
             if hasattr(self, "insights_top_tables"):
                 self._set_tree_rows(self.insights_top_tables.get("school"), [])
                 self._set_tree_rows(self.insights_top_tables.get("year"), [])
                 self._set_tree_rows(self.insights_top_tables.get("class"), [])
+            return
+
+        if hasattr(self, "insights_kpi_vars"):
+            for key, value in view["kpis"].items():
+                self.insights_kpi_vars[key].set(value)
+        for key, text in view["sections"].items():
+            self._set_insights_text_section(key, text)
+        for key, rows in view["tables"].items():
+            self._set_insights_table_rows(key, rows)
+        if hasattr(self, "insights_top_tables"):
+            for key, rows in view["top"].items():
+                self._set_tree_rows(self.insights_top_tables.get(key), rows)
 
     def create_export_tab(self):
         """Erstellt vereinfachten Export-Tab"""
@@ -4341,6 +6500,27 @@ class KopfnotenGUI:
         date_entry = ttk.Entry(date_frame, textvariable=self.export_date_var, width=15)
         date_entry.pack(side=tk.LEFT, padx=(5, 5))
         ttk.Button(date_frame, text="Heute", command=lambda: self.export_date_var.set(datetime.now().strftime("%d.%m.%Y"))).pack(side=tk.LEFT)
+        self.export_parallel_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            date_frame, text="Klassen parallel exportieren", variable=self.export_parallel_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        self.export_only_changed_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            date_frame, text="Nur geänderte Klassen", variable=self.export_only_changed_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        self.export_bundle_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            date_frame, text="Als ZIP-Paket", variable=self.export_bundle_var
+        ).pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Label(date_frame, text="Zusammenfassen:").pack(side=tk.LEFT, padx=(15, 0))
+        self.export_merge_var = tk.StringVar(value="Keine")
+        ttk.Combobox(
+            date_frame,
+            textvariable=self.export_merge_var,
+            values=list(self.EXPORT_MERGE_OPTIONS),
+            width=14,
+            state="readonly",
+        ).pack(side=tk.LEFT, padx=(5, 0))
         # Klassenauswahl
         class_frame = ttk.LabelFrame(export_frame, text="Klassenauswahl")
         class_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -4359,6 +6539,10 @@ class KopfnotenGUI:
             command=self.start_optimized_export,
         )
         self.export_btn.pack(side=tk.RIGHT, padx=(5, 0))
+        self.export_cancel_btn = ttk.Button(
+            class_controls, text="⏹ Abbrechen", command=self.cancel_export, state=tk.DISABLED
+        )
+        self.export_cancel_btn.pack(side=tk.RIGHT, padx=(5, 0))
         # Content
         content_frame = ttk.Frame(class_frame)
         content_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -4532,6 +6716,120 @@ class KopfnotenGUI:
             self.root.after(100, lambda: self.status_manager.clear_status())
             self.root.after(100, lambda: setattr(self, "export_running", False))
 
+    def export_students_bulk(self):
+        """Exportiert je Lernendem ein eigenes Dokument: markierte Zeilen oder alle gefilterten"""
+        if self.export_running:
+            messagebox.showwarning("Export läuft", "Es läuft bereits ein Export!")
+            return
+
+        items = self.analysis_tree.selection() or self.analysis_tree.get_children()
+        students = [self.analysis_tree.item(it)["values"] for it in items]
+        students = [v for v in students if v]
+        if not students:
+            messagebox.showwarning("Keine Auswahl", "Keine Lernenden in der aktuellen Auswahl bzw. Filterung.")
+            return
+
+        template_path = Path(self.template_var.get().strip())
+        if not template_path.is_absolute():
+            template_path = Path.cwd() / template_path
+        if not template_path or not template_path.exists():
+            messagebox.showerror(
+                "Template fehlt", "Bitte wählen Sie eine gültige Template-Datei aus."
+            )
+            self.notebook.select(getattr(self, "export_tab", 3))
+            return
+
+        output_dir = Path(self.output_var.get().strip())
+        if not output_dir:
+            output_dir = self.paths.output_word_dir
+            self.output_var.set(str(output_dir))
+        try:
+            self.path_manager.ensure_directory(output_dir)
+        except Exception as e:
+            messagebox.showerror(
+                "Ausgabe-Fehler",
+                f"Ausgabeverzeichnis konnte nicht erstellt werden:\n{e}",
+            )
+            return
+
+        schueler_ids = [int(v[0]) for v in students]
+        klassen = sorted({str(v[2]) for v in students})
+        if not messagebox.askyesno(
+            "Einzelexport",
+            f"{len(schueler_ids)} Einzeldokumente aus {len(klassen)} Klasse(n) erstellen?",
+        ):
+            return
+
+        # Export-UI vorbereiten (Fortschritt im Export-Tab)
+        self.export_running = True
+        self.export_cancel_event.clear()
+        self.export_btn.config(state=tk.DISABLED, text="Export läuft...")
+        self.export_cancel_btn.config(state=tk.NORMAL)
+        self.export_progress.config(mode="determinate", maximum=len(schueler_ids), value=0)
+        self.clear_export_log()
+        self.log_to_export(f"Starte Einzelexport für {len(schueler_ids)} Lernende ({', '.join(klassen)})")
+        self.status_manager.set_status("Einzelexport läuft...", True)
+        self.notebook.select(getattr(self, "export_tab", 3))
+
+        export_date = self.export_date_var.get().strip()
+        bundle = bool(self.export_bundle_var.get())
+        threading.Thread(
+            target=self.run_students_bulk_export,
+            args=(schueler_ids, klassen, template_path, output_dir, export_date, bundle),
+            daemon=True,
+        ).start()
+
+    def run_students_bulk_export(
+        self,
+        schueler_ids: List[int],
+        klassen: List[str],
+        template_path: Path,
+        output_dir: Path,
+        export_date: str,
+        bundle: bool = False,
+    ):
+        """Führt den Einzelexport in separatem Thread aus"""
+        try:
+            school_year, term = self._get_active_period()
+            with OptimizedKopfnotenExporter(self.db_path, school_year=school_year, term=term) as exporter:
+
+                def on_progress(done: int, total: int, key: str, result: Dict[str, Any]):
+                    self.queue_ui(self.export_progress.config, value=done)
+                    self.queue_ui(self.status_manager.set_status, f"Einzelexport {done}/{total}", True)
+                    if not result["datei_erstellt"]:
+                        self.log_to_export(f"❌ {key}: {result.get('fehler', 'Unbekannter Fehler')}")
+
+                summary = exporter.export_einzelschueler_bulk(
+                    output_dir,
+                    template_path,
+                    klassen,
+                    schueler_ids=schueler_ids,
+                    export_date=export_date,
+                    on_progress=on_progress,
+                    cancel_event=self.export_cancel_event,
+                    bundle=bundle,
+                )
+
+            status = "abgebrochen" if summary["abgebrochen"] else "abgeschlossen"
+            msg = (
+                f"Einzelexport {status}.\n\n"
+                f"Dokumente erstellt: {summary['gesamt_dateien']} von {len(schueler_ids)}\n"
+                f"Fehler: {summary['gesamt_fehler']}\n"
+                f"Dauer: {summary['duration'].total_seconds():.1f} Sekunden\n"
+                f"Ausgabe: {summary.get('bundle_file', summary['output_dir'])}"
+            )
+            self.log_to_export(("⏹ " if summary["abgebrochen"] else "✅ ") + msg)
+            self.root.after(100, lambda: messagebox.showinfo("Einzelexport", msg))
+        except Exception as e:
+            error_msg = f"❌ Einzelexport fehlgeschlagen: {str(e)}"
+            self.log_to_export(error_msg)
+            logging.error(f"Einzelexport-Fehler: {e}")
+            self.root.after(
+                100, lambda: messagebox.showerror("Export-Fehler", error_msg)
+            )
+        finally:
+            self.root.after(100, self.reset_export_ui)
+
     # ===================== OPTIMIERTE FUNKTIONEN =====================
 
     def start_optimized_export(self):
@@ -4573,10 +6871,12 @@ class KopfnotenGUI:
 
         selected_classes = [self.export_listbox.get(i) for i in selected_indices]
 
-        # Export-UI vorbereiten
+        # Export-UI vorbereiten (Fortschritt je Klasse, Abbruch nach der aktuellen Klasse)
         self.export_running = True
+        self.export_cancel_event.clear()
         self.export_btn.config(state=tk.DISABLED, text="Export läuft...")
-        self.export_progress.start()
+        self.export_cancel_btn.config(state=tk.NORMAL)
+        self.export_progress.config(mode="determinate", maximum=len(selected_classes), value=0)
         self.clear_export_log()
         self.log_to_export(
             f"Starte optimierten horizontalen Export für {len(selected_classes)} Klassen"
@@ -4585,15 +6885,27 @@ class KopfnotenGUI:
 
         # Export in separatem Thread
         export_date = self.export_date_var.get().strip()
+        parallel = bool(self.export_parallel_var.get())
+        only_changed = bool(self.export_only_changed_var.get())
+        bundle = bool(self.export_bundle_var.get())
+        merge = self.EXPORT_MERGE_OPTIONS.get(self.export_merge_var.get())
         export_thread = threading.Thread(
             target=self.run_optimized_export,
-            args=(selected_classes, template_path, output_dir, export_date),
+            args=(selected_classes, template_path, output_dir, export_date, parallel, only_changed, bundle, merge),
             daemon=True,
         )
         export_thread.start()
 
     def run_optimized_export(
-        self, klassen: List[str], template_path: Path, output_dir: Path, export_date: str
+        self,
+        klassen: List[str],
+        template_path: Path,
+        output_dir: Path,
+        export_date: str,
+        parallel: bool = False,
+        only_changed: bool = False,
+        bundle: bool = False,
+        merge: Optional[str] = None,
     ):
         """Führt optimierten Export aus"""
         try:
@@ -4602,41 +6914,82 @@ class KopfnotenGUI:
                 start_time = datetime.now()
                 self.log_to_export(f"Start: {start_time.strftime('%H:%M:%S')}")
 
-                summary = exporter.export_horizontal_tables(
-                    output_dir, template_path, klassen, export_date=export_date
-                )
-                end_time = datetime.now()
-                duration = end_time - start_time
-                # Detaillierte Log-Ausgabe
-                self.log_to_export(f"\nOptimierter Export Details:")
-                for klasse, details in summary["klassen_details"].items():
+                # Ergebnisse je Klasse sofort ins Log, nicht erst am Ende
+                done = {"count": 0, "fortschritt": 0}
+
+                def on_event(ereignis: str, klasse: str, daten: Dict[str, Any]):
+                    if ereignis == "gestartet":
+                        self.queue_ui(self.status_manager.set_status, f"Exportiere {klasse} …", True)
+                    elif ereignis in ("gespeichert", "fehlgeschlagen"):
+                        done["fortschritt"] += 1
+                        self.queue_ui(self.export_progress.config, value=done["fortschritt"])
+
+                def on_class_done(klasse: str, details: Dict[str, Any]):
+                    done["count"] += 1
+                    progress = f"[{done['count']}/{len(klassen)}]"
                     if details["datei_erstellt"]:
                         self.log_to_export(
-                            f"✅ {klasse}: {details['schueler_count']} Schüler, "
-                            f"max. {details['faecher_count']} Fächer"
-                        )
-                        self.log_to_export(
-                            f" Datei: {Path(details['output_file']).name}"
+                            f"✅ {progress} {klasse}: {details['schueler_count']} Schüler, "
+                            f"max. {details['faecher_count']} Fächer ({self._format_export_zeiten(details.get('zeiten', {}))})"
                         )
+                        if details.get("output_file"):
+                            self.log_to_export(
+                                f" Datei: {Path(details['output_file']).name}"
+                            )
                     else:
                         self.log_to_export(
-                            f"❌ {klasse}: {details.get('fehler', 'Unbekannter Fehler')}"
+                            f"❌ {progress} {klasse}: {details.get('fehler', 'Unbekannter Fehler')}"
                         )
 
+                summary = exporter.export_horizontal_tables(
+                    output_dir,
+                    template_path,
+                    klassen,
+                    export_date=export_date,
+                    parallel=parallel,
+                    on_class_done=on_class_done,
+                    only_changed=only_changed,
+                    bundle=bundle,
+                    merge=merge,
+                    on_event=on_event,
+                    cancel_event=self.export_cancel_event,
+                )
+                end_time = datetime.now()
+                duration = end_time - start_time
+                if summary["export_mode"] == "horizontal_parallel":
+                    self.log_to_export("Modus: parallel (Klassen in eigenen Prozessen)")
+                for klasse, exported_at in summary["uebersprungen"].items():
+                    self.log_to_export(f"⏭️ {klasse}: unverändert seit Export vom {exported_at} – übersprungen")
+                for label, info in summary.get("zusammengefuehrt", {}).items():
+                    self.log_to_export(
+                        f"📄 {label.replace('_', ' ')}: {len(info['klassen'])} Klassen in {Path(info['datei']).name}"
+                    )
+                if summary.get("bundle_file"):
+                    self.log_to_export(f"📦 ZIP-Paket: {summary['bundle_file']}")
+                self.log_to_export(f"Zeiten gesamt: {self._format_export_zeiten(summary['zeiten'])}")
+
                 # Erfolg-Meldung
+                if summary["abgebrochen"]:
+                    headline = (
+                        f"⏹ Export abgebrochen nach {len(summary['klassen_details'])} von {len(klassen)} Klassen."
+                    )
+                else:
+                    headline = "✅ Optimierter horizontaler Export erfolgreich!"
                 success_msg = (
-                    f"✅ Optimierter horizontaler Export erfolgreich!\n\n"
+                    f"{headline}\n\n"
                     f"Dateien erstellt: {summary['gesamt_dateien']}\n"
+                    f"Übersprungen (unverändert): {len(summary['uebersprungen'])}\n"
                     f"Fehler: {summary['gesamt_fehler']}\n"
                     f"Dauer: {duration.total_seconds():.1f} Sekunden\n"
-                    f"Ausgabe: {output_dir}\n\n"
+                    f"Ausgabe: {summary.get('bundle_file', output_dir)}\n\n"
                     f"Format: Horizontale Tabellen mit Beschriftungsspalte"
                 )
                 self.log_to_export(success_msg)
 
                 # GUI-Thread für MessageBox
+                title = "Export abgebrochen" if summary["abgebrochen"] else "Export erfolgreich"
                 self.root.after(
-                    100, lambda: messagebox.showinfo("Export erfolgreich", success_msg)
+                    100, lambda: messagebox.showinfo(title, success_msg)
                 )
         except Exception as e:
             error_msg = f"❌ Optimierter Export fehlgeschlagen: {str(e)}"
@@ -4736,6 +7089,7 @@ class KopfnotenGUI:
                         conn.execute("UPDATE schueler SET target_subjects = ? WHERE schueler_id = ?", (new_target, s_id))
                         conn.commit()
                     self.refresh_analysis_data()
+                    self.schedule_period_stats_update()
                 except Exception as e:
                     messagebox.showerror("Fehler", f"Konnte Wert nicht speichern: {e}")
             return
@@ -4779,9 +7133,24 @@ class KopfnotenGUI:
         """Setzt Export-UI zurück"""
         self.export_running = False
         self.export_btn.config(state=tk.NORMAL, text="🚀 Export Serienbrief")
+        self.export_cancel_btn.config(state=tk.DISABLED)
         self.export_progress.stop()
+        self.export_progress.config(mode="indeterminate", value=0)
         self.status_manager.clear_status()
 
+    @staticmethod
+    def _format_export_zeiten(zeiten: Dict[str, float]) -> str:
+        """Phasenzeiten eines Exports für das Log, z. B. "Abfrage 0.02s, Rendern 0.31s" """
+        namen = (("query", "Abfrage"), ("layout", "Layout"), ("render", "Rendern"), ("save", "Speichern"))
+        return ", ".join(f"{name} {zeiten[key]:.2f}s" for key, name in namen if key in zeiten)
+
+    def cancel_export(self):
+        """Bricht den laufenden Export nach dem aktuellen Auftrag ab"""
+        if self.export_running and not self.export_cancel_event.is_set():
+            self.export_cancel_event.set()
+            self.export_cancel_btn.config(state=tk.DISABLED)
+            self.log_to_export("⏹ Abbruch angefordert – laufende Dokumente werden noch fertiggestellt …")
+
     def select_template(self):
         """Template-Datei auswählen"""
         filename = filedialog.askopenfilename(
@@ -5126,6 +7495,8 @@ class KopfnotenGUI:
 
     def load_initial_data(self):
         """Lädt initiale Daten"""
+        # Datenbankdatei kann ausgetauscht worden sein (Import, Löschen)
+        self.analysis_cache.clear()
         if self.db_path.exists():
             # Bereinigung: TuT entfernen & Schema Update
             try:
@@ -5155,25 +7526,50 @@ class KopfnotenGUI:
             )
 
     def refresh_all_data(self):
-        """Aktualisiert alle Daten"""
+        """Aktualisiert alle Daten (Abfragen im Hintergrund, Anzeige im UI-Thread)"""
         try:
-            self.load_classes_for_export()
-            self.load_classes_for_analysis()
+            self.status_manager.set_status("Daten werden aktualisiert...")
+            self._refresh_errors = []
+            self.load_period_classes()
             self.refresh_analysis_data()
             self.refresh_insights_data()
+            self.schedule_period_stats_update()
             if TEMPLATE_MANAGER_ENABLED:
                 self.refresh_template_list()
-            self.status_manager.set_status("Daten aktualisiert")
+            # Läuft nach den obigen Aufträgen (Eingangsreihenfolge des Workers)
+            self.refresh_worker.submit("status", lambda: None, lambda _: self._finish_refresh_status())
         except Exception as e:
             logging.error(f"Fehler beim Aktualisieren: {e}")
             self.status_manager.set_status(f"Fehler: {e}")
 
-    def load_classes_for_export(self):
-        """Lädt Klassen für Export"""
+    def _on_refresh_error(self, kind: str, error: Exception):
+        """Meldet eine fehlgeschlagene Hintergrund-Aktualisierung in der Statusleiste (UI-Thread)"""
+        self._refresh_errors.append(kind)
+        self.status_manager.set_status(f"Fehler beim Aktualisieren ({kind}): {error}")
+
+    def _finish_refresh_status(self):
+        """Abschlussmeldung von refresh_all_data; Fehler bleiben sichtbar"""
+        if self._refresh_errors:
+            self.status_manager.set_status(
+                f"Daten unvollständig aktualisiert – Fehler bei: {', '.join(self._refresh_errors)}"
+            )
+        else:
+            self.status_manager.set_status("Daten aktualisiert")
+
+    def load_period_classes(self):
+        """Lädt die Klassen der aktiven Periode für Export-Liste und Analyse-Filter"""
+        if not self.db_path.exists():
+            return
+        school_year, term = self._get_active_period()
+        self.refresh_worker.submit(
+            "klassen",
+            lambda: self._query_period_classes(school_year, term),
+            self._apply_period_classes,
+        )
+
+    def _query_period_classes(self, school_year: str, term: int) -> List[str]:
+        """Klassen mit Noten in der Periode (nur aktive Lernende), sortiert; Fehler gehen an den RefreshWorker"""
         try:
-            if not self.db_path.exists():
-                return
-            school_year, term = self._get_active_period()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.execute(
                     """
@@ -5186,234 +7582,185 @@ class KopfnotenGUI:
                     """,
                     (school_year, term),
                 )
-                classes = sorted([row[0] for row in cursor.fetchall()], key=self._class_sort_key)
-                self.export_listbox.delete(0, tk.END)
-                for class_name in classes:
-                    self.export_listbox.insert(tk.END, class_name)
-                self.log_to_export(f"{len(classes)} Klassen gefunden")
+                return sorted([row[0] for row in cursor.fetchall()], key=self._class_sort_key)
         except Exception as e:
             logging.error(f"Fehler beim Laden der Klassen: {e}")
+            raise
 
-    def load_classes_for_analysis(self):
-        """Lädt Klassen für Analyse"""
-        try:
-            if not self.db_path.exists():
-                return
-            school_year, term = self._get_active_period()
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    SELECT DISTINCT s.klasse
-                    FROM schueler s
-                    JOIN noten n ON s.schueler_id = n.schueler_id
-                    WHERE n.schuljahr = ? AND n.halbjahr = ?
-                      AND COALESCE(s.is_active, 1) = 1
-                    ORDER BY s.klasse
-                    """,
-                    (school_year, term),
-                )
-                class_values = sorted([row[0] for row in cursor.fetchall()], key=self._class_sort_key)
-                classes = ["Alle"] + class_values
-                self.class_filter["values"] = classes
-                if classes:
-                    self.class_filter.set(classes[0])
-        except Exception as e:
-            logging.error(f"Fehler beim Laden der Klassen für Analyse: {e}")
+    def _apply_period_classes(self, classes: List[str]):
+        """Füllt Export-Liste und Klassenfilter der Analyse (UI-Thread)"""
+        self.export_listbox.delete(0, tk.END)
+        for class_name in classes:
+            self.export_listbox.insert(tk.END, class_name)
+        self.log_to_export(f"{len(classes)} Klassen gefunden")
+
+        filter_values = ["Alle"] + classes
+        self.class_filter["values"] = filter_values
+        self.class_filter.set(filter_values[0])
 
     def refresh_analysis_data(self, class_filter=None, student_filter=None):
-        """Aktualisiert Analyse-Daten, optional gefiltert"""
+        """Aktualisiert Analyse-Daten, optional gefiltert (Berechnung im Hintergrund)"""
+        if not self.db_path.exists():
+            return
+        # Tk-Variablen nur im UI-Thread lesen; der Worker bekommt feste Werte
+        school_year, term = self._get_active_period()
+        filters = {
+            "class_filter": class_filter,
+            "student_filter": student_filter,
+            "status_filter": self.status_filter_var.get(),
+            "teacher_filter": self.teacher_filter_var.get().strip().lower(),
+        }
+        self.refresh_worker.submit(
+            "schuelerliste",
+            lambda: self._compute_analysis_rows(school_year, term, **filters),
+            self._apply_analysis_rows,
+        )
+
+    def _apply_analysis_rows(self, rows: List[Tuple[Tuple[Any, ...], Tuple[str, ...]]]):
+        """Überträgt die berechneten Zeilen in den Treeview (UI-Thread)"""
+        columns = [
+            "ID",
+            "Name",
+            "Klasse",
+            "Fächer",
+            "AV-Noten",
+            "SV-Noten",
+            "Status",
+            "SPH-Abgleich",
+        ]
+        self.analysis_tree.delete(*self.analysis_tree.get_children())
+        self.analysis_tree["columns"] = columns
+        self.analysis_tree.column("#0", width=0, stretch=False)
+        self.analysis_tree.column("ID", width=0, stretch=False)
+        for col in columns:
+            self.analysis_tree.heading(col, text=col)
+            if col == "Name":
+                 self.analysis_tree.column(col, width=150)
+            elif col in ["Status", "SPH-Abgleich"]:
+                 self.analysis_tree.column(col, width=120)
+            else:
+                 self.analysis_tree.column(col, width=80)
+        for values, tags in rows:
+            self.analysis_tree.insert("", tk.END, values=values, tags=tags)
+
+    def _compute_analysis_rows(
+        self,
+        school_year: str,
+        term: int,
+        class_filter: Optional[str] = None,
+        student_filter: Optional[str] = None,
+        status_filter: str = "Alle",
+        teacher_filter: str = "",
+    ) -> List[Tuple[Tuple[Any, ...], Tuple[str, ...]]]:
+        """
+        Berechnet die Zeilen der Schülerliste (Werte, Tags) ohne Tk-Zugriffe,
+        damit sie im Hintergrund-Thread laufen kann. Fehler gehen an den RefreshWorker.
+        """
+        rows_out = []
         try:
-            if not self.db_path.exists():
-                return
-            school_year, term = self._get_active_period()
-            self.analysis_tree.delete(*self.analysis_tree.get_children())
-            columns = [
-                "ID",
-                "Name",
-                "Klasse",
-                "Fächer",
-                "AV-Noten",
-                "SV-Noten",
-                "Status",
-                "SPH-Abgleich",
-            ]
-            self.analysis_tree["columns"] = columns
-            self.analysis_tree.column("#0", width=0, stretch=False)
-            self.analysis_tree.column("ID", width=0, stretch=False)
-            for col in columns:
-                self.analysis_tree.heading(col, text=col)
-                if col == "Name":
-                     self.analysis_tree.column(col, width=150)
-                elif col in ["Status", "SPH-Abgleich"]:
-                     self.analysis_tree.column(col, width=120)
-                else:
-                     self.analysis_tree.column(col, width=80)
+            from collections import defaultdict
+            student_map = {} # schueler_id -> data
+            # Mapper: Klasse -> Fach (Canonical) -> Lehrer-Set
+            class_teacher_map = defaultdict(lambda: defaultdict(set))
+            # Fachbezogene Ableitungen (Canonical, Config, WPU-Flags, Anzeigename) je fach_id nur einmal
+            subject_info = {}
 
             with sqlite3.connect(self.db_path) as conn:
-                # 1. Rohdaten abrufen (Detailliert für Deduplizierung)
-                query = """
-                    SELECT
-                        s.schueler_id, s.name, s.klasse,
-                        s.target_subjects,
-                        f.fach_kurz, f.fach_typ, f.fach_lang,
-                        n.note_av, n.note_sv,
-                        n.note_av_special, n.note_sv_special,
-                        f.ist_wahlpflicht, n.ist_wahlpflicht_belegung,
-                        f.wahlpflicht_gruppe,
-                        n.lehrer_kuerzel
-                    FROM schueler s
-                    LEFT JOIN noten n ON s.schueler_id = n.schueler_id
-                        AND n.schuljahr = ?
-                        AND n.halbjahr = ?
-                    LEFT JOIN faecher f ON n.fach_id = f.fach_id
-                    WHERE COALESCE(s.is_active, 1) = 1
-                    ORDER BY s.klasse, s.name
-                """
-                cursor = conn.execute(query, (school_year, term))
-                rows = cursor.fetchall()
-
-                # 2. Daten nach Schüler gruppieren und deduplizieren
-                from collections import defaultdict
-                student_map = {} # schueler_id -> data
-                
-                # Mapper: Klasse -> Fach (Canonical) -> Lehrer (Set, da mehrere möglich?)
-                # Wir nehmen den letzten bekannten Lehrer oder sammeln alle.
-                # Besser: Klasse -> Fach -> Teacher Set
-                class_teacher_map = defaultdict(lambda: defaultdict(set))
-                
-                for row in rows:
-                    s_id, s_name, s_klasse, s_target, f_kurz, f_typ, f_lang, av, sv, av_special, sv_special, f_wp, n_wp, wp_grp, lehrer_kuerzel = row
-                    
-                    if s_id not in student_map:
-                        student_map[s_id] = {
-                            "id": s_id, "name": s_name, "klasse": s_klasse,
-                            "target_subjects_db": s_target,
-                            "av_count": 0, "sv_count": 0,
-                            "dedup_subjects": set(),
-                            "teachers": set()
-                        }
-                    
-                    sm = student_map[s_id]
-                    if f_kurz or f_lang:
-                        # STANDARDIZED CANONICAL NAME
-                        fach_canonical = self._get_canonical_name(f_kurz, f_lang)
-                        
-                        # 2. Check Config (using CLEANED name)
-                        config_status = SUBJECT_STATUS_CONFIG.get(fach_canonical, "")
-                        is_wpu_config = "WPU" in config_status
-                        
-                        # DB Flags prüfen
-                        is_wpu = bool(f_wp) or bool(n_wp) or any(p in (wp_grp or "") for p in ["WPU", "WP"]) or is_wpu_config
-                        
-                        # OVERRIDE: Prioritize explicit config (User Request for Praxistag Fix)
-                        if config_status in ["Nebenfach", "Hauptfach"]:
-                             is_wpu = False
-                        
-                        # Store raw data for later processing (we need to count first across all rows)
-                        # Wir sammeln alle Fächer des Schülers erst in einer Liste
-                        if "raw_subjects" not in sm:
-                            sm["raw_subjects"] = []
-                        
-                        sm["raw_subjects"].append({
-                            "f_kurz": f_kurz,
-                            "f_lang": f_lang,
-                            "f_typ": f_typ,
-                            "av": av,
-                            "sv": sv,
-                            "av_special": av_special,
-                            "sv_special": sv_special,
-                            "is_wpu": is_wpu,
-                            "f_canonical": fach_canonical
-                        })
-                        
-                        if lehrer_kuerzel:
-                             sm["teachers"].add(lehrer_kuerzel)
-                             class_teacher_map[s_klasse][fach_canonical].add(lehrer_kuerzel)
+                # 1. Lernende mit Notenzeilen direkt vom Cursor verarbeiten (gemeinsames Zeilenmodell)
+                for record in iter_period_students(conn, school_year, term):
+                    sm = {
+                        "id": record.id, "name": record.name, "klasse": record.klasse,
+                        "target_subjects_db": record.target_subjects,
+                        "av_count": 0, "sv_count": 0,
+                        "dedup_subjects": set(),
+                        "teachers": set(),
+                        "subjects_local": {},
+                    }
+                    student_map[record.id] = sm
 
+                    # 2. Fächer bestimmen; Notenzeilen ohne Fachstammdaten werden übersprungen
+                    subjects = []
+                    for g in record.grades:
+                        f_kurz, f_lang = g.fach_kurz, g.fach_lang
+                        if not (f_kurz or f_lang):
+                            continue
+                        info = subject_info.get(g.fach_id)
+                        if info is None:
+                            # STANDARDIZED CANONICAL NAME
+                            fach_canonical = self._get_canonical_name(f_kurz, f_lang)
+                            config_status = SUBJECT_STATUS_CONFIG.get(fach_canonical, "")
+                            wpu_base = (
+                                bool(g.ist_wahlpflicht)
+                                or any(p in (g.wahlpflicht_gruppe or "") for p in ["WPU", "WP"])
+                                or "WPU" in config_status
+                            )
+                            # OVERRIDE: Prioritize explicit config (User Request for Praxistag Fix)
+                            forced_regular = config_status in ["Nebenfach", "Hauptfach"]
+                            # Name Cleaning für Display (User Request: "Praxistag WU" -> "Praxistag", "Chemie (U1)" -> "Chemie")
+                            clean_name = fach_canonical
+                            clean_name = re.sub(r'\s+WU$', '', clean_name)
+                            clean_name = re.sub(r'\s+WP$', '', clean_name)
+                            clean_name = re.sub(r'\s*\(U\s*\d+\)', '', clean_name)
+                            clean_name = clean_name.strip()
+                            is_rel_triad = (f_kurz == "Ethik") or (f_kurz == "Religion" and g.fach_typ in ["evangelisch", "katholisch"])
+                            info = (fach_canonical, wpu_base, forced_regular, clean_name, is_rel_triad,
+                                    (f_lang or f_kurz or "").strip())
+                            subject_info[g.fach_id] = info
+                        fach_canonical, wpu_base, forced_regular, _, _, _ = info
+                        is_wpu = (wpu_base or bool(g.wahlpflicht_belegung)) and not forced_regular
+                        subjects.append((g, info, is_wpu))
+
+                        if g.lehrer_kuerzel:
+                             sm["teachers"].add(g.lehrer_kuerzel)
+                             class_teacher_map[record.klasse][fach_canonical].add(g.lehrer_kuerzel)
+
+                    if not subjects:
+                        continue
 
-                # 3. Post-Process per Student: Deduplizierung & WPU-Filterung
-                for s_id, sm in student_map.items():
-                    if "raw_subjects" not in sm: continue
-                    
-                    raw_list = sm["raw_subjects"]
-                    sm["subjects_local"] = {}
-                    
-                    # Jahrgang ermitteln (aus Klasse)
-                    klasse = sm["klasse"]
-                    match = re.search(r'(\d+)', str(klasse))
+                    # 3. Deduplizierung & WPU-Filterung
+                    match = re.search(r'(\d+)', str(record.klasse))
                     jahrgang = int(match.group(1)) if match else 0
                     wpu_limit = 2 if jahrgang >= 9 else 1
-                    
-                    # A. Zähle WPU Noten und sammle benotete WPU Fächer
+
+                    # A. Benotete WPU-Fächer in Reihenfolge sammeln, Limit anwenden
                     graded_wpu_subjects = []
-                    for r in raw_list:
-                         if r["is_wpu"] and (r["av"] is not None or r["sv"] is not None):
-                             if r["f_canonical"] not in graded_wpu_subjects:
-                                 graded_wpu_subjects.append(r["f_canonical"])
-                    
-                    # Limit anwenden
+                    for g, info, is_wpu in subjects:
+                        if is_wpu and (g.note_av is not None or g.note_sv is not None):
+                            if info[0] not in graded_wpu_subjects:
+                                graded_wpu_subjects.append(info[0])
                     allowed_wpus = graded_wpu_subjects[:wpu_limit]
-                    
-                    for r in raw_list:
-                         f_kurz = r["f_kurz"]
-                         f_lang = r["f_lang"]
-                         f_typ = r["f_typ"]
-                         av = r["av"]
-                         sv = r["sv"]
-                         av_special = r.get("av_special")
-                         sv_special = r.get("sv_special")
-                         is_wpu = r["is_wpu"]
-                         f_canonical = r["f_canonical"]
-                         
-                         is_rel_triad = (f_kurz == "Ethik") or (f_kurz == "Religion" and f_typ in ["evangelisch", "katholisch"])
-                         
-                         count_subject = True
-                         
-                         if is_wpu:
-                             # Exclude logic:
-                             if f_canonical not in allowed_wpus:
-                                 count_subject = False
-                             if av is None and sv is None and av_special is None and sv_special is None:
-                                 count_subject = False
-                         
-                         # Name Cleaning für Display (User Request: "Praxistag WU" -> "Praxistag", "Chemie (U1)" -> "Chemie")
-                         # Wir entfernen "WU", "WP" am Ende oder als Wort.
-                         # Auch (U1), (U 2), (U1) entfernen
-                         clean_name = f_canonical
-                         clean_name = re.sub(r'\s+WU$', '', clean_name)
-                         clean_name = re.sub(r'\s+WP$', '', clean_name)
-                         clean_name = re.sub(r'\s*\(U\s*\d+\)', '', clean_name)
-                         clean_name = clean_name.strip()
-                         
-                         if count_subject:
-                             if is_rel_triad:
-                                 sm["dedup_subjects"].add("REL_TRIAD")
-                             elif is_wpu:
-                                 # Use cleaned canonical name + WPU prefix for safety unique keying
-                                 # This ensures distinct subjects are distinct, but merges identicals.
-                                 sm["dedup_subjects"].add(f"WPU_{clean_name}")
-                             else:
-                                 # Using cleaned canonical name instead of f_kurz/f_typ tuple 
-                                 # to avoid splitting same subject with diff abbreviations
-                                 # But we keep f_typ if needed (Rel/Eth)? 
-                                 # Rel/Eth is handled by REL_TRIAD.
-                                 # For others: "Deutsch" is "Deutsch".
-                                 sm["dedup_subjects"].add(clean_name)
-
-                         # Für SPH-Abgleich: nur gezählte/relevante Fächer (keine ausgeschlossenen WPU-Leichen)
-                         if count_subject:
-                             local_subject_name = (f_lang or f_kurz or "").strip()
-                             if local_subject_name:
-                                 if local_subject_name not in sm["subjects_local"]:
-                                     sm["subjects_local"][local_subject_name] = {"av": False, "sv": False}
-                                 if av is not None or av_special is not None:
-                                     sm["subjects_local"][local_subject_name]["av"] = True
-                                 if sv is not None or sv_special is not None:
-                                     sm["subjects_local"][local_subject_name]["sv"] = True
-                         
-                         if av is not None or av_special is not None: sm["av_count"] += 1
-                         if sv is not None or sv_special is not None: sm["sv_count"] += 1
-                
+
+                    for g, info, is_wpu in subjects:
+                        f_canonical, _, _, clean_name, is_rel_triad, local_subject_name = info
+                        count_subject = True
+                        if is_wpu:
+                            # Exclude logic:
+                            if f_canonical not in allowed_wpus:
+                                count_subject = False
+                            if not g.has_av and not g.has_sv:
+                                count_subject = False
+
+                        if count_subject:
+                            if is_rel_triad:
+                                sm["dedup_subjects"].add("REL_TRIAD")
+                            elif is_wpu:
+                                # Bereinigter Name + WPU-Präfix: gleiche Fächer zusammen, verschiedene getrennt
+                                sm["dedup_subjects"].add(f"WPU_{clean_name}")
+                            else:
+                                sm["dedup_subjects"].add(clean_name)
+
+                            # Für SPH-Abgleich: nur gezählte/relevante Fächer (keine ausgeschlossenen WPU-Leichen)
+                            if local_subject_name:
+                                if local_subject_name not in sm["subjects_local"]:
+                                    sm["subjects_local"][local_subject_name] = {"av": False, "sv": False}
+                                if g.has_av:
+                                    sm["subjects_local"][local_subject_name]["av"] = True
+                                if g.has_sv:
+                                    sm["subjects_local"][local_subject_name]["sv"] = True
+
+                        if g.has_av: sm["av_count"] += 1
+                        if g.has_sv: sm["sv_count"] += 1
+
                 # Pro Klasse: wie viele Lernende je Fach bereits Noten haben (für SPH-Abgleich)
                 class_subject_grade_counts = defaultdict(lambda: defaultdict(int))
                 for sm in student_map.values():
@@ -5477,13 +7824,13 @@ class KopfnotenGUI:
                             status = sph_status_override
 
                         # STATUS FILTER
-                        status_filter_val = self.status_filter_var.get()
+                        status_filter_val = status_filter or "Alle"
                         if status_filter_val != "Alle":
                              if status != status_filter_val:
                                  show_student = False
 
                         # TEACHER FILTER
-                        teacher_filter_val = self.teacher_filter_var.get().strip().lower()
+                        teacher_filter_val = teacher_filter
                         if teacher_filter_val:
                              # Logic Refinement:
                              # If Status == Unvollständig (detected by status var) AND Teacher Filter Set:
@@ -5497,7 +7844,7 @@ class KopfnotenGUI:
                                  # Wir haben dedup_subjects (IST-Fächer).
                                  # Wir rufen _get_class_regular_subjects ab (Per Class Logic)
                                  # Class subjects
-                                 jg_subjects_meta = self._get_class_regular_subjects(s["klasse"]) # Dict[name, id]
+                                 jg_subjects_meta = self._get_class_regular_subjects(s["klasse"], (school_year, term)) # Dict[name, id]
                                  jg_subject_names = set(jg_subjects_meta.keys())
                                  
 
@@ -5561,29 +7908,29 @@ class KopfnotenGUI:
                         if not show_student:
                             continue
 
-                        # Zeile einfügen
-                        self.analysis_tree.insert(
-                            "",
-                            tk.END,
-                            values=(
-                                s["id"],
-                                s["name"],
-                                s["klasse"],
-                                final_target, # Zeige SOLL anstatt IST (User Request)
-                                s["av_count"],
-                                s["sv_count"],
-                                status,
-                                sph_alignment
-                            ),
-                            tags=(row_tag,) if row_tag else ()
+                        # Zeile vormerken (Einfügen im UI-Thread)
+                        rows_out.append(
+                            (
+                                (
+                                    s["id"],
+                                    s["name"],
+                                    s["klasse"],
+                                    final_target, # Zeige SOLL anstatt IST (User Request)
+                                    s["av_count"],
+                                    s["sv_count"],
+                                    status,
+                                    sph_alignment
+                                ),
+                                (row_tag,) if row_tag else (),
+                            )
                         )
 
-
-
         except Exception as e:
             logging.error(f"Fehler beim Aktualisieren der Analyse-Daten: {e}")
             import traceback
             traceback.print_exc()
+            raise
+        return rows_out
 
     def _normalize_class_for_sph(self, klasse: str) -> str:
         """Normalisiert Klassenkennung für SPH-Map (z. B. 05a -> 05A, daz2 -> DAZ2)."""
@@ -5881,6 +8228,155 @@ class KopfnotenGUI:
         ttk.Button(btns, text="Auswahl reaktivieren", command=reactivate_selected).pack(side=tk.LEFT)
         ttk.Button(btns, text="Schließen", command=dlg.destroy).pack(side=tk.RIGHT)
 
+    def _query_student_trajectory(self, student_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Halbjahresverlauf eines Lernenden (AV-/SV-/Gesamtschnitt, Vollständigkeit) in einer
+        Abfrage: Aggregation je Periode über idx_noten_schueler_periode, Veränderung zur
+        Vorperiode und laufender Schnitt per Fensterfunktion, Klassenschnitt aus period_stats
+        (nur bei passender daten_version, sonst über _get_period_summary).
+        Kennzahlen wie in _collect_analysis_dataset. None, wenn der Lernende fehlt.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            conn.create_function("kn_jahrgang", 1, self._extract_jahrgang_from_klasse, deterministic=True)
+            conn.create_function("kn_ziel", 1, self.get_default_target_for_grade, deterministic=True)
+            head = conn.execute(
+                "SELECT name, klasse, target_subjects FROM schueler WHERE schueler_id = ?", (student_id,)
+            ).fetchone()
+            if head is None:
+                return None
+            rows = conn.execute(
+                """
+                WITH je_periode AS (
+                    SELECT
+                        n.schuljahr,
+                        n.halbjahr,
+                        1.0 * SUM(n.note_av) / NULLIF(COUNT(n.note_av), 0) AS av_avg,
+                        1.0 * SUM(n.note_sv) / NULLIF(COUNT(n.note_sv), 0) AS sv_avg,
+                        1.0 * (COALESCE(SUM(n.note_av), 0) + COALESCE(SUM(n.note_sv), 0))
+                            / NULLIF(COUNT(n.note_av) + COUNT(n.note_sv), 0) AS gesamt_avg,
+                        SUM((n.note_av IS NOT NULL OR n.note_av_special IS NOT NULL)
+                          + (n.note_sv IS NOT NULL OR n.note_sv_special IS NOT NULL)) AS notes_total,
+                        COUNT(DISTINCT CASE
+                            WHEN n.fach_id <> 0 AND (n.note_av IS NOT NULL OR n.note_sv IS NOT NULL
+                                 OR n.note_av_special IS NOT NULL OR n.note_sv_special IS NOT NULL)
+                            THEN n.fach_id END) AS subjects_graded
+                    FROM noten n
+                    WHERE n.schueler_id = ?
+                    GROUP BY n.schuljahr, n.halbjahr
+                ),
+                ziel AS (
+                    SELECT CASE WHEN s.target_subjects THEN s.target_subjects
+                                ELSE kn_ziel(kn_jahrgang(s.klasse)) END AS ziel,
+                           s.klasse
+                    FROM schueler s
+                    WHERE s.schueler_id = ?
+                )
+                SELECT
+                    p.schuljahr,
+                    p.halbjahr,
+                    p.av_avg,
+                    p.sv_avg,
+                    p.gesamt_avg,
+                    p.gesamt_avg - LAG(p.gesamt_avg) OVER verlauf AS delta,
+                    AVG(p.gesamt_avg) OVER (verlauf ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS laufend_avg,
+                    p.notes_total,
+                    p.subjects_graded,
+                    CASE WHEN z.ziel THEN MIN(100.0, p.notes_total * 100.0 / MAX(1, z.ziel * 2)) END AS completion_pct,
+                    ps.gesamt_avg AS klassen_avg
+                FROM je_periode p
+                CROSS JOIN ziel z
+                LEFT JOIN daten_version dv ON dv.schuljahr = p.schuljahr AND dv.halbjahr = p.halbjahr
+                LEFT JOIN daten_version dg ON dg.schuljahr = '*' AND dg.halbjahr = 0
+                LEFT JOIN period_stats ps
+                    ON ps.schuljahr = p.schuljahr AND ps.halbjahr = p.halbjahr
+                   AND ps.ebene = 'klasse' AND ps.schluessel = z.klasse
+                   AND ps.daten_version = COALESCE(dv.version, 0)
+                   AND ps.schueler_version = COALESCE(dg.version, 0)
+                WINDOW verlauf AS (ORDER BY p.schuljahr, p.halbjahr)
+                ORDER BY p.schuljahr, p.halbjahr
+                """,
+                (student_id, student_id),
+            ).fetchall()
+
+        keys = (
+            "schuljahr", "halbjahr", "av_avg", "sv_avg", "gesamt_avg", "delta", "laufend_avg",
+            "notes_total", "subjects_graded", "completion_pct", "klassen_avg",
+        )
+        perioden = [dict(zip(keys, row)) for row in rows]
+        for p in perioden:
+            # Veraltete oder noch nicht berechnete Periodenkennzahlen: einmal berechnen und speichern
+            if p["klassen_avg"] is None:
+                klassen_stats = self._get_period_summary(p["schuljahr"], int(p["halbjahr"]))["class_stats"]
+                p["klassen_avg"] = (klassen_stats.get(head[1]) or {}).get("gesamt_avg")
+        perioden.sort(key=lambda p: self._period_sort_key(p["schuljahr"], p["halbjahr"]))
+        return {"id": student_id, "name": head[0], "klasse": head[1], "perioden": perioden}
+
+    def show_student_trajectory(self):
+        """Zeigt den Halbjahresverlauf des ausgewählten Lernenden"""
+        selection = self.analysis_tree.selection()
+        if not selection:
+            messagebox.showwarning("Keine Auswahl", "Bitte wählen Sie einen Schüler aus.")
+            return
+        values = self.analysis_tree.item(selection[0])["values"]
+        try:
+            trajectory = self._query_student_trajectory(int(values[0]))
+        except Exception as e:
+            logging.error(f"Fehler beim Laden des Verlaufs: {e}")
+            messagebox.showerror("Fehler", f"Verlauf konnte nicht geladen werden:\n{e}")
+            return
+        if trajectory is None:
+            messagebox.showwarning("Nicht gefunden", "Der Lernende ist nicht mehr in der Datenbank.")
+            return
+
+        dlg = tk.Toplevel(self.root)
+        dlg.title(f"Verlauf – {trajectory['name']}")
+        dlg.geometry("860x360")
+        dlg.transient(self.root)
+
+        ttk.Label(
+            dlg,
+            text=f"{trajectory['name']} ({trajectory['klasse']}) · {len(trajectory['perioden'])} Halbjahr(e)",
+            font=("Arial", 11, "bold"),
+        ).pack(anchor=tk.W, padx=10, pady=(10, 2))
+        ttk.Label(
+            dlg,
+            text="Δ = Veränderung des Gesamtschnitts zur Vorperiode · Klassen-Ø aus den gespeicherten Periodenkennzahlen",
+            foreground="#666",
+        ).pack(anchor=tk.W, padx=10, pady=(0, 6))
+
+        columns = ("Periode", "AV-Ø", "SV-Ø", "Gesamt-Ø", "Δ", "Laufender Ø", "Fächer", "Noten", "Vollständigkeit", "Klassen-Ø")
+        frame = ttk.Frame(dlg)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        tree = ttk.Treeview(frame, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=130 if col == "Periode" else 75, anchor=tk.W if col == "Periode" else tk.CENTER)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        sb = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=sb.set)
+        sb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        for p in trajectory["perioden"]:
+            completion = self._fmt_avg(p["completion_pct"])
+            tree.insert(
+                "",
+                tk.END,
+                values=(
+                    self._period_label(p["schuljahr"], p["halbjahr"]),
+                    self._fmt_avg(p["av_avg"]),
+                    self._fmt_avg(p["sv_avg"]),
+                    self._fmt_avg(p["gesamt_avg"]),
+                    "-" if p["delta"] is None else f"{p['delta']:+.2f}",
+                    self._fmt_avg(p["laufend_avg"]),
+                    p["subjects_graded"],
+                    p["notes_total"],
+                    "-" if completion == "-" else f"{completion}%",
+                    self._fmt_avg(p["klassen_avg"]),
+                ),
+            )
+
+        ttk.Button(dlg, text="Schließen", command=dlg.destroy).pack(anchor=tk.E, padx=10, pady=(0, 10))
+
     # ===================== HILFS-FUNKTIONEN =====================
 
     def open_database(self):
@@ -5892,6 +8388,7 @@ class KopfnotenGUI:
         )
         if filename:
             self.db_path = Path(filename)
+            self.analysis_cache.clear()
             self.refresh_all_data()
             messagebox.showinfo(
                 "Datenbank geöffnet", f"Datenbank geöffnet: {self.db_path.name}"
@@ -6232,15 +8729,18 @@ GitHub: {GITHUB_REPO_URL}
             logging.error(f"Fehler beim Laden der Klassen-WPU-Fächer: {e}")
             return []
 
-    def _get_class_regular_subjects(self, student_class: str) -> Dict[str, int]:
+    def _get_class_regular_subjects(
+        self, student_class: str, period: Optional[Tuple[str, int]] = None
+    ) -> Dict[str, int]:
         """Ermittelt alle regulären Fächer (kein WPU) für eine spezifische Klasse.
+           period: (Schuljahr, Halbjahr); ohne Angabe die aktive Periode (nur im UI-Thread).
            Returns: Dict[Fachname (Canonical), FachID]"""
         regular_subjects = {}
         if not student_class:
             return {}
             
         try:
-            school_year, term = self._get_active_period()
+            school_year, term = period or self._get_active_period()
             with sqlite3.connect(self.db_path) as conn:
                 conn.row_factory = sqlite3.Row
                 
@@ -6377,15 +8877,21 @@ PROBLEMLÖSUNG:
         try:
             self.save_sph_config()
             self.save_sph_missing_overview()
+            self.credentials_manager.sph_session.close()
+            LanisClientManager.close()
         except Exception:
             pass
         self.root.destroy()
 
 def main():
     """Hauptfunktion"""
+    # Nötig für Worker-Prozesse (paralleler Export) in der PyInstaller-EXE
+    multiprocessing.freeze_support()
     try:
         # Verzeichnisse erstellen
         APP_PATHS.ensure_runtime_dirs()
+        # LanisAPI-Workarounds einmalig beim Programmstart
+        LanisClientManager.install()
         # Anwendung starten
         app = KopfnotenGUI()
         app.root.mainloop()
@@ -0,0 +1,104 @@
+"""
+Benchmark: Kennzahlen des Analyse-Tabs (_collect_analysis_dataset) je Engine.
+
+Erzeugt eine synthetische Schule mit rund 2.000 Lernenden (54 Klassen à 37),
+misst jede Analyse-Engine und prüft, dass alle dieselbe Struktur und (bis auf
+Rundungsfehler) dieselben Werte liefern wie die zeilenweise Variante.
+
+    python benchmarks/bench_analysis.py
+    python benchmarks/bench_analysis.py --students 37 --runs 5
+"""
+import argparse
+import logging
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+os.environ.setdefault("KOPFNOTEN_DATA_ROOT", tempfile.mkdtemp(prefix="kopfnoten_bench_"))
+
+from synthetic_school import populate_database  # noqa: E402
+
+SCHOOL_YEAR = "2025/2026"
+TERM = 1
+
+
+def same_values(a, b, tol: float = 1e-9) -> bool:
+    """Vergleicht Datensätze rekursiv; Fließkommazahlen mit Toleranz."""
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and math.isclose(a, b, rel_tol=tol, abs_tol=tol)
+    if isinstance(a, dict) and isinstance(b, dict):
+        return list(a) == list(b) and all(same_values(a[k], b[k], tol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_values(x, y, tol) for x, y in zip(a, b))
+    return a == b
+
+
+def analysis_host(db_path: Path):
+    """KopfnotenGUI ohne Fenster: die Analyse-Methoden brauchen nur db_path."""
+    from app import KopfnotenGUI
+
+    host = KopfnotenGUI.__new__(KopfnotenGUI)
+    host.db_path = Path(db_path)
+    return host
+
+
+def measure(label, func, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        data = func()
+        durations.append(time.perf_counter() - started)
+    print(
+        f"{label:>8}: Median {statistics.median(durations) * 1000:.1f} ms, "
+        f"min {min(durations) * 1000:.1f} ms, max {max(durations) * 1000:.1f} ms"
+    )
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse-Benchmark (synthetische Schule)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--classes-per-year", type=int, default=9)
+    parser.add_argument("--students", type=int, default=37)
+    args = parser.parse_args()
+
+    import app  # noqa: F401  (Logging-Setup der App)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="kopfnoten_bench_analysis_") as tmp:
+        db_path = Path(tmp) / "bench.db"
+        started = time.perf_counter()
+        klassen = populate_database(
+            db_path,
+            {year: args.classes_per_year for year in range(5, 11)},
+            students=args.students,
+            school_year=SCHOOL_YEAR,
+            term=TERM,
+        )
+        print(f"Datenbank: {len(klassen)} Klassen in {time.perf_counter() - started:.1f}s erzeugt")
+
+        host = analysis_host(db_path)
+        results = {}
+        for engine in host.ANALYSIS_ENGINES:
+            results[engine] = measure(
+                engine, lambda: host._collect_analysis_dataset(SCHOOL_YEAR, TERM, engine=engine), args.runs
+            )
+
+        reference = results["python"]
+        print(f"Lernende: {len(reference['students'])}, Fächer: {len(reference['subject_stats'])}")
+        for engine, dataset in results.items():
+            if engine != "python":
+                print(f"{engine} identisch mit python: {same_values(reference, dataset)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: Datenabfrage des horizontalen Word-Exports auf einer synthetischen Vollschule.
+
+Vergleicht die frühere Abfrage je Schüler (1 + N Abfragen pro Klasse) mit der
+mengenbasierten Abfrage OptimizedKopfnotenExporter._get_klassen_horizontal
+(eine Abfrage für alle Klassen) und prüft, dass beide dieselben Daten liefern.
+
+    python benchmarks/bench_export_query.py
+    python benchmarks/bench_export_query.py --classes-per-year 9 --students 28 --runs 5
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+os.environ.setdefault("KOPFNOTEN_DATA_ROOT", tempfile.mkdtemp(prefix="kopfnoten_bench_"))
+
+from synthetic_school import populate_database  # noqa: E402
+
+SCHOOL_YEAR = "2025/2026"
+TERM = 1
+
+
+class QueryCounter:
+    """Zählt die über die Verbindung ausgeführten SQL-Anweisungen."""
+
+    def __init__(self, conn):
+        self.count = 0
+        conn.set_trace_callback(self._trace)
+
+    def _trace(self, statement):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def legacy_per_student(exporter, klassen):
+    """Frühere Variante: Schülerliste je Klasse, dann eine Fächer-Abfrage je Schüler."""
+    result = {}
+    for klasse in klassen:
+        jahrgang = exporter._extract_jahrgang(klasse)
+        schueler_rows = exporter.conn.execute(
+            """
+            SELECT DISTINCT s.schueler_id, s.name
+            FROM schueler s
+            JOIN noten n ON s.schueler_id = n.schueler_id
+            WHERE s.klasse = ?
+              AND COALESCE(s.is_active, 1) = 1
+              AND n.schuljahr = ?
+              AND n.halbjahr = ?
+            ORDER BY name
+            """,
+            (klasse, exporter.school_year, exporter.term),
+        ).fetchall()
+        schueler_liste = []
+        for i, schueler in enumerate(schueler_rows):
+            rows = exporter.conn.execute(
+                """
+                SELECT f.fach_lang, f.fach_kurz, f.fach_typ, n.note_av, n.note_sv,
+                       n.note_av_special, n.note_sv_special, n.ist_wahlpflicht_belegung,
+                       f.wahlpflicht_gruppe
+                FROM noten n
+                JOIN faecher f ON n.fach_id = f.fach_id
+                WHERE n.schueler_id = ? AND n.schuljahr = ? AND n.halbjahr = ?
+                """,
+                (schueler["schueler_id"], exporter.school_year, exporter.term),
+            ).fetchall()
+            faecher_spalten, av_noten, sv_noten = exporter._format_faecher_logic(rows, jahrgang)
+            schueler_liste.append({
+                "name": schueler["name"],
+                "klasse": klasse,
+                "faecher_spalten": faecher_spalten,
+                "av_noten": av_noten,
+                "sv_noten": sv_noten,
+                "faecher_anzahl": len(faecher_spalten),
+                "ist_letzter": (i == len(schueler_rows) - 1),
+            })
+        result[klasse] = schueler_liste
+    return result
+
+
+def measure(label, func, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        data = func()
+        durations.append(time.perf_counter() - started)
+    print(
+        f"{label:>13}: Median {statistics.median(durations) * 1000:.1f} ms, "
+        f"min {min(durations) * 1000:.1f} ms, max {max(durations) * 1000:.1f} ms"
+    )
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export-Abfrage-Benchmark (synthetische Vollschule)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--classes-per-year", type=int, default=9)
+    parser.add_argument("--students", type=int, default=25)
+    args = parser.parse_args()
+
+    from app import OptimizedKopfnotenExporter
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="kopfnoten_bench_export_") as tmp:
+        db_path = Path(tmp) / "bench.db"
+        started = time.perf_counter()
+        klassen = populate_database(
+            db_path,
+            {year: args.classes_per_year for year in range(5, 11)},
+            students=args.students,
+            school_year=SCHOOL_YEAR,
+            term=TERM,
+        )
+        print(f"Datenbank: {len(klassen)} Klassen in {time.perf_counter() - started:.1f}s erzeugt")
+
+        with OptimizedKopfnotenExporter(str(db_path), school_year=SCHOOL_YEAR, term=TERM) as exporter:
+            counter = QueryCounter(exporter.conn)
+            legacy = measure("1+N", lambda: legacy_per_student(exporter, klassen), args.runs)
+            legacy_queries, counter.count = counter.count // args.runs, 0
+            batched = measure("mengenbasiert", lambda: exporter._get_klassen_horizontal(klassen), args.runs)
+            batched_queries = counter.count // args.runs
+
+        students = sum(len(v) for v in batched.values())
+        print(f"Abfragen je Export: 1+N {legacy_queries}, mengenbasiert {batched_queries} ({students} Schüler)")
+        print(f"Ergebnisse identisch: {legacy == batched}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: Rendern der horizontalen Notentabellen einer Klasse.
+
+Vergleicht die OOXML-Engine (w:tbl direkt per lxml, OptimizedKopfnotenExporter)
+mit dem Aufbau derselben Tabellen über python-docx-Aufrufe (create_table,
+cell().paragraphs[0].add_run, Spaltenbreiten), wie ihn der Jinja-Block erzeugt.
+
+    python benchmarks/bench_export_render.py
+    python benchmarks/bench_export_render.py --students 30 --year 10 --runs 5
+"""
+import argparse
+import io
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+os.environ.setdefault("KOPFNOTEN_DATA_ROOT", tempfile.mkdtemp(prefix="kopfnoten_bench_"))
+
+from synthetic_school import build_placeholder_template, populate_database  # noqa: E402
+
+SCHOOL_YEAR = "2025/2026"
+TERM = 1
+
+
+def render_python_docx(schueler_liste):
+    """Referenz: Tabellen über python-docx aufbauen (entspricht dem create_table-Block)."""
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+    for schueler in schueler_liste:
+        doc.add_paragraph(schueler["name"])
+        faecher_count = schueler["faecher_anzahl"]
+        table = doc.add_table(rows=3, cols=faecher_count + 1)
+        table.style = "Table Grid"
+        table.autofit = False
+        for row, label in enumerate(("Fach", "AV", "SV")):
+            table.cell(row, 0).paragraphs[0].add_run(label).bold = True
+        table.columns[0].width = Inches(1)
+        data_col_width = Inches(7) / faecher_count
+        for i in range(faecher_count):
+            table.columns[i + 1].width = int(data_col_width)
+            table.cell(0, i + 1).paragraphs[0].add_run(schueler["faecher_spalten"][i])
+            table.cell(1, i + 1).paragraphs[0].add_run(schueler["av_noten"][i])
+            table.cell(2, i + 1).paragraphs[0].add_run(schueler["sv_noten"][i])
+    doc.save(io.BytesIO())
+
+
+def measure(label, func, runs):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    median = statistics.median(durations)
+    print(f"{label:>11}: Median {median * 1000:.0f} ms, min {min(durations) * 1000:.0f} ms, max {max(durations) * 1000:.0f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render-Benchmark Notentabellen (eine Klasse)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--year", type=int, default=10)
+    args = parser.parse_args()
+
+    from app import OptimizedKopfnotenExporter
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix="kopfnoten_bench_render_") as tmp:
+        tmp = Path(tmp)
+        db_path = tmp / "bench.db"
+        klasse = populate_database(db_path, {args.year: 1}, students=args.students, school_year=SCHOOL_YEAR, term=TERM)[0]
+        template_path = build_placeholder_template(tmp / "template.docx")
+
+        with OptimizedKopfnotenExporter(str(db_path), school_year=SCHOOL_YEAR, term=TERM) as exporter:
+            schueler_liste = exporter._get_schueler_horizontal_optimized(klasse)
+            faecher = max(s["faecher_anzahl"] for s in schueler_liste)
+            print(f"Klasse {klasse}: {len(schueler_liste)} Schüler, bis zu {faecher} Fächer")
+
+            context = {"klasse": klasse, "export_datum": "01.01.2026", "schueler_liste": schueler_liste}
+            ooxml = measure(
+                "OOXML",
+                lambda: exporter._process_template_with_context(template_path, context, tmp / "out.docx"),
+                args.runs,
+            )
+            reference = measure("python-docx", lambda: render_python_docx(schueler_liste), args.runs)
+
+        print(f"Faktor: {reference / ooxml:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
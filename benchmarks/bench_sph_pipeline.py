@@ -0,0 +1,138 @@
+"""
+Benchmark: SPH-Download → Import → SPH-Abgleich gegen den lokalen Stand-in-Server.
+
+Läuft ohne Login (Session wird per SPHDownloader.attach_session übernommen)
+und ohne Netzwerkzugriff. Jeder Lauf nutzt ein frisches Arbeitsverzeichnis
+und eine leere Datenbank.
+
+    python benchmarks/bench_sph_pipeline.py
+    python benchmarks/bench_sph_pipeline.py --latency 0.05 --error-rate 0.05 --runs 3
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(BENCH_DIR))
+
+# App-Pfade (Logs, Temp) in ein Wegwerfverzeichnis umlenken, bevor app importiert wird
+os.environ.setdefault("KOPFNOTEN_DATA_ROOT", tempfile.mkdtemp(prefix="kopfnoten_bench_"))
+
+from fake_sph_server import FakeSPHConfig, FakeSPHServer  # noqa: E402
+
+
+def run_pipeline(server: FakeSPHServer, work_dir: Path, years, base_delay: float) -> dict:
+    from app import KopfnotenImporter
+    from sph_downloader import SPHDownloader
+    from sph_scheduler import DownloadScheduler
+
+    download_dir = work_dir / "downloads"
+    download_dir.mkdir(parents=True, exist_ok=True)
+    db_path = work_dir / "bench.db"
+
+    downloader = SPHDownloader(output_dir=str(download_dir), logger=logging.getLogger("bench.sph"))
+    downloader.BASE_URL = server.base_url
+    downloader.attach_session(server.config.school_id, server.config.sid)
+
+    timings = {}
+    started = time.perf_counter()
+    scheduler = DownloadScheduler(downloader, download_dir)
+    scheduler.BASE_DELAY = base_delay
+    files, detected = scheduler.auto_detect(years)
+    metrics = scheduler.finish_run(work_dir / "sph_download_metrics.json")
+    timings["download"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with KopfnotenImporter(str(db_path), school_year="2025/2026", term=1) as importer:
+        for file_path in files:
+            importer.import_excel_file(str(file_path))
+        importer._clean_existing_subjects()
+    timings["import"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        overview = downloader.fetch_missing_submissions_overview()
+    except Exception as e:
+        # Der Abgleich hat (noch) keine Wiederholungen – injizierte Fehler schlagen hier durch
+        print(f"SPH-Abgleich fehlgeschlagen: {e}")
+        overview = {}
+    timings["overview"] = time.perf_counter() - started
+
+    timings["total"] = timings["download"] + timings["import"] + timings["overview"]
+    return {
+        "timings": timings,
+        "classes": len(files),
+        "detected": detected,
+        "counts": metrics["counts"],
+        "retries": metrics["retries"],
+        "overview_classes": len(overview),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SPH-Pipeline-Benchmark (offline)")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="Serverlatenz je Anfrage in Sekunden")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--classes-per-year", type=int, default=9)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--recorded-dir", type=Path, default=None)
+    parser.add_argument("--backoff", type=float, default=0.05, help="Basis-Backoff des Schedulers in Sekunden")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    import app  # noqa: F401  (Logging-Setup der App)
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    if not args.verbose:
+        # "Klasse nicht vorhanden" ist bei der Autoerkennung der Normalfall
+        logging.getLogger("bench.sph").setLevel(logging.ERROR)
+
+    years = list(range(5, 11))
+    config = FakeSPHConfig(
+        latency=args.latency,
+        latency_jitter=args.jitter,
+        error_rate=args.error_rate,
+        drop_rate=args.drop_rate,
+        classes_per_year={year: args.classes_per_year for year in years},
+        students_per_class=args.students,
+        recorded_dir=args.recorded_dir,
+    )
+
+    results = []
+    with FakeSPHServer(config) as server:
+        # XLSX-Erzeugung nicht mitmessen
+        for year, count in config.classes_per_year.items():
+            for i in range(count):
+                server.class_xlsx(f"{year:02d}{'abcdefghi'[i]}")
+
+        for run in range(1, args.runs + 1):
+            with tempfile.TemporaryDirectory(prefix="kopfnoten_bench_run_") as tmp:
+                result = run_pipeline(server, Path(tmp), years, args.backoff)
+            results.append(result)
+            t = result["timings"]
+            print(
+                f"Lauf {run}: Download {t['download']:.2f}s | Import {t['import']:.2f}s | "
+                f"Abgleich {t['overview']:.2f}s | Gesamt {t['total']:.2f}s | "
+                f"{result['classes']} Klassen, {result['retries']} Wiederholungen, "
+                f"{result['counts']['failed']} fehlgeschlagen, Abgleich {result['overview_classes']} Klassen"
+            )
+        stats = dict(server.stats)
+
+    if len(results) > 1:
+        for phase in ("download", "import", "overview", "total"):
+            values = [r["timings"][phase] for r in results]
+            print(f"{phase:>9}: Median {statistics.median(values):.2f}s, min {min(values):.2f}s, max {max(values):.2f}s")
+    print(f"Server: {stats}")
+
+
+if __name__ == "__main__":
+    main()
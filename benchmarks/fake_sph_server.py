@@ -0,0 +1,239 @@
+"""
+Lokaler Stand-in für das Schulportal Hessen (nur für Benchmarks/Regressionstests).
+
+Bedient die Endpunkte, die SPHDownloader nutzt:
+  - meinunterricht.php?a=klassenlehrerAVSV&k=<Klasse>&b=xlsx  (XLSX bzw. HTML bei unbekannter Klasse)
+  - kopfnoten.php?a=fehlende (POST zweigstufe=IGS~5 …)          (HTML-Tabelle kopfnotenTable)
+  - ajax_login.php (POST name=<sid>)                            (Keep-Alive/Session-Prüfung)
+
+Antworten kommen aus einem Ordner mit aufgezeichneten Dateien (Klasse_05a.xlsx, …)
+oder werden synthetisch erzeugt. Latenz und Fehler (HTTP 5xx, Verbindungsabbrüche)
+sind konfigurierbar.
+
+Standalone:
+    python benchmarks/fake_sph_server.py --port 8765 --latency 0.05 --error-rate 0.1
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthetic_school import FULL_SCHOOL, build_class_xlsx, build_missing_overview_html, class_names
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@dataclass
+class FakeSPHConfig:
+    latency: float = 0.0  # Sekunden pro Anfrage
+    latency_jitter: float = 0.0  # zusätzliche zufällige Latenz (0 … jitter)
+    error_rate: float = 0.0  # Anteil der Anfragen mit error_status
+    error_status: int = 502
+    drop_rate: float = 0.0  # Anteil der Anfragen, bei denen die Verbindung ohne Antwort schließt
+    classes_per_year: Dict[int, int] = field(default_factory=lambda: dict(FULL_SCHOOL))
+    students_per_class: int = 25
+    recorded_dir: Optional[Path] = None
+    school_id: str = "6000"
+    sid: str = "bench-sid"
+    seed: int = 0
+
+
+class FakeSPHServer:
+    """Startet den Stand-in-Server in einem Hintergrund-Thread."""
+
+    def __init__(self, config: Optional[FakeSPHConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeSPHConfig()
+        self.stats = {"requests": 0, "xlsx": 0, "not_found": 0, "injected_errors": 0, "dropped": 0, "overview": 0}
+        self._stats_lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._xlsx_cache: Dict[str, bytes] = {}
+        self._classes = set(class_names(self.config.classes_per_year))
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeSPHServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._stats_lock:
+            return self._rng.random() < rate
+
+    def class_xlsx(self, klasse: str) -> Optional[bytes]:
+        if self.config.recorded_dir:
+            recorded = Path(self.config.recorded_dir) / f"Klasse_{klasse}.xlsx"
+            if recorded.exists():
+                return recorded.read_bytes()
+        if klasse not in self._classes:
+            return None
+        with self._stats_lock:
+            cached = self._xlsx_cache.get(klasse)
+        if cached is None:
+            cached = build_class_xlsx(klasse, self.config.students_per_class, self.config.seed)
+            with self._stats_lock:
+                self._xlsx_cache[klasse] = cached
+        return cached
+
+    def overview_html(self, zweigstufe: str) -> str:
+        try:
+            year = int(zweigstufe.split("~")[-1])
+        except ValueError:
+            year = 0
+        classes = sorted(k for k in self._classes if int(k[:2]) == year)
+        return build_missing_overview_html(classes, self.config.seed)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _params(self) -> Dict[str, str]:
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    body = self.rfile.read(length).decode("utf-8", errors="replace")
+                    params.update({k: v[0] for k, v in parse_qs(body).items()})
+                return params
+
+            def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _has_session(self) -> bool:
+                cookie = SimpleCookie(self.headers.get("Cookie", ""))
+                return "sid" in cookie and cookie["sid"].value == server.config.sid
+
+            def _handle(self):
+                server._count("requests")
+                cfg = server.config
+                # Body immer lesen, damit Keep-Alive-Verbindungen auch bei Fehlern sauber bleiben
+                path = urlparse(self.path).path.rstrip("/")
+                params = self._params()
+                if cfg.latency or cfg.latency_jitter:
+                    time.sleep(cfg.latency + random.uniform(0, cfg.latency_jitter))
+
+                if server._roll(cfg.drop_rate):
+                    server._count("dropped")
+                    self.close_connection = True
+                    return
+                if server._roll(cfg.error_rate):
+                    server._count("injected_errors")
+                    self._send(cfg.error_status, b"<html><body>Bad Gateway</body></html>")
+                    return
+
+                if path.endswith("/ajax_login.php"):
+                    valid = params.get("name") == cfg.sid
+                    self._send(200, b"6000" if valid else b"0", "text/plain")
+                    return
+
+                if path.endswith("/login"):
+                    self._send(200, b"<html><body><form id='login'></form></body></html>")
+                    return
+
+                if not self._has_session():
+                    # Wie das echte SPH: abgelaufene Session landet auf dem Login
+                    self._send(302, b"", headers={"Location": "/login", "Set-Cookie": "i=0; secure"})
+                    return
+
+                if path.endswith("/meinunterricht.php") and params.get("a") == "klassenlehrerAVSV":
+                    content = server.class_xlsx(params.get("k", ""))
+                    if content is None:
+                        server._count("not_found")
+                        self._send(200, b"<html><body>Keine Berechtigung f\xc3\xbcr diese Klasse.</body></html>")
+                    else:
+                        server._count("xlsx")
+                        self._send(200, content, XLSX_CONTENT_TYPE)
+                    return
+
+                if path.endswith("/kopfnoten.php") and params.get("a") == "fehlende":
+                    server._count("overview")
+                    self._send(200, server.overview_html(params.get("zweigstufe", "")).encode("utf-8"))
+                    return
+
+                self._send(404, b"<html><body>Not found</body></html>")
+
+            def do_GET(self):
+                self._handle()
+
+            def do_POST(self):
+                self._handle()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler SPH-Stand-in-Server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=502)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--classes-per-year", type=int, default=9)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--recorded-dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    config = FakeSPHConfig(
+        latency=args.latency,
+        latency_jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        drop_rate=args.drop_rate,
+        classes_per_year={year: args.classes_per_year for year in range(5, 11)},
+        students_per_class=args.students,
+        recorded_dir=args.recorded_dir,
+    )
+    server = FakeSPHServer(config, args.host, args.port)
+    print(f"Fake-SPH läuft auf {server.base_url} (sid={config.sid}, Schule={config.school_id})")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
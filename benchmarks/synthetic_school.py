@@ -0,0 +1,154 @@
+"""
+Synthetische Schuldaten für Benchmarks (keine echten Schülerdaten).
+
+Erzeugt SPH-ähnliche Klassenlisten (klassenlehrerAVSV-XLSX) und
+"Fehlende Abgaben"-Seiten im Format, das KopfnotenImporter bzw.
+SPHDownloader.fetch_missing_submissions_overview erwarten, sowie
+vollständig importierte Test-Datenbanken.
+"""
+import io
+import random
+import tempfile
+from pathlib import Path
+from typing import Dict, List
+
+from openpyxl import Workbook
+
+# Vollausbau: 9 Züge je Jahrgang 5–10 (= 54 Klassen)
+FULL_SCHOOL = {5: 9, 6: 9, 7: 9, 8: 9, 9: 9, 10: 9}
+SUFFIX_LETTERS = "abcdefghi"
+
+BASE_SUBJECTS = ["De", "Ma", "En", "Gl", "Bio", "Ku", "Mu", "Sp", "Re", "Re", "Et"]
+SUBJECTS_BY_YEAR = {
+    5: BASE_SUBJECTS + ["Na"],
+    6: BASE_SUBJECTS + ["Na"],
+    7: BASE_SUBJECTS + ["Ph", "WPU1"],
+    8: BASE_SUBJECTS + ["Ph", "Ch", "WPU1"],
+    9: BASE_SUBJECTS + ["Ph", "Ch", "Al", "WPU1", "WPU2"],
+    10: BASE_SUBJECTS + ["Ph", "Ch", "Al", "WPU1", "WPU2"],
+}
+WPU_SUBJECTS = ["Fr", "Es", "Inf", "Holz", "Kraft", "Textil"]
+TEACHERS = ["MÜL", "SCH", "BEC", "HOF", "WAG", "KOC", "RIC", "KLE", "WOL", "NEU", "ZIM", "KRA"]
+FIRST_NAMES = ["Emma", "Mia", "Hannah", "Lea", "Lina", "Noah", "Ben", "Paul", "Leon", "Finn", "Elias", "Jonas"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker", "Schulz", "Hoffmann"]
+
+
+def class_names(classes_per_year: Dict[int, int] = None) -> List[str]:
+    classes_per_year = classes_per_year or FULL_SCHOOL
+    return [
+        f"{year:02d}{SUFFIX_LETTERS[i]}"
+        for year, count in sorted(classes_per_year.items())
+        for i in range(count)
+    ]
+
+
+def student_names(klasse: str, count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(f"{seed}-{klasse}-names")
+    names = []
+    for i in range(count):
+        names.append(f"{rng.choice(LAST_NAMES)}, {rng.choice(FIRST_NAMES)} {klasse}-{i + 1:02d}")
+    return names
+
+
+def _grade_cell(rng: random.Random, teacher: str, missing_rate: float) -> str:
+    if rng.random() < missing_rate:
+        return f"-\n{teacher}"
+    return f"{rng.choice([1, 2, 2, 2, 3, 3, 3, 4, 4, 5])}\n{teacher}"
+
+
+def build_class_xlsx(klasse: str, students: int = 25, seed: int = 0, missing_rate: float = 0.05) -> bytes:
+    """Erzeugt eine klassenlehrerAVSV-Liste: je Schüler eine AV- und eine SV-Zeile."""
+    year = int(klasse[:2])
+    rng = random.Random(f"{seed}-{klasse}")
+    subjects = SUBJECTS_BY_YEAR.get(year, BASE_SUBJECTS)
+    teachers = {idx: rng.choice(TEACHERS) for idx in range(len(subjects))}
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(klasse)
+    ws.append(["Name", "Art"] + subjects)
+
+    for name in student_names(klasse, students, seed):
+        religion_col = rng.choice(["Re1", "Re2", "Et"])
+        wpu_choice = {s: rng.choice(WPU_SUBJECTS) for s in ("WPU1", "WPU2")}
+        for art in ("AV", "SV"):
+            row = [name, art]
+            re_seen = 0
+            for idx, subject in enumerate(subjects):
+                teacher = teachers[idx]
+                if subject == "Re":
+                    re_seen += 1
+                    row.append(_grade_cell(rng, teacher, missing_rate) if religion_col == f"Re{re_seen}" else "")
+                elif subject == "Et":
+                    row.append(_grade_cell(rng, teacher, missing_rate) if religion_col == "Et" else "")
+                elif subject.startswith("WPU"):
+                    cell = _grade_cell(rng, teacher, missing_rate).split("\n")[0]
+                    row.append(f"{cell} (W)\n{teacher} {wpu_choice[subject]}")
+                else:
+                    row.append(_grade_cell(rng, teacher, missing_rate))
+            ws.append(row)
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def build_missing_overview_html(classes: List[str], seed: int = 0) -> str:
+    """Erzeugt eine kopfnoten.php?a=fehlende-Seite mit Ampelstatus je Lerngruppe."""
+    rng = random.Random(f"{seed}-fehlende")
+    rows = []
+    for klasse in classes:
+        year = int(klasse[:2])
+        for subject in SUBJECTS_BY_YEAR.get(year, BASE_SUBJECTS):
+            status = rng.choices(["erfolgt", "tlw. fehlend", "fehlend"], weights=[8, 1, 1])[0]
+            rows.append(
+                f"<tr><td>{subject} {klasse}</td><td>{rng.choice(TEACHERS)}</td><td>{status}</td></tr>"
+            )
+    return (
+        "<html><body><table id='kopfnotenTable'><thead><tr><th>Lerngruppe</th>"
+        "<th>Lehrkraft</th><th>Status</th></tr></thead><tbody>"
+        + "".join(rows)
+        + "</tbody></table></body></html>"
+    )
+
+
+def populate_database(
+    db_path: Path,
+    classes_per_year: Dict[int, int] = None,
+    students: int = 25,
+    school_year: str = "2025/2026",
+    term: int = 1,
+    seed: int = 0,
+) -> List[str]:
+    """Importiert synthetische Klassenlisten über den KopfnotenImporter in db_path."""
+    from app import KopfnotenImporter
+
+    classes = class_names(classes_per_year)
+    with tempfile.TemporaryDirectory(prefix="kopfnoten_synth_") as tmp:
+        with KopfnotenImporter(str(db_path), school_year=school_year, term=term) as importer:
+            for klasse in classes:
+                xlsx = Path(tmp) / f"Klasse_{klasse}.xlsx"
+                xlsx.write_bytes(build_class_xlsx(klasse, students, seed))
+                importer.import_excel_file(str(xlsx))
+            importer._clean_existing_subjects()
+    return classes
+
+
+def build_placeholder_template(path: Path) -> Path:
+    """Minimales Word-Template mit DYNAMIC_TABLE_PLACEHOLDER (Aufbau wie "Test-Template erstellen")."""
+    from docx import Document
+    from docx.oxml.parser import parse_xml
+
+    doc = Document()
+    for text in ("KOPFNOTEN - KLASSE {{ klasse }}", "Export-Datum: {{ export_datum }}", "",
+                 "{% for schueler in schueler_liste %}", "{{ schueler.name }}", ""):
+        doc.add_paragraph(text)
+    doc.add_paragraph("{{! ! ! DYNAMIC_TABLE_PLACEHOLDER ! ! !}}")
+    doc.add_paragraph()
+    doc.add_paragraph("{% if not schueler.ist_letzter %}")
+    doc.add_paragraph().add_run()._r.append(
+        parse_xml('<w:br xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" w:type="page"/>')
+    )
+    doc.add_paragraph("{% endif %}")
+    doc.add_paragraph("{% endfor %}")
+    doc.save(str(path))
+    return Path(path)
@@ -8,7 +8,7 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives import hashes
 from typing import Optional, Tuple, Dict
 
-from sph_downloader import SPHDownloader
+from sph_session import SPHSessionManager
 from app_paths import load_app_paths
 
 logger = logging.getLogger("credentials")
@@ -31,6 +31,8 @@ class CredentialManager:
         self.secret_path = self.data_dir / self.SECRET_FILE
         self.credentials = None # Cached (school_id, username, password)
         self.session_cookies = None
+        # Gemeinsame SPH-Session für Login, Import und SPH-Abgleich
+        self.sph_session = SPHSessionManager()
         
     def _derive_key(self, password: str, salt: bytes) -> bytes:
         """Derive a 256-bit key from the password using PBKDF2."""
@@ -55,9 +57,8 @@ class CredentialManager:
 
         # 1. Try Online Login
         try:
-            downloader = SPHDownloader(logger=logger)
-            # SPHDownloader.login returns True or raises Exception
-            downloader.login(school_id, username, password)
+            # Session is kept by the session manager and reused by the SPH import
+            downloader = self.sph_session.login(school_id, username, password)
             
             # If successful: Save credentials encrypted
             self._save_credentials(school_id, username, password)
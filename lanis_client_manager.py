@@ -0,0 +1,208 @@
+import logging
+import re
+import threading
+
+logger = logging.getLogger("lanis_client")
+
+
+class LanisClientManager:
+    """
+    Verwaltet den prozessweiten httpx-Client von lanisapi (Request.client).
+
+    lanisapi nutzt einen globalen Client, den jeder LanisClient in __del__
+    schließt. Der Manager übernimmt diesen Lebenszyklus: Er wendet die
+    SID-/Cryptor-Workarounds einmal beim Programmstart an, erkennt einen
+    geschlossenen Client über httpx.Client.is_closed (ohne Netzwerkzugriff)
+    und erzeugt ihn bei Bedarf mit abgestimmten Pool-Limits neu.
+    """
+
+    _lock = threading.RLock()
+    _installed = False
+    _sid_patch_applied = False
+    _cryptor_patch_applied = False
+
+    @staticmethod
+    def _build_client():
+        import httpx
+        return httpx.Client(
+            timeout=httpx.Timeout(30.0, connect=60.0),
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0),
+        )
+
+    @classmethod
+    def install(cls, log=None):
+        """Einmalig beim Programmstart: Workarounds anwenden und Client bereitstellen."""
+        log = log or logger
+        with cls._lock:
+            if cls._installed:
+                return
+            cls._apply_sid_patch(log)
+            cls._apply_cryptor_patch(log)
+            cls._detach_client_finalizer(log)
+            cls._installed = True
+        try:
+            cls.ensure_open()
+        except Exception as e:
+            log.warning(f"LanisAPI-Client konnte nicht vorbereitet werden: {e}")
+
+    @classmethod
+    def ensure_open(cls):
+        """Liefert einen offenen lanisapi-Client; ein geschlossener wird ersetzt."""
+        from lanisapi.helpers.request import Request as LanisRequest
+
+        with cls._lock:
+            client = getattr(LanisRequest, "client", None)
+            if client is None or client.is_closed:
+                logger.info("LanisAPI-Client war geschlossen – wird neu erstellt.")
+                LanisRequest.client = cls._build_client()
+            return LanisRequest.client
+
+    @classmethod
+    def close(cls):
+        """Schließt den globalen Client beim Beenden der Anwendung."""
+        try:
+            from lanisapi.helpers.request import Request as LanisRequest
+            with cls._lock:
+                client = getattr(LanisRequest, "client", None)
+                if client is not None and not client.is_closed:
+                    client.close()
+        except Exception as e:
+            logger.warning(f"LanisAPI-Client konnte nicht geschlossen werden: {e}")
+
+    @classmethod
+    def _detach_client_finalizer(cls, logger):
+        """
+        LanisClient.__del__ schließt den globalen Client, sobald eine alte
+        Instanz vom GC eingesammelt wird – auch mitten in einer neuen Session.
+        Das Schließen übernimmt stattdessen LanisClientManager.close().
+        """
+        try:
+            import lanisapi.client as lanis_client
+            lanis_client.LanisClient.__del__ = lambda self: None
+        except Exception as e:
+            logger.warning(f"LanisAPI-Finalizer konnte nicht deaktiviert werden: {e}")
+
+    @classmethod
+    def _apply_sid_patch(cls, logger):
+        """
+        Patcht einen bekannten lanisapi-Bug (v0.4.1) beim Parsen von Set-Cookie.
+        Der Upstream-Code zerlegt den Header mit festen Indizes und crasht mit
+        'IndexError: list index out of range', obwohl die Verbindung funktioniert.
+        """
+        if cls._sid_patch_applied:
+            return
+
+        try:
+            import httpx
+            from http.cookies import SimpleCookie
+            from lanisapi.helpers.request import Request as LanisRequest
+            import lanisapi.helpers.authentication as lanis_auth
+            import lanisapi.client as lanis_client
+
+            def _robust_get_authentication_sid(url: str, cookies: httpx.Cookies, schoolid: str) -> httpx.Cookies:
+                response = LanisRequest.head(url, cookies=cookies)
+
+                final_cookies = httpx.Cookies()
+                final_cookies.set("i", schoolid)
+
+                sid = None
+
+                # 1) Preferred: parse cookie jar directly
+                try:
+                    sid = response.cookies.get("sid")
+                except Exception:
+                    sid = None
+
+                # 2) Fallback: parse all Set-Cookie headers robustly
+                if not sid:
+                    try:
+                        set_cookie_headers = response.headers.get_list("set-cookie")
+                    except Exception:
+                        raw_header = response.headers.get("set-cookie")
+                        set_cookie_headers = [raw_header] if raw_header else []
+
+                    for header in set_cookie_headers:
+                        if not header:
+                            continue
+                        cookie = SimpleCookie()
+                        try:
+                            cookie.load(header)
+                        except Exception:
+                            pass
+                        if "sid" in cookie:
+                            sid = cookie["sid"].value
+                            break
+
+                        # Last-resort regex for unusual combined header formats
+                        match = re.search(r"(?:^|[;,]\s*)sid=([^;,\s]+)", header)
+                        if match:
+                            sid = match.group(1)
+                            break
+
+                if not sid:
+                    raise ConnectionError(
+                        "SPH-Session-ID konnte nicht aus der Serverantwort gelesen werden."
+                    )
+
+                final_cookies.set("sid", sid)
+                return final_cookies
+
+            # Patch both helper module and already imported symbol in client module.
+            lanis_auth.get_authentication_sid = _robust_get_authentication_sid
+            lanis_client.get_authentication_sid = _robust_get_authentication_sid
+
+            cls._sid_patch_applied = True
+            logger.info("LanisAPI SID-Workaround aktiviert.")
+        except Exception as e:
+            # Non-fatal: keep old behavior if patching fails.
+            logger.warning(f"LanisAPI SID-Workaround konnte nicht aktiviert werden: {e}")
+
+
+    @classmethod
+    def _apply_cryptor_patch(cls, logger):
+        """
+        Patcht einen sporadischen lanisapi-Fehler:
+        ValueError("Plaintext is too long.") beim RSA-Handshake.
+        Dann wird ein kompakteres Secret erzeugt und erneut versucht.
+        """
+        if cls._cryptor_patch_applied:
+            return
+
+        try:
+            import base64
+            import secrets
+            from Cryptodome.Cipher import PKCS1_v1_5
+            from Cryptodome.PublicKey import RSA
+            import lanisapi.helpers.cryptor as lanis_cryptor
+
+            original_encrypt_key = lanis_cryptor.Cryptor._encrypt_key
+
+            def _patched_encrypt_key(self, public_key: str) -> str:
+                try:
+                    return original_encrypt_key(self, public_key)
+                except ValueError as e:
+                    if "Plaintext is too long" not in str(e):
+                        raise
+
+                    rsa = PKCS1_v1_5.new(RSA.import_key(public_key))
+
+                    # Try progressively smaller secrets until encryption fits.
+                    for plain_len in (16, 12, 8, 6, 4):
+                        compact_plain = secrets.token_hex((plain_len + 1) // 2)[:plain_len]
+                        compact_secret = self.encrypt(compact_plain, compact_plain)
+                        try:
+                            encrypted = base64.b64encode(rsa.encrypt(compact_secret.encode())).decode()
+                            self.secret = compact_secret
+                            return encrypted
+                        except ValueError:
+                            continue
+
+                    raise ValueError(
+                        "Plaintext is too long (auch mit kompaktem Secret)."
+                    )
+
+            lanis_cryptor.Cryptor._encrypt_key = _patched_encrypt_key
+            cls._cryptor_patch_applied = True
+            logger.info("LanisAPI Cryptor-Workaround aktiviert.")
+        except Exception as e:
+            logger.warning(f"LanisAPI Cryptor-Workaround konnte nicht aktiviert werden: {e}")
@@ -14,6 +14,7 @@ class LoginWindow:
         self.cm = credential_manager
         self.logger = logging.getLogger("login_gui")
         self.all_schools = None
+        self.school_index = None
         self.search_after = None # For debouncing
         self.queue = queue.Queue()
         
@@ -169,30 +170,17 @@ class LoginWindow:
             if not self.all_schools:
                 from sph_downloader import SPHDownloader
                 dl = SPHDownloader()
-                # Sort schools by name for better UX
-                self.all_schools = sorted(dl.get_schools(), key=lambda x: x["name"])
-            
-            schools = self.all_schools
-            
-            # Post-process in thread, then update UI
+                # Index is sorted by name for better UX
+                self.school_index = dl.get_school_index(
+                    on_refresh=lambda index: self.queue_ui(self._swap_school_index, index)
+                )
+                self.all_schools = self.school_index.schools
+
+            # 1. Exact ID match (Schulnummer) first, then name/city/ID matches
             found = []
-            term_lower = term.lower()
-            
-            # 1. Check for exact ID match first (Schulnummer)
-            for s in schools:
-                if term_lower == str(s["id"]):
-                     label = f"{s['name']} - {s['city']} [{s['id']}]"
-                     found.append((label, s))
-            
-            # 2. Then check name/city/contains ID
-            for s in schools:
-                # Avoid duplicates from exact ID match
-                if any(x[1]["id"] == s["id"] for x in found):
-                    continue
-                    
-                if term_lower in s["name"].lower() or term_lower in s["city"].lower() or term_lower in str(s["id"]):
-                     label = f"{s['name']} - {s['city']} [{s['id']}]"
-                     found.append((label, s))
+            for s in self.school_index.search(term):
+                label = f"{s['name']} - {s['city']} [{s['id']}]"
+                found.append((label, s))
             
             # Update UI via queue
             self.queue_ui(self.update_school_list, found)
@@ -200,6 +188,12 @@ class LoginWindow:
         except Exception as e:
             self.queue_ui(self.status_label.config, text=f"Suchfehler: {e}", foreground="red")
 
+    def _swap_school_index(self, index):
+        """Übernimmt eine im Hintergrund aktualisierte Schulliste"""
+        self.school_index = index
+        self.all_schools = index.schools
+        self.logger.info(f"Schulliste aktualisiert ({len(index.schools)} Schulen).")
+
     def update_school_list(self, found_schools_tuples):
         self.school_listbox.delete(0, tk.END)
         self.found_schools = []
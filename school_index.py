@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("school_index")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(str(text or "").lower())
+
+
+class SchoolSearchIndex:
+    """
+    Suchindex über die SPH-Schulliste für die Schulsuche im Login-Fenster.
+
+    - ID-Map: Schulnummer -> Position (exakte Treffer zuerst)
+    - Präfix-Index: Wortanfänge aus Name, Ort und Schulnummer -> Positionen
+    - Bigramm-Index: für Treffer mitten im Wort (z. B. "schule" in "Grundschule")
+
+    Positionen beziehen sich auf die nach Namen sortierte Schulliste, daher
+    sind Treffer ohne weitere Sortierung in Anzeigereihenfolge.
+    """
+
+    VERSION = 1
+    MAX_PREFIX = 8
+
+    def __init__(self, schools: Iterable[Dict[str, str]]):
+        self.schools: List[Dict[str, str]] = sorted(schools, key=lambda x: x["name"])
+        self.fingerprint = self.compute_fingerprint(self.schools)
+        self.by_id: Dict[str, int] = {}
+        self.prefix_index: Dict[str, List[int]] = {}
+        self.gram_index: Dict[str, List[int]] = {}
+        self._words: List[List[str]] = []
+        self._build()
+
+    @staticmethod
+    def compute_fingerprint(schools: Iterable[Dict[str, str]]) -> str:
+        """Stabiler Hash über ID/Name/Ort, um veraltete Index-Dateien zu erkennen."""
+        rows = sorted((str(s.get("id", "")), s.get("name", ""), s.get("city", "")) for s in schools)
+        return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _school_words(self, school: Dict[str, str]) -> List[str]:
+        return _tokens(school.get("name", "")) + _tokens(school.get("city", "")) + _tokens(school.get("id", ""))
+
+    def _build(self):
+        prefix_sets: Dict[str, Set[int]] = {}
+        gram_sets: Dict[str, Set[int]] = {}
+        for pos, school in enumerate(self.schools):
+            self.by_id[str(school.get("id", ""))] = pos
+            words = self._school_words(school)
+            self._words.append(words)
+            for word in words:
+                for length in range(1, min(len(word), self.MAX_PREFIX) + 1):
+                    prefix_sets.setdefault(word[:length], set()).add(pos)
+                for i in range(len(word) - 1):
+                    gram_sets.setdefault(word[i:i + 2], set()).add(pos)
+        self.prefix_index = {k: sorted(v) for k, v in prefix_sets.items()}
+        self.gram_index = {k: sorted(v) for k, v in gram_sets.items()}
+
+    def _prefix_hits(self, token: str) -> Set[int]:
+        hits = set(self.prefix_index.get(token[: self.MAX_PREFIX], ()))
+        if len(token) > self.MAX_PREFIX:
+            hits = {pos for pos in hits if any(w.startswith(token) for w in self._words[pos])}
+        return hits
+
+    def _substring_hits(self, token: str) -> Set[int]:
+        if len(token) < 2:
+            return set()
+        grams = [token[i:i + 2] for i in range(len(token) - 1)]
+        # Kleinste Postingliste zuerst, dann schneiden und verifizieren
+        postings = sorted((self.gram_index.get(g, ()) for g in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+        return {pos for pos in candidates if any(token in w for w in self._words[pos])}
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Liefert passende Schulen: exakte Schulnummer zuerst, dann Schulen, bei
+        denen alle Suchwörter einen Wortanfang treffen, dann Treffer mitten im Wort.
+        """
+        term_lower = (term or "").strip().lower()
+        query_tokens = _tokens(term_lower)
+        if not query_tokens:
+            return []
+
+        exact = self.by_id.get(term_lower)
+
+        prefix_match: Optional[Set[int]] = None
+        any_match: Optional[Set[int]] = None
+        for token in query_tokens:
+            p_hits = self._prefix_hits(token)
+            a_hits = p_hits | self._substring_hits(token)
+            prefix_match = p_hits if prefix_match is None else prefix_match & p_hits
+            any_match = a_hits if any_match is None else any_match & a_hits
+            if not any_match:
+                break
+
+        ordered: List[int] = []
+        if exact is not None:
+            ordered.append(exact)
+        for pos in sorted(prefix_match or ()):
+            if pos != exact:
+                ordered.append(pos)
+        for pos in sorted((any_match or set()) - (prefix_match or set())):
+            if pos != exact:
+                ordered.append(pos)
+
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [self.schools[pos] for pos in ordered]
+
+    def save(self, path: Path):
+        """Schreibt den Index atomar als JSON (neben schools.json)."""
+        payload = {
+            "version": self.VERSION,
+            "fingerprint": self.fingerprint,
+            "max_prefix": self.MAX_PREFIX,
+            "schools": self.schools,
+            "prefix": self.prefix_index,
+            "grams": self.gram_index,
+        }
+        path = Path(path)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_name, path)
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: Path, expected_fingerprint: Optional[str] = None) -> Optional["SchoolSearchIndex"]:
+        """Lädt einen gespeicherten Index; None bei fehlender, alter oder veralteter Datei."""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if payload.get("version") != cls.VERSION or payload.get("max_prefix") != cls.MAX_PREFIX:
+                return None
+            if expected_fingerprint and payload.get("fingerprint") != expected_fingerprint:
+                return None
+
+            index = cls.__new__(cls)
+            index.schools = payload["schools"]
+            index.fingerprint = payload["fingerprint"]
+            index.prefix_index = payload["prefix"]
+            index.gram_index = payload["grams"]
+            index.by_id = {str(s.get("id", "")): pos for pos, s in enumerate(index.schools)}
+            index._words = [index._school_words(s) for s in index.schools]
+            return index
+        except Exception as e:
+            logger.warning(f"Schul-Index konnte nicht geladen werden: {e}")
+            return None
@@ -4,33 +4,61 @@ import os
 import json
 import time
 import re
+import tempfile
+import threading
 import zipfile
 from pathlib import Path
 from lanisapi import LanisClient, LanisAccount, LanisCookie
 from app_paths import load_app_paths
 from lxml import html
+from school_index import SchoolSearchIndex
+from lanis_client_manager import LanisClientManager
+
+class SPHDownloadError(Exception):
+    """
+    Klassifizierter Fehler beim Laden einer Klassenliste.
+    Kategorien: network, auth, server (wiederholbar), not_xlsx (Klasse nicht vorhanden)
+    und too_large (Antwort überschreitet MAX_XLSX_BYTES).
+    """
+
+    NETWORK = "network"
+    AUTH = "auth"
+    SERVER = "server"
+    NOT_XLSX = "not_xlsx"
+    TOO_LARGE = "too_large"
+
+    RETRIABLE = (NETWORK, AUTH, SERVER)
+
+    def __init__(self, category, message, status_code=None):
+        super().__init__(message)
+        self.category = category
+        self.status_code = status_code
+
+    @property
+    def retriable(self):
+        return self.category in self.RETRIABLE
+
 
 class SPHDownloader:
     BASE_URL = "https://start.schulportal.hessen.de"
-    _lanis_sid_patch_applied = False
-    _lanis_cryptor_patch_applied = False
+    SCHOOLS_CACHE_FILE = "schools.cache.json"
+    SCHOOLS_MAX_AGE = 86400  # danach wird im Hintergrund erneuert
+    _schools_refresh_lock = threading.Lock()
+    _schools_refresh_running = False
+
+    ZIP_SIGNATURE = b"PK\x03\x04"
+    MAX_XLSX_BYTES = 20 * 1024 * 1024  # Klassenlisten sind typischerweise < 100 KB
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
     @staticmethod
-    def _looks_like_xlsx_bytes(content: bytes) -> bool:
-        """Checks if bytes look like a valid XLSX (ZIP-based OOXML) file."""
-        if not content or len(content) < 4:
-            return False
-        # XLSX is a ZIP container and starts with PK\x03\x04.
-        if not content.startswith(b"PK"):
-            return False
-        # Extra safety: verify ZIP structure.
+    def _looks_like_xlsx_file(file_path) -> bool:
+        """Prüft eine ZIP-Datei auf XLSX-Struktur (liest nur das Zentralverzeichnis)."""
         try:
-            import io
-            with zipfile.ZipFile(io.BytesIO(content), "r") as zf:
+            with zipfile.ZipFile(file_path, "r") as zf:
                 return "[Content_Types].xml" in zf.namelist()
         except Exception:
             return False
-    
+
     def __init__(self, output_dir=None, logger=None):
         self.logger = logger or logging.getLogger("sph_downloader")
         if output_dir is None:
@@ -39,78 +67,180 @@ class SPHDownloader:
         self.output_dir.mkdir(exist_ok=True, parents=True)
         self.client = None
         self.school_id = None
+        self._http_session = None
+        self._attached_cookies = None
         
-    def get_schools(self):
-        """Lädt die Schulliste via SPH Endpoint (oder Cache)"""
-        cache_file = self.output_dir / "schools.json"
-        
-        # Cache prüfen (1 Tag gültig)
-        if cache_file.exists():
-            if time.time() - cache_file.stat().st_mtime < 86400:
-                try:
-                    with open(cache_file, "r", encoding="utf-8") as f:
-                        return json.load(f)
-                except:
-                    pass
+    def get_schools(self, on_refresh=None):
+        """
+        Lädt die Schulliste aus dem Cache – auch wenn dieser veraltet ist – und
+        erneuert eine veraltete Liste im Hintergrund (stale-while-revalidate).
+        Nur ohne jeden Cache wird blockierend vom SPH Exporteur geladen.
+        on_refresh(index) wird nach erfolgreicher Hintergrund-Aktualisierung aufgerufen.
+        """
+        schools, fetched_at = self._load_schools_cache()
+        if schools:
+            if time.time() - fetched_at >= self.SCHOOLS_MAX_AGE:
+                self._start_schools_refresh(on_refresh)
+            return schools
 
         try:
-            self.logger.info("Lade Schulliste vom SPH Exporteur...")
-            # Direct fetch to avoid library overhead/bugs in get_schools
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            url = "https://startcache.schulportal.hessen.de/exporteur.php?a=schoollist"
-            r = requests.get(url, headers=headers, timeout=10)
-            r.raise_for_status()
-            
-            data = r.json()
-            schools = []
-            
-            # Data is a list of categories: [{"Kategorie": "...", "Schulen": [...]}, ...]
-            for group in data:
-                if "Schulen" in group:
-                    for s in group["Schulen"]:
-                        sid = str(s.get("Id", ""))
-                        name = s.get("Name", "")
-                        city = s.get("Ort", "")
-                        
-                        schools.append({
-                            "id": sid,
-                            "name": name,
-                            "city": city,
-                            "label": f"{name} ({city}) [{sid}]"
-                        })
-            
-            # Cache speichern
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(schools, f, ensure_ascii=False)
-                
+            schools, _ = self._refresh_schools()
             return schools
-            
         except Exception as e:
             self.logger.error(f"Fehler beim Laden der Schulliste: {e}")
             return []
 
+    def _load_schools_cache(self):
+        """
+        Liest den kompakten Schul-Cache (spaltenweise, Orte dedupliziert).
+        Fällt einmalig auf das alte schools.json-Format zurück.
+        Liefert (schools, fetched_at) bzw. ([], 0.0).
+        """
+        cache_file = self.output_dir / self.SCHOOLS_CACHE_FILE
+        try:
+            if cache_file.exists():
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == 1:
+                    cities = data["cities"]
+                    schools = [
+                        {"id": sid, "name": name, "city": cities[ci], "label": f"{name} ({cities[ci]}) [{sid}]"}
+                        for sid, name, ci in zip(data["ids"], data["names"], data["city_idx"])
+                    ]
+                    return schools, float(data.get("fetched_at", 0))
+        except Exception as e:
+            self.logger.warning(f"Schul-Cache konnte nicht gelesen werden: {e}")
+
+        legacy_file = self.output_dir / "schools.json"
+        try:
+            if legacy_file.exists():
+                with open(legacy_file, "r", encoding="utf-8") as f:
+                    return json.load(f), legacy_file.stat().st_mtime
+        except Exception:
+            pass
+        return [], 0.0
+
+    def _save_schools_cache(self, schools):
+        """Schreibt den kompakten Schul-Cache atomar (Temp-Datei + os.replace)."""
+        cache_file = self.output_dir / self.SCHOOLS_CACHE_FILE
+        city_pos = {}
+        cities, city_idx = [], []
+        for s in schools:
+            city = s.get("city", "")
+            if city not in city_pos:
+                city_pos[city] = len(cities)
+                cities.append(city)
+            city_idx.append(city_pos[city])
+        payload = {
+            "version": 1,
+            "fetched_at": time.time(),
+            "ids": [s["id"] for s in schools],
+            "names": [s.get("name", "") for s in schools],
+            "cities": cities,
+            "city_idx": city_idx,
+        }
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{cache_file.name}.", suffix=".tmp", dir=str(self.output_dir))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_name, cache_file)
+        except Exception:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise
+
+    def _download_schools(self):
+        """Lädt die Schulliste direkt vom SPH Exporteur"""
+        self.logger.info("Lade Schulliste vom SPH Exporteur...")
+        # Direct fetch to avoid library overhead/bugs in get_schools
+        headers = {
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+        }
+        url = "https://startcache.schulportal.hessen.de/exporteur.php?a=schoollist"
+        r = requests.get(url, headers=headers, timeout=10)
+        r.raise_for_status()
+
+        data = r.json()
+        schools = []
+
+        # Data is a list of categories: [{"Kategorie": "...", "Schulen": [...]}, ...]
+        for group in data:
+            if "Schulen" in group:
+                for s in group["Schulen"]:
+                    sid = str(s.get("Id", ""))
+                    name = s.get("Name", "")
+                    city = s.get("Ort", "")
+
+                    schools.append({
+                        "id": sid,
+                        "name": name,
+                        "city": city,
+                        "label": f"{name} ({city}) [{sid}]"
+                    })
+        return schools
+
+    def _refresh_schools(self):
+        """Lädt die Liste neu, ersetzt Cache und Suchindex und liefert (schools, index)."""
+        schools = self._download_schools()
+        if not schools:
+            raise ValueError("SPH Exporteur lieferte eine leere Schulliste.")
+        self._save_schools_cache(schools)
+        # Suchindex einmalig zur neuen Liste aufbauen
+        index = self._build_school_index(schools)
+        return schools, index
+
+    def _start_schools_refresh(self, on_refresh=None):
+        """Startet höchstens eine Hintergrund-Aktualisierung der Schulliste."""
+        with SPHDownloader._schools_refresh_lock:
+            if SPHDownloader._schools_refresh_running:
+                return
+            SPHDownloader._schools_refresh_running = True
+
+        def run():
+            try:
+                _, index = self._refresh_schools()
+                self.logger.info(f"Schulliste im Hintergrund aktualisiert ({len(index.schools)} Schulen).")
+                if on_refresh:
+                    on_refresh(index)
+            except Exception as e:
+                # Veraltete Liste bleibt gültig, nächster Versuch beim nächsten Laden
+                self.logger.warning(f"Hintergrund-Aktualisierung der Schulliste fehlgeschlagen: {e}")
+            finally:
+                with SPHDownloader._schools_refresh_lock:
+                    SPHDownloader._schools_refresh_running = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def get_school_index(self, on_refresh=None):
+        """Liefert den Suchindex zur Schulliste (aus schools.index.json oder neu aufgebaut)"""
+        schools = self.get_schools(on_refresh=on_refresh)
+        index = SchoolSearchIndex.load(
+            self.output_dir / "schools.index.json",
+            expected_fingerprint=SchoolSearchIndex.compute_fingerprint(schools),
+        )
+        if index is None:
+            index = self._build_school_index(schools)
+        return index
+
+    def _build_school_index(self, schools):
+        index = SchoolSearchIndex(schools)
+        try:
+            index.save(self.output_dir / "schools.index.json")
+        except Exception as e:
+            self.logger.warning(f"Schul-Index konnte nicht gespeichert werden: {e}")
+        return index
+
     def login(self, school_id, username, password):
         """Führt Login via LanisAPI durch"""
         self.logger.info(f"Versuche Login bei Schule {school_id} als {username} via LanisAPI")
         
         try:
-            self._apply_lanisapi_sid_patch()
-
-            # WORKAROUND for lanisapi GC bug:
-            # The library has a global httpx client that can be closed by __del__ of previous clients.
-            from lanisapi.helpers.request import Request as LanisRequest
-            import httpx
-            try:
-                # Test if client is closed
-                LanisRequest.client.post("https://example.com", timeout=0.001)
-            except RuntimeError as re:
-                if "closed" in str(re).lower():
-                    self.logger.info("LanisAPI internal client was closed. Re-opening...")
-                    LanisRequest.client = httpx.Client(timeout=httpx.Timeout(30.0, connect=60.0))
-            except Exception:
-                pass # Other errors are fine, we just want to catch "client closed"
+            # Patches sind i. d. R. schon beim Programmstart aktiv (no-op), der
+            # globale Client wird ohne Netzwerkzugriff auf "closed" geprüft.
+            LanisClientManager.install(self.logger)
+            LanisClientManager.ensure_open()
 
             account = LanisAccount(school_id, username, password)
             self.client = LanisClient(account)
@@ -120,6 +250,9 @@ class SPHDownloader:
                  raise ConnectionError("Authentifizierung abgeschlossen, aber Client ist nicht als 'authenticated' markiert (Handshake Fehler?).")
 
             self.school_id = school_id
+            # Alte requests-Session verwerfen, sie trägt noch die vorherige sid.
+            self._http_session = None
+            self._attached_cookies = None
             self.logger.info("Login erfolgreich.")
             return True
         except Exception as e:
@@ -133,135 +266,120 @@ class SPHDownloader:
             else:
                  raise ConnectionError(f"Verbindungsfehler: {err_msg}")
 
-    def _apply_lanisapi_sid_patch(self):
+    @property
+    def has_session(self):
+        return bool(self.client or self._attached_cookies)
+
+    def attach_session(self, school_id, sid):
         """
-        Patcht einen bekannten lanisapi-Bug (v0.4.1) beim Parsen von Set-Cookie.
-        Der Upstream-Code zerlegt den Header mit festen Indizes und crasht mit
-        'IndexError: list index out of range', obwohl die Verbindung funktioniert.
+        Übernimmt eine bestehende SPH-Session (i/sid) ohne LanisAPI-Login,
+        z. B. für den lokalen SPH-Stand-in-Server (benchmarks/fake_sph_server.py).
         """
-        if SPHDownloader._lanis_sid_patch_applied:
-            return
+        self.school_id = str(school_id)
+        self._attached_cookies = (str(school_id), sid)
+        self._http_session = None
 
-        try:
-            import httpx
-            from http.cookies import SimpleCookie
-            from lanisapi.helpers.request import Request as LanisRequest
-            import lanisapi.helpers.authentication as lanis_auth
-            import lanisapi.client as lanis_client
-
-            def _robust_get_authentication_sid(url: str, cookies: httpx.Cookies, schoolid: str) -> httpx.Cookies:
-                response = LanisRequest.head(url, cookies=cookies)
-
-                final_cookies = httpx.Cookies()
-                final_cookies.set("i", schoolid)
-
-                sid = None
-
-                # 1) Preferred: parse cookie jar directly
-                try:
-                    sid = response.cookies.get("sid")
-                except Exception:
-                    sid = None
-
-                # 2) Fallback: parse all Set-Cookie headers robustly
-                if not sid:
-                    try:
-                        set_cookie_headers = response.headers.get_list("set-cookie")
-                    except Exception:
-                        raw_header = response.headers.get("set-cookie")
-                        set_cookie_headers = [raw_header] if raw_header else []
-
-                    for header in set_cookie_headers:
-                        if not header:
-                            continue
-                        cookie = SimpleCookie()
-                        try:
-                            cookie.load(header)
-                        except Exception:
-                            pass
-                        if "sid" in cookie:
-                            sid = cookie["sid"].value
-                            break
-
-                        # Last-resort regex for unusual combined header formats
-                        match = re.search(r"(?:^|[;,]\s*)sid=([^;,\s]+)", header)
-                        if match:
-                            sid = match.group(1)
-                            break
-
-                if not sid:
-                    raise ConnectionError(
-                        "SPH-Session-ID konnte nicht aus der Serverantwort gelesen werden."
-                    )
-
-                final_cookies.set("sid", sid)
-                return final_cookies
-
-            # Patch both helper module and already imported symbol in client module.
-            lanis_auth.get_authentication_sid = _robust_get_authentication_sid
-            lanis_client.get_authentication_sid = _robust_get_authentication_sid
+    def _get_session_cookies(self):
+        """
+        Liefert (i, sid) der aktuellen LanisAPI-Session.
+        Wirft ConnectionError, wenn keine sid vorhanden ist.
+        """
+        if self._attached_cookies:
+            return self._attached_cookies
+        if not self.client:
+            raise ConnectionError("Nicht eingeloggt.")
 
-            SPHDownloader._lanis_sid_patch_applied = True
-            self.logger.info("LanisAPI SID-Workaround aktiviert.")
-        except Exception as e:
-            # Non-fatal: keep old behavior if patching fails.
-            self.logger.warning(f"LanisAPI SID-Workaround konnte nicht aktiviert werden: {e}")
+        # We extract cookies manually from the client's internal Request helper
+        # to be sure we get the current state.
+        from lanisapi.helpers.request import Request as LanisRequest
+        cookies = LanisRequest.get_cookies()
 
-        # Also patch sporadic RSA plaintext length issue in lanisapi handshake.
-        self._apply_lanisapi_cryptor_patch()
+        # SPH expects 'i' and 'sid'; httpx cookies are read without being picky about domains
+        sid = cookies.get("sid", domain="")
+        i = cookies.get("i", domain="") or self.school_id
+        if not sid:
+            raise ConnectionError("Keine aktive Session (sid fehlt).")
+        return i, sid
 
-    def _apply_lanisapi_cryptor_patch(self):
+    def _get_http_session(self):
         """
-        Patcht einen sporadischen lanisapi-Fehler:
-        ValueError("Plaintext is too long.") beim RSA-Handshake.
-        Dann wird ein kompakteres Secret erzeugt und erneut versucht.
+        Gibt eine wiederverwendbare requests-Session mit den SPH-Cookies zurück.
+        Die Session (inkl. Keep-Alive-Verbindungen) lebt bis zum nächsten Login.
         """
-        if SPHDownloader._lanis_cryptor_patch_applied:
-            return
-
-        try:
-            import base64
-            import secrets
-            from Cryptodome.Cipher import PKCS1_v1_5
-            from Cryptodome.PublicKey import RSA
-            import lanisapi.helpers.cryptor as lanis_cryptor
+        if self._http_session is None:
+            self._http_session = self._new_http_session()
+        return self._http_session
 
-            original_encrypt_key = lanis_cryptor.Cryptor._encrypt_key
+    def _new_http_session(self):
+        """Neue requests-Session mit den SPH-Cookies (i, sid) der aktuellen Anmeldung"""
+        i, sid = self._get_session_cookies()
+        session = requests.Session()
+        session.cookies.set("i", i)
+        session.cookies.set("sid", sid)
+        session.headers.update(
+            {
+                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+                "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+            }
+        )
+        self.logger.info(f"Cookies gesetzt: i={i}, sid={sid[:8]}...")
+        return session
 
-            def _patched_encrypt_key(self, public_key: str) -> str:
-                try:
-                    return original_encrypt_key(self, public_key)
-                except ValueError as e:
-                    if "Plaintext is too long" not in str(e):
-                        raise
-
-                    rsa = PKCS1_v1_5.new(RSA.import_key(public_key))
-
-                    # Try progressively smaller secrets until encryption fits.
-                    for plain_len in (16, 12, 8, 6, 4):
-                        compact_plain = secrets.token_hex((plain_len + 1) // 2)[:plain_len]
-                        compact_secret = self.encrypt(compact_plain, compact_plain)
-                        try:
-                            encrypted = base64.b64encode(rsa.encrypt(compact_secret.encode())).decode()
-                            self.secret = compact_secret
-                            return encrypted
-                        except ValueError:
-                            continue
-
-                    raise ValueError(
-                        "Plaintext is too long (auch mit kompaktem Secret)."
-                    )
+    def validate_session(self, timeout=10, separate_session=False):
+        """
+        Prüft günstig, ob die SPH-Session noch gültig ist, und verlängert sie dabei.
+        Nutzt den Keep-Alive-Endpunkt des Schulportals (ajax_login.php), der die
+        verbleibende Sessiondauer liefert (0 = abgelaufen). Kein RSA-Handshake.
 
-            lanis_cryptor.Cryptor._encrypt_key = _patched_encrypt_key
-            SPHDownloader._lanis_cryptor_patch_applied = True
-            self.logger.info("LanisAPI Cryptor-Workaround aktiviert.")
+        Mit separate_session=True wird eine eigene requests-Session mit denselben Cookies
+        verwendet (requests.Session ist nicht threadsicher; z. B. für den Keep-Alive-Thread,
+        während ein Import die gemeinsame Session nutzt).
+        """
+        session = None
+        try:
+            session = self._new_http_session() if separate_session else self._get_http_session()
+            _, sid = self._get_session_cookies()
+            r = session.post(
+                f"{self.BASE_URL}/ajax_login.php",
+                data={"name": sid},
+                timeout=timeout,
+                allow_redirects=False,
+            )
+            if r.status_code != 200:
+                return False
+            text = (r.text or "").strip()
+            if text.isdigit():
+                return int(text) > 0
+
+            # Unerwartete Antwort: Startseite ohne Redirect abrufen.
+            # Eine abgelaufene Session leitet auf den Login um bzw. setzt "i=0".
+            r = session.get(f"{self.BASE_URL}/index.php", timeout=timeout, allow_redirects=False)
+            if r.status_code in (301, 302, 303, 307, 308):
+                return False
+            return r.status_code == 200 and "i=0" not in (r.headers.get("Set-Cookie", "") or "")
         except Exception as e:
-            self.logger.warning(f"LanisAPI Cryptor-Workaround konnte nicht aktiviert werden: {e}")
+            self.logger.info(f"SPH-Session-Prüfung fehlgeschlagen: {e}")
+            return False
+        finally:
+            if separate_session and session is not None:
+                session.close()
 
     def download_class_list(self, class_name, year_level, output_dir):
-        """Lädt Liste für eine Klasse herunter"""
-        if not self.client:
-             raise ConnectionError("Nicht eingeloggt.")
+        """Lädt Liste für eine Klasse herunter (None bei jedem Fehler)"""
+        try:
+            return self.fetch_class_list(class_name, output_dir)
+        except SPHDownloadError as e:
+            self.logger.error(f"Fehler beim Download {class_name}: {e}")
+            return None
+
+    def fetch_class_list(self, class_name, output_dir, timeout=(10, 60)):
+        """
+        Lädt die AV/SV-Liste einer Klasse und liefert den Dateipfad.
+        Fehler werden als SPHDownloadError mit Kategorie gemeldet, damit
+        "Klasse existiert nicht" von Netzwerk-/Serverfehlern unterscheidbar ist.
+        """
+        if not self.has_session:
+            raise SPHDownloadError(SPHDownloadError.AUTH, "Nicht eingeloggt.")
 
         # URL Format:
         url = f"{self.BASE_URL}/meinunterricht.php"
@@ -270,68 +388,101 @@ class SPHDownloader:
             "k": class_name,
             "b": "xlsx"
         }
-        
+
         try:
-            # Transfer Cookies from LanisClient (httpx) to requests
-            import requests
-            session = requests.Session()
-            
-            # Use the official property to get cookies (school_id and session_id)
-            if self.client:
-                # We extract cookies manually from the client's internal Request helper
-                # to be sure we get the current state.
-                from lanisapi.helpers.request import Request as LanisRequest
-                cookies = LanisRequest.get_cookies()
-                
-                # SPH expects 'i' and 'sid'
-                # httpx cookies can be accessed via .get(name)
-                # We try to get them without being too picky about domains
-                sid = cookies.get("sid", domain="")
-                i = cookies.get("i", domain="") or self.school_id
-                
-                if not sid:
-                     self.logger.error("Download fehlgeschlagen: Keine Session-ID (sid) gefunden.")
-                     raise ConnectionError("Keine aktive Session (sid fehlt).")
-                
-                session.cookies.set("i", i)
-                session.cookies.set("sid", sid)
-                self.logger.info(f"Cookies gesetzt: i={i}, sid={sid[:8]}...")
-            
-            # Also set User-Agent to match
-            session.headers.update({
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            })
-            
-            r = session.get(url, params=params)
-            r.raise_for_status()
-
-            content_type = (r.headers.get("Content-Type", "") or "").lower()
-            looks_like_xlsx = self._looks_like_xlsx_bytes(r.content)
-            if not looks_like_xlsx:
-                preview = (r.text[:300] if r.text else "").replace("\n", " ").replace("\r", " ")
-                self.logger.warning(
-                    f"Download für {class_name} ist kein gültiges XLSX "
-                    f"(content-type='{content_type}', bytes={len(r.content)}). Vorschau: {preview}"
-                )
-                return None
-
-            file_path = Path(output_dir) / f"Klasse_{class_name}.xlsx"
-            with open(file_path, "wb") as f:
-                f.write(r.content)
-
-            # Final on-disk validation before returning.
-            if not zipfile.is_zipfile(file_path):
+            session = self._get_http_session()
+        except ConnectionError as e:
+            raise SPHDownloadError(SPHDownloadError.AUTH, str(e))
+
+        try:
+            r = session.get(url, params=params, timeout=timeout, stream=True)
+        except (requests.Timeout, requests.ConnectionError) as e:
+            raise SPHDownloadError(SPHDownloadError.NETWORK, f"Netzwerkfehler: {e}")
+        except requests.RequestException as e:
+            raise SPHDownloadError(SPHDownloadError.NETWORK, f"Anfrage fehlgeschlagen: {e}")
+
+        output_dir = Path(output_dir)
+        file_path = output_dir / f"Klasse_{class_name}.xlsx"
+        tmp_path = None
+        try:
+            self._raise_for_download_status(r)
+
+            # In eine Temp-Datei im Zielordner streamen, damit os.replace atomar ist
+            # und nie eine halb geschriebene Klasse_XX.xlsx sichtbar wird.
+            fd, tmp_name = tempfile.mkstemp(
+                prefix=f".Klasse_{class_name}.", suffix=".part", dir=str(output_dir)
+            )
+            tmp_path = Path(tmp_name)
+            size = 0
+            head = b""
+            with os.fdopen(fd, "wb") as f:
+                for chunk in r.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if len(head) < len(self.ZIP_SIGNATURE):
+                        head += chunk[: 512 - len(head)]
+                        if len(head) >= len(self.ZIP_SIGNATURE) and not head.startswith(self.ZIP_SIGNATURE):
+                            self._reject_non_xlsx(class_name, r, head)
+                    size += len(chunk)
+                    if size > self.MAX_XLSX_BYTES:
+                        raise SPHDownloadError(
+                            SPHDownloadError.TOO_LARGE,
+                            f"Antwort größer als {self.MAX_XLSX_BYTES // (1024 * 1024)} MB, Download abgebrochen.",
+                        )
+                    f.write(chunk)
+
+            if not head.startswith(self.ZIP_SIGNATURE):
+                self._reject_non_xlsx(class_name, r, head)
+
+            # Einmalige Strukturprüfung vor dem Umbenennen
+            if not self._looks_like_xlsx_file(tmp_path):
                 self.logger.warning(f"Download für {class_name} wurde verworfen: Datei ist kein ZIP/XLSX.")
+                raise SPHDownloadError(SPHDownloadError.NOT_XLSX, "Datei ist kein ZIP/XLSX.")
+
+            os.replace(tmp_path, file_path)
+            tmp_path = None
+            return file_path
+        except (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+            raise SPHDownloadError(SPHDownloadError.NETWORK, f"Verbindung während des Downloads abgebrochen: {e}")
+        finally:
+            r.close()
+            if tmp_path is not None:
                 try:
-                    file_path.unlink(missing_ok=True)
+                    tmp_path.unlink(missing_ok=True)
                 except Exception:
                     pass
-                return None
-            
-            return file_path
-        except Exception as e:
-            self.logger.error(f"Fehler beim Download {class_name}: {e}")
-            return None
+
+    def _reject_non_xlsx(self, class_name, response, head):
+        """Protokolliert eine Nicht-XLSX-Antwort (meist HTML) und bricht den Download ab."""
+        content_type = (response.headers.get("Content-Type", "") or "").lower()
+        preview = head[:300].decode("utf-8", errors="replace").replace("\n", " ").replace("\r", " ")
+        self.logger.warning(
+            f"Download für {class_name} ist kein gültiges XLSX "
+            f"(content-type='{content_type}'). Vorschau: {preview}"
+        )
+        raise SPHDownloadError(SPHDownloadError.NOT_XLSX, "Antwort ist kein XLSX (Klasse nicht vorhanden?)")
+
+    @staticmethod
+    def _raise_for_download_status(response):
+        """Ordnet HTTP-Status und Login-Redirects einer Fehlerkategorie zu."""
+        status = response.status_code
+        set_cookie = response.headers.get("Set-Cookie", "") or ""
+        redirected_to_login = any(
+            "login" in (h.headers.get("Location", "") or "").lower() for h in response.history
+        )
+        if status in (401, 403) or redirected_to_login or "i=0" in set_cookie:
+            raise SPHDownloadError(
+                SPHDownloadError.AUTH, f"Session ungültig (HTTP {status})", status_code=status
+            )
+        if status == 429 or status >= 500:
+            raise SPHDownloadError(
+                SPHDownloadError.SERVER, f"Serverfehler (HTTP {status})", status_code=status
+            )
+        if status >= 400:
+            # 404 & Co.: die Klasse gibt es nicht, ein erneuter Versuch hilft nicht.
+            raise SPHDownloadError(
+                SPHDownloadError.NOT_XLSX, f"Keine Liste (HTTP {status})", status_code=status
+            )
 
     def fetch_missing_submissions_overview(self):
         """
@@ -342,26 +493,10 @@ class SPHDownloader:
           - rot    => fehlend
         Es werden KEINE Fachnamen/WPU-Bezeichnungen verändert.
         """
-        if not self.client:
+        if not self.has_session:
             raise ConnectionError("Nicht eingeloggt.")
 
-        from lanisapi.helpers.request import Request as LanisRequest
-
-        cookies = LanisRequest.get_cookies()
-        sid = cookies.get("sid", domain="")
-        i = cookies.get("i", domain="") or self.school_id
-        if not sid:
-            raise ConnectionError("Keine aktive Session (sid fehlt).")
-
-        session = requests.Session()
-        session.cookies.set("i", i)
-        session.cookies.set("sid", sid)
-        session.headers.update(
-            {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-        )
+        session = self._get_http_session()
 
         url = f"{self.BASE_URL}/kopfnoten.php?a=fehlende"
         branches = ["IGS~5", "IGS~6", "IGS~7", "IGS~8", "IGS~9", "NDHS/S1~30"]
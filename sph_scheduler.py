@@ -0,0 +1,273 @@
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sph_downloader import SPHDownloadError
+
+
+@dataclass
+class DownloadOutcome:
+    """Ergebnis eines Download-Jobs für eine Klasse."""
+
+    class_name: str
+    status: str  # "ok", "missing" (Klasse nicht vorhanden) oder "failed"
+    attempts: int
+    duration: float
+    category: Optional[str] = None
+    error: str = ""
+    file_path: Optional[Path] = None
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data["file_path"] = str(self.file_path) if self.file_path else None
+        data["duration"] = round(self.duration, 3)
+        return data
+
+
+class DownloadScheduler:
+    """
+    Führt SPH-Klassendownloads als Jobs aus.
+
+    Wiederholbare Fehler (Netzwerk, Server, abgelaufene Session) werden mit
+    exponentiellem Backoff plus Jitter erneut versucht; nur "kein XLSX" gilt
+    als "Klasse nicht vorhanden". Pro Klasse werden Dauer, Versuche und
+    Status erfasst und können je Lauf persistiert werden.
+    """
+
+    MAX_ATTEMPTS = 4
+    BASE_DELAY = 1.0
+    MAX_DELAY = 15.0
+    # Nach so vielen endgültig fehlgeschlagenen Jobs in Folge wird der Lauf abgebrochen
+    MAX_CONSECUTIVE_FAILURES = 3
+    METRICS_HISTORY = 20
+
+    def __init__(
+        self,
+        downloader,
+        output_dir: Path,
+        reauthenticate: Optional[Callable[[], object]] = None,
+        log: Optional[Callable[[str], None]] = None,
+        status: Optional[Callable[[str], None]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        max_classes_per_year: int = 9,
+        suffix_letters: str = "abcdefghi",
+    ):
+        self.downloader = downloader
+        self.output_dir = Path(output_dir)
+        self.reauthenticate = reauthenticate
+        self.log = log or (lambda msg: None)
+        self.status = status or (lambda msg: None)
+        self.sleep = sleep
+        self.max_classes_per_year = max_classes_per_year
+        self.suffix_letters = suffix_letters
+        self.logger = logging.getLogger("sph")
+        self.outcomes: List[DownloadOutcome] = []
+        self.aborted = False
+        self._consecutive_failures = 0
+        self._started = time.monotonic()
+        self._started_at = datetime.now()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponentieller Backoff mit Jitter (halbe Basis fest, halbe zufällig)."""
+        delay = min(self.MAX_DELAY, self.BASE_DELAY * (2 ** (attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def download(self, class_name: str) -> DownloadOutcome:
+        """Lädt eine Klasse inkl. Wiederholungen und liefert das Ergebnis."""
+        started = time.monotonic()
+        attempt = 0
+        last_error: Optional[SPHDownloadError] = None
+
+        while attempt < self.MAX_ATTEMPTS:
+            attempt += 1
+            try:
+                file_path = self.downloader.fetch_class_list(class_name, self.output_dir)
+                outcome = DownloadOutcome(class_name, "ok", attempt, time.monotonic() - started, file_path=file_path)
+                break
+            except SPHDownloadError as e:
+                last_error = e
+            except Exception as e:
+                last_error = SPHDownloadError(SPHDownloadError.NETWORK, str(e))
+
+            if not last_error.retriable:
+                status = "missing" if last_error.category == SPHDownloadError.NOT_XLSX else "failed"
+                outcome = DownloadOutcome(
+                    class_name, status, attempt, time.monotonic() - started,
+                    category=last_error.category, error=str(last_error),
+                )
+                break
+
+            if attempt >= self.MAX_ATTEMPTS:
+                outcome = DownloadOutcome(
+                    class_name, "failed", attempt, time.monotonic() - started,
+                    category=last_error.category, error=str(last_error),
+                )
+                break
+
+            if last_error.category == SPHDownloadError.AUTH and self.reauthenticate:
+                self.log(f"🔑 {class_name}: Session abgelaufen – melde neu an...")
+                try:
+                    self.downloader = self.reauthenticate()
+                except Exception as e:
+                    outcome = DownloadOutcome(
+                        class_name, "failed", attempt, time.monotonic() - started,
+                        category=SPHDownloadError.AUTH, error=f"Neuanmeldung fehlgeschlagen: {e}",
+                    )
+                    break
+                continue
+
+            delay = self._backoff_delay(attempt)
+            self.log(
+                f"↻ {class_name}: {last_error} – Versuch {attempt + 1}/{self.MAX_ATTEMPTS} in {delay:.1f}s"
+            )
+            self.sleep(delay)
+
+        if outcome.status == "failed":
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.MAX_CONSECUTIVE_FAILURES:
+                self.aborted = True
+        else:
+            self._consecutive_failures = 0
+
+        self.outcomes.append(outcome)
+        return outcome
+
+    def _log_outcome(self, outcome: DownloadOutcome, missing_text: str):
+        if outcome.status == "ok":
+            self.log(f"✅ Download ok: {outcome.class_name} ({outcome.duration:.1f}s)")
+        elif outcome.status == "missing":
+            self.log(f"{missing_text}: {outcome.class_name}")
+        else:
+            self.log(
+                f"❌ Download fehlgeschlagen: {outcome.class_name} "
+                f"[{outcome.category}] nach {outcome.attempts} Versuchen: {outcome.error}"
+            )
+
+    def auto_detect(self, years: List[int]) -> Tuple[List[Path], List[Tuple[str, int]]]:
+        """
+        Erkennt Klassen pro Jahrgang automatisch durch sequenzielles Testen (05a … 05i).
+        Stoppt je Jahrgang nach 2 "nicht vorhanden" in Folge nach erstem Treffer.
+        Endgültig fehlgeschlagene Downloads zählen nicht als "nicht vorhanden".
+        """
+        downloaded_files: List[Path] = []
+        detected_tasks: List[Tuple[str, int]] = []
+
+        for year in years:
+            jg = f"{int(year):02d}"
+            success_count = 0
+            fail_streak = 0
+
+            for i in range(self.max_classes_per_year):
+                if self.aborted:
+                    break
+                class_name = f"{jg}{self.suffix_letters[i]}"
+                self.status(f"Autocheck Klasse {class_name}...")
+                self.log(f"Autocheck Klasse {class_name}...")
+                outcome = self.download(class_name)
+                self._log_outcome(outcome, "— Nicht gefunden")
+
+                if outcome.status == "ok":
+                    downloaded_files.append(outcome.file_path)
+                    success_count += 1
+                    fail_streak = 0
+                elif outcome.status == "missing":
+                    fail_streak += 1
+                    if success_count == 0 and fail_streak >= 1:
+                        break
+                    if success_count > 0 and fail_streak >= 2:
+                        break
+
+            if success_count > 0:
+                detected_tasks.append((jg, success_count))
+            if self.aborted:
+                self.log("⛔ Autoerkennung abgebrochen: SPH wiederholt nicht erreichbar.")
+                break
+
+        return downloaded_files, detected_tasks
+
+    def download_manual(self, tasks: List[Tuple[str, int]]) -> List[Path]:
+        """Lädt Klassen anhand manueller Konfiguration (Backup-Pfad)."""
+        downloaded_files: List[Path] = []
+        for jg, count in tasks:
+            for i in range(min(count, self.max_classes_per_year)):
+                if self.aborted:
+                    return downloaded_files
+                class_name = f"{jg}{self.suffix_letters[i]}"
+                self.status(f"Lade Klasse {class_name} (manuell)...")
+                self.log(f"Lade Klasse {class_name} (manuell)...")
+                outcome = self.download(class_name)
+                self._log_outcome(outcome, "⚠️ Kein Download")
+                if outcome.status == "ok":
+                    downloaded_files.append(outcome.file_path)
+        return downloaded_files
+
+    def build_run_metrics(self) -> Dict:
+        """Fasst den Lauf als JSON-fähiges Dict zusammen."""
+        counts = {"ok": 0, "missing": 0, "failed": 0}
+        for o in self.outcomes:
+            counts[o.status] = counts.get(o.status, 0) + 1
+        return {
+            "started_at": self._started_at.isoformat(timespec="seconds"),
+            "duration": round(time.monotonic() - self._started, 3),
+            "counts": counts,
+            "retries": sum(max(0, o.attempts - 1) for o in self.outcomes),
+            "aborted": self.aborted,
+            "classes": [o.to_dict() for o in self.outcomes],
+        }
+
+    def finish_run(self, metrics_path: Optional[Path] = None) -> Dict:
+        """
+        Schreibt die Metriken des Laufs ins Import-Log und hängt sie an die
+        Historie an (letzte METRICS_HISTORY Läufe), inkl. Vergleich zum Vorlauf.
+        """
+        metrics = self.build_run_metrics()
+        counts = metrics["counts"]
+        downloads = [o for o in self.outcomes if o.status == "ok"]
+        avg = sum(o.duration for o in downloads) / len(downloads) if downloads else 0.0
+
+        self.log(
+            f"Download-Metriken: {counts['ok']} ok, {counts['missing']} nicht vorhanden, "
+            f"{counts['failed']} fehlgeschlagen, {metrics['retries']} Wiederholungen, "
+            f"Gesamt {metrics['duration']:.1f}s, Ø {avg:.2f}s/Klasse"
+        )
+        slowest = sorted(downloads, key=lambda o: o.duration, reverse=True)[:3]
+        if slowest:
+            self.log("Langsamste Klassen: " + ", ".join(f"{o.class_name} {o.duration:.1f}s" for o in slowest))
+
+        if metrics_path is None:
+            return metrics
+
+        history: Dict = {"runs": []}
+        try:
+            if metrics_path.exists():
+                with open(metrics_path, "r", encoding="utf-8") as f:
+                    history = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"Download-Metriken konnten nicht gelesen werden: {e}")
+            history = {"runs": []}
+
+        runs = history.get("runs", [])
+        if runs:
+            prev = runs[-1]
+            prev_counts = prev.get("counts", {})
+            self.log(
+                f"Vergleich zum letzten Lauf ({prev.get('started_at', '-')}): "
+                f"Dauer {metrics['duration']:.1f}s (vorher {prev.get('duration', 0):.1f}s), "
+                f"ok {counts['ok']} (vorher {prev_counts.get('ok', 0)}), "
+                f"Fehler {counts['failed']} (vorher {prev_counts.get('failed', 0)})"
+            )
+
+        runs.append(metrics)
+        history["runs"] = runs[-self.METRICS_HISTORY:]
+        try:
+            metrics_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(metrics_path, "w", encoding="utf-8") as f:
+                json.dump(history, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Download-Metriken konnten nicht gespeichert werden: {e}")
+        return metrics
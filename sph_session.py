@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+from sph_downloader import SPHDownloader
+
+
+class SPHSessionManager:
+    """
+    Hält eine einmal authentifizierte SPH-Session für Anmeldung, SPH-Import
+    und SPH-Abgleich vor.
+
+    Der teure LanisAPI-Login (inkl. RSA-Handshake) wird nur ausgeführt, wenn
+    noch keine Session existiert, ein anderes Konto angefragt wird oder die
+    Session nachweislich abgelaufen ist. Vor der Nutzung wird die sid über
+    den Keep-Alive-Endpunkt des Schulportals geprüft; ein Hintergrund-Thread
+    hält sie zwischen Import-Läufen am Leben.
+    """
+
+    # Innerhalb dieses Fensters gilt eine erfolgreich geprüfte Session ohne erneute Prüfung.
+    VALIDATION_TTL = 60
+    # Abstand der Keep-Alive-Pings (SPH beendet inaktive Sessions nach ca. 100 Minuten).
+    KEEPALIVE_INTERVAL = 600
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger("sph")
+        self._lock = threading.RLock()
+        self._downloader: Optional[SPHDownloader] = None
+        self._account: Optional[Tuple[str, str]] = None
+        self._last_validated = 0.0
+        self._keepalive_stop: Optional[threading.Event] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self._downloader is not None
+
+    def login(self, school_id: str, username: str, password: str) -> SPHDownloader:
+        """
+        Erzwingt einen vollständigen Login und übernimmt die neue Session.
+        Fehler (ValueError/ConnectionError) werden unverändert weitergereicht.
+        """
+        with self._lock:
+            downloader = SPHDownloader(logger=self.logger)
+            downloader.login(school_id, username, password)
+
+            self._downloader = downloader
+            self._account = (str(school_id), username)
+            self._last_validated = time.monotonic()
+            self._start_keepalive()
+            return downloader
+
+    def get_downloader(self, school_id: str, username: str, password: str) -> SPHDownloader:
+        """
+        Liefert einen eingeloggten SPHDownloader.
+        Eine bestehende Session wird wiederverwendet, solange sie gültig ist.
+        """
+        with self._lock:
+            if self._downloader is not None and self._account == (str(school_id), username):
+                if time.monotonic() - self._last_validated < self.VALIDATION_TTL:
+                    return self._downloader
+                if self._downloader.validate_session():
+                    self._last_validated = time.monotonic()
+                    self.logger.info("SPH-Session wiederverwendet.")
+                    return self._downloader
+                self.logger.info("SPH-Session abgelaufen – neuer Login erforderlich.")
+
+            return self.login(school_id, username, password)
+
+    def reauthenticate(self, school_id: str, username: str, password: str) -> SPHDownloader:
+        """Verwirft die Session und meldet sofort neu an (nach Auth-Fehler beim Download)."""
+        with self._lock:
+            self.invalidate()
+            return self.login(school_id, username, password)
+
+    def invalidate(self):
+        """Verwirft die aktuelle Session (z. B. nach einem Auth-Fehler)."""
+        # Keep-Alive ohne Lock stoppen: ein laufender Ping soll hier nicht blockieren.
+        self._stop_keepalive()
+        with self._lock:
+            self._clear_session()
+
+    def close(self):
+        """
+        Beendet den Keep-Alive-Thread beim Schließen der Anwendung.
+        Blockiert nicht, auch wenn gerade ein Login oder Import die Session hält.
+        """
+        self._stop_keepalive()
+        if self._lock.acquire(blocking=False):
+            try:
+                self._clear_session()
+            finally:
+                self._lock.release()
+
+    def _clear_session(self):
+        self._downloader = None
+        self._account = None
+        self._last_validated = 0.0
+
+    def _start_keepalive(self):
+        self._stop_keepalive()
+        stop_event = threading.Event()
+        self._keepalive_stop = stop_event
+        threading.Thread(
+            target=self._keepalive_loop, args=(stop_event,), daemon=True
+        ).start()
+
+    def _stop_keepalive(self):
+        stop_event, self._keepalive_stop = self._keepalive_stop, None
+        if stop_event is not None:
+            stop_event.set()
+
+    def _keepalive_loop(self, stop_event: threading.Event):
+        while not stop_event.wait(self.KEEPALIVE_INTERVAL):
+            with self._lock:
+                downloader = self._downloader
+            if downloader is None or stop_event.is_set():
+                return
+            # Netzwerkprüfung ohne Lock (bis zu zwei Anfragen mit Timeout), damit Schließen,
+            # Import und Neuanmeldung nicht auf einen hängenden Ping warten. Eigene
+            # requests-Session, da ein laufender Import die gemeinsame gerade nutzen kann.
+            valid = downloader.validate_session(separate_session=True)
+            with self._lock:
+                if stop_event.is_set() or self._downloader is not downloader:
+                    continue
+                if valid:
+                    self._last_validated = time.monotonic()
+                else:
+                    # Nicht sofort neu anmelden: das passiert erst bei der nächsten Nutzung.
+                    self._last_validated = 0.0
+                    self.logger.info("SPH-Keep-Alive: Session nicht mehr gültig.")